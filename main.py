@@ -1,79 +1,168 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+import os
+import sys
+
+if __name__ == "__main__" and (
+    "--production" in sys.argv or os.getenv("CASESTAR_ENV") == "production"
+):
+    # Before any app setup: the supervisor must not open the Chroma
+    # directory that the server it starts is about to serve
+    from services.server import run_production
+    sys.exit(run_production(sys.argv[1:]))
+
+from fastapi import (
+    FastAPI, HTTPException, UploadFile, File, Request, Query, BackgroundTasks
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field, model_validator, validator
+from typing import List, Literal, Optional
 import chromadb
 from langchain_ollama import OllamaLLM
 import logging
 import json
 import re
 import uuid
-from datetime import datetime
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import partial
 import filetype
-import os
-from services.text_extractor import process_document_content
-from services.graph_db import graph_service
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("backend.log"),
-        logging.StreamHandler()
-    ]
+import asyncio
+import hmac
+import math
+import time
+from services.compression import CompressionMiddleware
+from services.text_extractor import (
+    process_document_content,
+    ExtractionError
+)
+from services.extraction_cache import extraction_cache
+from services.graph_db import graph_service, MAX_SUBGRAPH_DEPTH
+from services.graph_cache import case_graph_cache, case_list_cache
+from services.graph_writer import graph_writer
+from services.rate_limiter import RateLimitMiddleware, rate_limiter
+from services.llm_slots import llm_slots
+from services.llm_scheduler import (
+    llm_scheduler, LLMDeadlineExceeded, LLMOverloaded, ClientDisconnected,
+    INTERACTIVE, cancel_on_disconnect, generation_fn
+)
+from services.case_summaries import case_summary_store, case_summarizer
+from services.embeddings import build_embedding_function
+from services.timeline import timeline_index
+from services.document_store import document_store
+from services.search import (
+    DEFAULT_MMR_LAMBDA, DEFAULT_SNIPPET_CHARS, MAX_MMR_CANDIDATES,
+    MMR_FETCH_FACTOR, make_snippet, mmr_select
+)
+from services.vector_index import index_stats, open_collection, query_latency
+from services.profiling import ProfilingMiddleware, run_in_thread, span
+from services.logging_setup import RequestLogMiddleware, configure_logging
+from services.health import (
+    health_prober, check_chroma, check_neo4j, check_ollama
+)
+from services.entity_extractor import (
+    gazetteer, extract_rule_entities, merge_entities
 )
+
+# Log through a queue so request handlers never wait on file I/O
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Security constants
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 ALLOWED_EXTENSIONS = {'.pdf', '.txt', '.docx'}
 MAX_TEXT_LENGTH = 100000  # Max characters for analysis
-
-# Initialize Limiter
-limiter = Limiter(key_func=get_remote_address)
+MAX_GRAPH_EDGES = 5000  # Max relationships returned for a case graph
+MAX_TIMELINE_EVENTS = 5000  # Max events returned for a case timeline
+MAX_ENTITY_HINTS = 50  # Rule-based entities listed in the LLM prompt
+FAST_SUMMARY_CHARS = 500  # Opening excerpt returned by fast analysis
+UPLOAD_PREVIEW_CHARS = 2000  # Extracted text echoed back by upload
+MAX_TEXT_RANGE = 200000  # Max characters returned by one text request
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+# Per-client token buckets: (capacity, seconds to refill completely).
+# RATE_LIMITING=0 turns them off, e.g. for load tests from one host.
+RATE_LIMITING = os.getenv("RATE_LIMITING", "1") != "0"
+RATE_LIMITS = {
+    "analyze": (10, 60),
+    "upload": (5, 60),
+    "search": (20, 60),
+    "delete": (20, 60),
+}
+ANALYZE_COST_CHARS = 20000  # Each block of text adds one token
+UPLOAD_COST_BYTES = 10 * 1024 * 1024  # Each block of upload adds one token
 
 # Initialize FastAPI
 app = FastAPI(
     title="CaseStar API",
     description="Legal case management system with AI document analysis",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Add Rate Limit Exception Handler
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 
 @app.on_event("startup")
 async def startup_event():
     graph_service.connect()
+    await graph_writer.start()
+    await health_prober.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # Let in-flight generations finish before the graph buffer flushes
+    await health_prober.stop()
+    await llm_slots.drain(float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 120)))
+    await graph_writer.stop()
     graph_service.close()
 
+# Uploads are charged by declared size before their body is read, and
+# uploads without a Content-Length are refused
+app.add_middleware(RateLimitMiddleware, charges={
+    "/api/upload": lambda request, size: enforce_rate_limit(
+        request, "upload", 1 + size / UPLOAD_COST_BYTES
+    ),
+})
+
 # CORS middleware for Next.js frontend
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:30000"],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],  # Restrict methods
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],  # Restrict methods
     allow_headers=["*"],
 )
 
-# Initialize ChromaDB client
+# Compress large JSON payloads (extracted text, search results)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Opt-in profiling: admin requests sending "X-Profile: 1", plus a
+# PROFILE_SAMPLE_RATE share of uploads and analyses
+app.add_middleware(
+    ProfilingMiddleware,
+    authorize=lambda headers: _is_admin(headers.get("authorization", ""))
+)
+
+# Request ids and one structured record per request, with stage timings
+app.add_middleware(RequestLogMiddleware)
+
+# Initialize ChromaDB client. Multiple workers share one Chroma server;
+# a single process may open the persist directory directly.
 try:
-    PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
-    chroma_client = chromadb.PersistentClient(path=PERSIST_DIR)
-    collection = chroma_client.get_or_create_collection(
-        name="casestar_documents"
-    )
-    logger.info(f"ChromaDB initialized successfully at {PERSIST_DIR}")
+    CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST")
+    if CHROMA_SERVER_HOST:
+        CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", 8002))
+        chroma_client = chromadb.HttpClient(
+            host=CHROMA_SERVER_HOST, port=CHROMA_SERVER_PORT
+        )
+        chroma_location = f"{CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}"
+        PERSIST_DIR = None
+    else:
+        PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+        chroma_client = chromadb.PersistentClient(path=PERSIST_DIR)
+        chroma_location = PERSIST_DIR
+    embedding_function = build_embedding_function()
+    collection = open_collection(chroma_client, embedding_function)
+    logger.info(f"ChromaDB initialized successfully at {chroma_location}")
 except Exception as e:
     logger.error(f"ChromaDB initialization failed: {e}")
     collection = None
@@ -86,33 +175,64 @@ except Exception as e:
     logger.error(f"Ollama initialization failed: {e}")
     llm = None
 
+# Dependencies are probed in the background; /health reads the results
+health_prober.register("neo4j", lambda: check_neo4j(graph_service))
+if collection is not None:
+    health_prober.register(
+        "chromadb", lambda: check_chroma(chroma_client, collection)
+    )
+if llm is not None:
+    health_prober.register(
+        "ollama", lambda: check_ollama(llm, health_prober.timeout)
+    )
+
 
 # Pydantic models
 class HealthResponse(BaseModel):
     status: str
     services: dict
+    # Latest background probe per dependency: ok, latency_ms, checked_at
+    checks: dict = {}
+
+
+# Markup that has no business in extracted legal text
+SUSPICIOUS_MARKUP = re.compile(
+    r"<script|</script|javascript:|onerror=|onclick=", re.I
+)
 
 
 class DocumentAnalysisRequest(BaseModel):
-    text: str = Field(..., max_length=MAX_TEXT_LENGTH)
+    # Either the text itself or the id returned by /api/upload
+    text: Optional[str] = Field(None, max_length=MAX_TEXT_LENGTH)
+    document_id: Optional[str] = None
     case_id: Optional[str] = None
+    filename: Optional[str] = None
+    # Bulk ingest should send "batch" so it yields to interactive use
+    priority: Literal["interactive", "batch"] = INTERACTIVE
+    # "fast" skips the LLM and returns rule-based entities only
+    mode: Literal["full", "fast"] = "full"
 
     @validator('text')
     def sanitize_text(cls, v):
-        if not v or not v.strip():
+        if v is None:
+            return v
+        if not v.strip():
             raise ValueError('Text cannot be empty')
-        # Remove potential dangerous characters
-        dangerous_chars = [
-            '<script', '</script', 'javascript:', 'onerror=', 'onclick='
-        ]
-        text_lower = v.lower()
-        for char in dangerous_chars:
-            if char in text_lower:
-                logger.warning(
-                    "Potentially dangerous content detected and removed"
-                )
+        # One case-insensitive scan instead of lowercasing a copy
+        with span("sanitization"):
+            suspicious = SUSPICIOUS_MARKUP.search(v)
+        if suspicious:
+            logger.warning(
+                "Potentially dangerous content detected and removed"
+            )
         return v.strip()
 
+    @model_validator(mode='after')
+    def text_or_document(self):
+        if (self.text is None) == (self.document_id is None):
+            raise ValueError('Provide exactly one of text or document_id')
+        return self
+
 
 class DocumentAnalysisResponse(BaseModel):
     summary: str
@@ -124,12 +244,60 @@ class DocumentAnalysisResponse(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     limit: int = 5
+    # Snippet length per hit; full text is fetched by document_id
+    max_chars: int = Field(DEFAULT_SNIPPET_CHARS, ge=20, le=5000)
+    # Re-rank a larger candidate set so near-duplicates do not crowd out
+    # other passages; lower diversity_lambda favours variety
+    diverse: bool = False
+    diversity_lambda: float = Field(DEFAULT_MMR_LAMBDA, ge=0.0, le=1.0)
 
 
 class SearchResponse(BaseModel):
     results: List[dict]
 
 
+def _entity_hints(entities: List[dict]) -> str:
+    """Prompt section listing entities already found by the rules"""
+    if not entities:
+        return ""
+    lines = "\n".join(
+        f"- {e['name']} ({e['type']})" for e in entities[:MAX_ENTITY_HINTS]
+    )
+    return (
+        "These entities were already found; list only entities missing "
+        f"from them:\n{lines}\n\n"
+    )
+
+
+def _lead_summary(text: str) -> str:
+    """Opening of a document, cut at a sentence end, for fast analysis"""
+    lead = " ".join(text[:FAST_SUMMARY_CHARS * 2].split())
+    if len(lead) <= FAST_SUMMARY_CHARS:
+        return lead
+    lead = lead[:FAST_SUMMARY_CHARS]
+    end = lead.rfind(". ")
+    if end > FAST_SUMMARY_CHARS // 2:
+        return lead[:end + 1]
+    return lead.rstrip() + "..."
+
+
+async def enforce_rate_limit(request: Request, name: str, cost: float = 1.0):
+    """Charge ``cost`` tokens to the client's bucket or raise 429"""
+    if not RATE_LIMITING:
+        return
+    capacity, period = RATE_LIMITS[name]
+    client = request.client.host if request.client else "unknown"
+    retry_after = await asyncio.to_thread(
+        rate_limiter.hit, f"{name}:{client}", capacity, period, cost
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {capacity} per {period} seconds",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
 # Routes
 @app.get("/")
 async def root():
@@ -143,83 +311,185 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint to verify all services"""
-    services = {
+    # Served from the background prober's snapshot; until its first
+    # round completes, fall back to whether each client was created
+    checks = health_prober.snapshot()
+    initialized = {
         "chromadb": collection is not None,
         "ollama": llm is not None,
-        "api": True
+        "neo4j": graph_service.driver is not None,
     }
+    services = {
+        name: checks[name]["ok"] if name in checks else ready
+        for name, ready in initialized.items()
+    }
+    services["api"] = True
 
     status = "healthy" if all(services.values()) else "degraded"
 
     return HealthResponse(
         status=status,
-        services=services
+        services=services,
+        checks=checks
     )
 
 
+async def _stored_document(document_id: str) -> dict:
+    """Metadata of an uploaded document, or 404"""
+    meta = await asyncio.to_thread(document_store.meta, document_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return meta
+
+
 @app.post("/api/analyze", response_model=DocumentAnalysisResponse)
-@limiter.limit("10/minute")
 async def analyze_document(
     request: Request,
-    analysis_request: DocumentAnalysisRequest
+    analysis_request: DocumentAnalysisRequest,
+    background_tasks: BackgroundTasks
 ):
     """Analyze legal document text using AI"""
-    if not llm:
+    text = analysis_request.text
+    filename = analysis_request.filename
+    if text is None:
+        # Charge before touching the store; the length is charged once
+        # it is known
+        await enforce_rate_limit(request, "analyze")
+        meta = await _stored_document(analysis_request.document_id)
+        if meta["chars"] > MAX_TEXT_LENGTH:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Document too long. Max {MAX_TEXT_LENGTH} characters"
+            )
+        filename = filename or meta["filename"]
+        cost = 1 + meta["chars"] / ANALYZE_COST_CHARS
+        await enforce_rate_limit(request, "analyze", cost - 1)
+    else:
+        cost = 1 + len(text) / ANALYZE_COST_CHARS
+        await enforce_rate_limit(request, "analyze", cost)
+
+    fast = analysis_request.mode == "fast"
+    if not llm and not fast:
         raise HTTPException(
             status_code=503,
             detail="Ollama service not available"
         )
+    if not fast:
+        # Refuse now rather than time out in the queue; fast analysis
+        # never touches the LLM and is always admitted
+        try:
+            llm_scheduler.admit(analysis_request.priority)
+        except LLMOverloaded as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"AI service busy: {e}",
+                headers={"Retry-After": str(e.retry_after)}
+            )
 
-    try:
-        # Generate summary using Ollama
-        prompt = (
-            "Analyze the following legal document and provide the output "
-            "in strict JSON format with the following keys:\n"
-            "- \"summary\": A brief summary of the document.\n"
-            "- \"key_points\": A list of 3-5 main points.\n"
-            "- \"entities\": A list of objects with \"name\" and \"type\" "
-            "(e.g., Person, Organization, Date).\n\n"
-            "Document:\n"
-            f"{analysis_request.text[:10000]}\n\n"
-            "Respond ONLY with the JSON object. "
-            "Do not add any markdown formatting or extra text."
+    if text is None:
+        text = await run_in_thread(
+            "store", document_store.get_text, analysis_request.document_id
         )
+        if text is None or not text.strip():
+            raise HTTPException(status_code=404, detail="Document not found")
+        text = text.strip()
 
-        response_text = llm.invoke(prompt)
-
-        # Clean up response if it contains markdown code blocks
-        clean_response = re.sub(
-            r'```json\s*|\s*```', '', response_text
-        ).strip()
+    try:
+        # Dates, money, case numbers, statutes and known parties, in
+        # milliseconds and without the LLM
+        rule_entities = await run_in_thread(
+            "entities", extract_rule_entities, text, gazetteer
+        )
 
-        try:
-            parsed_response = json.loads(clean_response)
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            logger.warning(
-                "Failed to parse JSON response from LLM, falling back to raw"
-            )
+        # False once the LLM response had to be replaced by its raw text
+        structured = True
+        if fast:
             parsed_response = {
-                "summary": response_text[:500],
-                "key_points": ["Could not parse structured analysis"],
+                "summary": _lead_summary(text),
+                "key_points": [],
                 "entities": []
             }
+        else:
+            # Generate summary using Ollama
+            prompt = (
+                "Analyze the following legal document and provide the output "
+                "in strict JSON format with the following keys:\n"
+                "- \"summary\": A brief summary of the document.\n"
+                "- \"key_points\": A list of 3-5 main points.\n"
+                "- \"entities\": A list of objects with \"name\" and "
+                "\"type\" (e.g., Person, Organization, Date).\n\n"
+                f"{_entity_hints(rule_entities)}"
+                "Document:\n"
+                f"{text[:10000]}\n\n"
+                "Respond ONLY with the JSON object. "
+                "Do not add any markdown formatting or extra text."
+            )
+
+            # Queue fairly per case (or client) behind other LLM work
+            flow = analysis_request.case_id or (
+                request.client.host if request.client else "unknown"
+            )
+            # Stop generating (and free the slot) if the client goes away
+            with span("llm"):
+                response_text = await cancel_on_disconnect(
+                    request,
+                    llm_scheduler.run(
+                        generation_fn(llm), prompt,
+                        flow=flow,
+                        priority=analysis_request.priority,
+                        cost=cost
+                    )
+                )
+
+            # Clean up response if it contains markdown code blocks
+            clean_response = re.sub(
+                r'```json\s*|\s*```', '', response_text
+            ).strip()
+
+            try:
+                parsed_response = json.loads(clean_response)
+            except json.JSONDecodeError:
+                # Fallback if JSON parsing fails
+                logger.warning(
+                    "Failed to parse JSON response from LLM, "
+                    "falling back to raw"
+                )
+                parsed_response = {
+                    "summary": response_text[:500],
+                    "key_points": ["Could not parse structured analysis"],
+                    "entities": []
+                }
+                structured = False
 
         # Store in ChromaDB if available with secure ID generation
-        if collection and analysis_request.case_id:
+        doc_id = None
+        if analysis_request.case_id:
             # Generate secure unique ID using UUID
             doc_id = f"{analysis_request.case_id}_{uuid.uuid4().hex}"
-            collection.add(
-                documents=[analysis_request.text],
+        if collection and doc_id:
+            # Search returns snippets; full text is served from the store
+            document_id = analysis_request.document_id
+            if document_id is None:
+                # Re-analyzing the same text in a case reuses its document
+                stored = await run_in_thread(
+                    "store", document_store.put, text, filename,
+                    analysis_request.case_id
+                )
+                document_id = stored["document_id"]
+            # Embedding the text is CPU-bound; keep it off the event loop
+            await run_in_thread("chroma", partial(
+                collection.add,
+                documents=[text],
                 metadatas=[
                     {
                         "case_id": analysis_request.case_id,
+                        "document_id": document_id,
                         "type": "document",
                         "timestamp": datetime.now().isoformat()
                     }
                 ],
                 ids=[doc_id]
-            )
+            ))
 
         # Ensure summary is a string, defaulting to empty string if None
         summary_text = parsed_response.get("summary")
@@ -238,13 +508,67 @@ async def analyze_document(
             str(kp) if not isinstance(kp, str) else kp for kp in key_points
         ]
 
+        llm_entities = parsed_response.get("entities", [])
+        if not isinstance(llm_entities, list):
+            llm_entities = []
+        # Parties the LLM keeps finding are matched locally from now on
+        for entity in llm_entities:
+            if isinstance(entity, dict) and entity.get("name"):
+                gazetteer.learn(
+                    str(entity["name"]), str(entity.get("type", "Entity"))
+                )
+        entities = merge_entities(rule_entities, llm_entities)
+
+        if doc_id:
+            # Persisted by the write-behind buffer, off the request path
+            with span("neo4j"):
+                graph_writer.enqueue_case(
+                    analysis_request.case_id, analysis_request.case_id
+                )
+                graph_writer.enqueue_document(
+                    analysis_request.case_id,
+                    doc_id,
+                    filename,
+                    summary_text,
+                    entities
+                )
+            # Dated events for the case timeline, without the LLM
+            background_tasks.add_task(
+                timeline_index.update,
+                analysis_request.case_id,
+                doc_id,
+                text
+            )
+        if (doc_id and not fast and structured
+                and isinstance(parsed_response.get("summary"), str)):
+            # Fold this document into the case's rolling summary; raw
+            # fallback text must never become part of it
+            background_tasks.add_task(
+                case_summarizer.update,
+                analysis_request.case_id,
+                doc_id,
+                summary_text,
+                key_points,
+                llm
+            )
+
         return DocumentAnalysisResponse(
             summary=summary_text,
             key_points=key_points,
-            entities=parsed_response.get("entities", []),
+            entities=entities,
             case_id=analysis_request.case_id
         )
 
+    except ClientDisconnected:
+        logger.info("Client disconnected, analysis cancelled")
+        # Nobody is listening; 499 only shows up in access logs
+        return Response(status_code=499)
+    except LLMDeadlineExceeded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service busy: {e}",
+            headers={"Retry-After": "30"}
+        )
     except Exception as e:
         logger.error(f"Analysis error: {e}")
         error_msg = str(e)
@@ -261,9 +585,9 @@ async def analyze_document(
 
 
 @app.post("/api/upload")
-@limiter.limit("5/minute")
-async def upload_document(request: Request, file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...)):
     """Upload and process document files with security validation"""
+    # Rate limited by RateLimitMiddleware, before the body was read
 
     # Validate filename
     if not file.filename:
@@ -289,7 +613,8 @@ async def upload_document(request: Request, file: UploadFile = File(...)):
         header = await file.read(2048)
         await file.seek(0)  # Reset cursor
 
-        kind = filetype.guess(header)
+        with span("sanitization"):
+            kind = filetype.guess(header)
 
         # Validate magic bytes
         if kind is None and file_ext != '.txt':
@@ -321,15 +646,51 @@ async def upload_document(request: Request, file: UploadFile = File(...)):
                 detail=f"File too large. Max {MAX_FILE_SIZE/(1024*1024):.0f}MB"
             )
 
-        # Process document using the service
-        extracted_text = await process_document_content(safe_filename, content)
+        # Repeat uploads of the same bytes skip parsing entirely. Hashing,
+        # cache I/O and parsing all run in worker threads.
+        cache_key = None
+        extracted_text = None
+        if file_ext != '.txt':
+            cache_key, extracted_text = await run_in_thread(
+                "cache", extraction_cache.lookup, content, file_ext
+            )
+        cached = extracted_text is not None
+        extraction_error = None
+
+        if not cached:
+            # Process document using the service
+            try:
+                extracted_text = await process_document_content(
+                    safe_filename, content
+                )
+            except ExtractionError as e:
+                extracted_text = ""
+                extraction_error = str(e)
+            if cache_key and extraction_error is None:
+                await run_in_thread(
+                    "cache", extraction_cache.put, cache_key, extracted_text
+                )
+
+        # Keep the full text server-side; the client gets a handle and a
+        # preview, and fetches ranges or pages as it needs them
+        document = None
+        if extracted_text.strip():
+            document = await run_in_thread(
+                "store", document_store.put, extracted_text, safe_filename
+            )
 
         return {
             "filename": safe_filename,
             "size": len(content),
             "status": "uploaded",
             "message": "File uploaded and processed successfully",
-            "extracted_text": extracted_text
+            "document_id": document["document_id"] if document else None,
+            "chars": len(extracted_text),
+            "pages": len(document["pages"]) if document else 0,
+            "extracted_text": extracted_text[:UPLOAD_PREVIEW_CHARS],
+            "text_truncated": len(extracted_text) > UPLOAD_PREVIEW_CHARS,
+            "cached": cached,
+            "error": extraction_error
         }
 
     except HTTPException:
@@ -340,10 +701,132 @@ async def upload_document(request: Request, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail="Upload failed")
 
 
+@app.get("/api/documents/{document_id}/text")
+async def get_document_text(
+    document_id: str,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    page: Optional[int] = Query(None, ge=1)
+):
+    """A page or character range of an uploaded document's text"""
+    meta = await _stored_document(document_id)
+    chars = meta["chars"]
+    pages = meta["pages"]
+    if page is not None:
+        if page > len(pages):
+            raise HTTPException(status_code=404, detail="Page not found")
+        start = pages[page - 1]
+        end = pages[page] if page < len(pages) else chars
+    else:
+        start = min(start, chars)
+        end = chars if end is None else min(end, chars)
+        if start > end:
+            raise HTTPException(
+                status_code=400, detail="start must not be after end"
+            )
+    if end - start > MAX_TEXT_RANGE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Range too large. Max {MAX_TEXT_RANGE} characters"
+        )
+
+    text = await asyncio.to_thread(
+        document_store.get_range, document_id, start, end
+    )
+    if text is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {
+        "document_id": document_id,
+        "start": start,
+        "end": end,
+        "page": page,
+        "total_chars": chars,
+        "total_pages": len(pages),
+        "text": text
+    }
+
+
+@app.delete("/api/documents/{document_id}", status_code=204)
+async def delete_document(request: Request, document_id: str):
+    """Forget an uploaded document; shared text is kept while referenced"""
+    await enforce_rate_limit(request, "delete")
+    _require_admin(request)
+    if not await asyncio.to_thread(document_store.delete, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return Response(status_code=204)
+
+
+def _format_search_results(results: dict, search_request: SearchRequest):
+    """Trim each hit to a snippet around its best-matching passage"""
+    formatted_results = []
+    if results['documents'] and results['documents'][0]:
+        ids = results.get('ids')
+        for i, doc in enumerate(results['documents'][0]):
+            meta = (
+                results['metadatas'][0][i] if results['metadatas'] else {}
+            )
+            dist = (
+                results['distances'][0][i]
+                if results['distances'] else None
+            )
+            snippet = make_snippet(
+                doc, search_request.query, search_request.max_chars
+            )
+            formatted_results.append({
+                "id": ids[0][i] if ids else None,
+                "document_id": (meta or {}).get("document_id"),
+                "text": snippet["text"],
+                "start": snippet["start"],
+                "end": snippet["end"],
+                "highlights": snippet["highlights"],
+                "chars": len(doc),
+                "metadata": meta,
+                "distance": dist
+            })
+    return formatted_results
+
+
+async def _diverse_query(search_request: SearchRequest, fetch: int) -> dict:
+    """Over-fetch candidates with embeddings and re-rank them by MMR"""
+    query_embedding = (await asyncio.to_thread(
+        embedding_function, [search_request.query]
+    ))[0]
+    started = time.perf_counter()
+    results = await run_in_thread("chroma", partial(
+        collection.query,
+        query_embeddings=[query_embedding],
+        n_results=fetch,
+        include=["documents", "metadatas", "distances", "embeddings"]
+    ))
+    query_latency.record(time.perf_counter() - started)
+
+    embeddings = results.get("embeddings")
+    if embeddings is None or not len(embeddings[0]):
+        return results
+    order = await asyncio.to_thread(
+        mmr_select,
+        query_embedding,
+        embeddings[0],
+        search_request.limit,
+        search_request.diversity_lambda
+    )
+    return {
+        key: [[results[key][0][i] for i in order]] if results.get(key)
+        else None
+        for key in ("ids", "documents", "metadatas", "distances")
+    }
+
+
 @app.post("/api/search", response_model=SearchResponse)
-@limiter.limit("20/minute")
 async def search_documents(request: Request, search_request: SearchRequest):
     """Search documents in ChromaDB"""
+    fetch = search_request.limit
+    if search_request.diverse:
+        fetch = min(
+            search_request.limit * MMR_FETCH_FACTOR, MAX_MMR_CANDIDATES
+        )
+    await enforce_rate_limit(request, "search", 1 + fetch / 20)
+
     if not collection:
         raise HTTPException(
             status_code=503,
@@ -351,27 +834,21 @@ async def search_documents(request: Request, search_request: SearchRequest):
         )
 
     try:
-        results = collection.query(
-            query_texts=[search_request.query],
-            n_results=search_request.limit
+        if search_request.diverse:
+            results = await _diverse_query(search_request, fetch)
+        else:
+            started = time.perf_counter()
+            # Embeds the query, so it runs off the event loop
+            results = await run_in_thread("chroma", partial(
+                collection.query,
+                query_texts=[search_request.query],
+                n_results=search_request.limit
+            ))
+            query_latency.record(time.perf_counter() - started)
+
+        formatted_results = await asyncio.to_thread(
+            _format_search_results, results, search_request
         )
-
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                meta = (
-                    results['metadatas'][0][i] if results['metadatas'] else {}
-                )
-                dist = (
-                    results['distances'][0][i]
-                    if results['distances'] else None
-                )
-                formatted_results.append({
-                    "text": doc,
-                    "metadata": meta,
-                    "distance": dist
-                })
-
         return SearchResponse(results=formatted_results)
 
     except Exception as e:
@@ -382,18 +859,174 @@ async def search_documents(request: Request, search_request: SearchRequest):
         )
 
 
+def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against a resource"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in tags or "*" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
 @app.get("/api/cases")
-async def list_cases():
-    """List all cases from Neo4j"""
-    cases = graph_service.get_all_cases()
+async def list_cases(request: Request):
+    """List all cases from Neo4j, answering conditional GETs with 304"""
+    stamp = None
+    cached = case_list_cache.get()
+    if cached:
+        cases, *stamp = cached
+    else:
+        version = case_list_cache.version
+        cases = graph_service.get_all_cases()
+        if cases is None:
+            # Neo4j is unavailable: answer, but never cache or validate it
+            cases = []
+        else:
+            stamp = case_list_cache.put(cases, version)
+
+    headers = {"Cache-Control": "no-cache"}
+    if stamp:
+        etag, last_modified = stamp
+        headers["ETag"] = etag
+        headers["Last-Modified"] = format_datetime(
+            datetime.fromtimestamp(last_modified, timezone.utc), usegmt=True
+        )
+        if _not_modified(request, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+
+    return ORJSONResponse(
+        {
+            "cases": cases,
+            "total": len(cases),
+            "message": "Cases retrieved successfully"
+        },
+        headers=headers
+    )
+
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """LLM queue depth, wait times and dropped requests for this worker"""
+    return llm_scheduler.stats()
+
+
+def _is_admin(authorization: str) -> bool:
+    """Whether an Authorization header carries ADMIN_TOKEN"""
+    expected = os.getenv("ADMIN_TOKEN")
+    scheme, _, supplied = authorization.partition(" ")
+    return bool(expected) and scheme.lower() == "bearer" and \
+        hmac.compare_digest(supplied.strip().encode(), expected.encode())
+
+
+def _require_admin(request: Request):
+    """Allow only requests bearing ADMIN_TOKEN; disabled when it is unset"""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _is_admin(request.headers.get("authorization", "")):
+        raise HTTPException(
+            status_code=401,
+            detail="Unauthorized",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@app.get("/api/admin/index/stats")
+async def get_index_stats(request: Request):
+    """Vector collection size, HNSW settings and query latency"""
+    _require_admin(request)
+    if not collection:
+        raise HTTPException(
+            status_code=503,
+            detail="ChromaDB service not available"
+        )
+    return await asyncio.to_thread(index_stats, collection, PERSIST_DIR)
+
+
+@app.get("/api/cases/{case_id}/summary")
+async def get_case_summary(request: Request, case_id: str):
+    """Return the rolling summary of all documents analyzed in a case"""
+    summary = await asyncio.to_thread(case_summary_store.get, case_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No summary for case")
+
+    etag = f'"{summary["version"]}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(
+            datetime.fromtimestamp(summary["updated"], timezone.utc),
+            usegmt=True
+        ),
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, summary["updated"]):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(summary, headers=headers)
+
+
+@app.get("/api/cases/{case_id}/timeline")
+async def get_case_timeline(
+    case_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(500, ge=1, le=MAX_TIMELINE_EVENTS)
+):
+    """Dated events found in a case's documents, oldest first"""
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=400, detail="start must not be after end"
+        )
+    events = await asyncio.to_thread(
+        timeline_index.query, case_id, start, end, limit
+    )
     return {
-        "cases": cases,
-        "total": len(cases),
-        "message": "Cases retrieved successfully"
+        "case_id": case_id,
+        "events": events,
+        "truncated": len(events) == limit
     }
 
 
+@app.get("/api/cases/{case_id}/graph")
+async def get_case_graph(
+    case_id: str,
+    depth: int = Query(2, ge=1, le=MAX_SUBGRAPH_DEPTH),
+    limit: int = Query(500, ge=1, le=MAX_GRAPH_EDGES)
+):
+    """Return a case's documents, entities and relationships"""
+    graph = case_graph_cache.get(case_id, depth, limit)
+    if graph is not None:
+        return graph
+
+    if not graph_service.driver:
+        raise HTTPException(
+            status_code=503,
+            detail="Graph database not available"
+        )
+
+    version = case_graph_cache.version(case_id)
+    try:
+        graph = await asyncio.to_thread(
+            graph_service.get_case_subgraph, case_id, depth, limit
+        )
+    except Exception:
+        raise HTTPException(status_code=500, detail="Graph query failed")
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    case_graph_cache.put(case_id, depth, limit, graph, version)
+    return graph
+
+
 if __name__ == "__main__":
+    # Production was dispatched at the top of this module
     import uvicorn
     port = int(os.getenv("PORT", 8001))
-    uvicorn.run(app, host="0.0.0.0", port=port, reload=True)
+    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
@@ -0,0 +1,78 @@
+"""Benchmark the streaming DOCX extractor against python-docx.
+
+Usage: python scripts/bench_docx_extraction.py [paragraphs] [repeats]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+from docx import Document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.text_extractor import (  # noqa: E402
+    _extract_docx_object_model,
+    _extract_docx_streaming
+)
+
+
+def build_contract(paragraphs: int) -> bytes:
+    """Build a contract-like DOCX with a table every 50 paragraphs"""
+    doc = Document()
+    doc.add_heading("Master Services Agreement", 0)
+    for i in range(paragraphs):
+        doc.add_paragraph(
+            f"{i + 1}. The Supplier shall deliver the Services described in "
+            "Schedule A in accordance with the Service Levels, and the "
+            "Customer shall pay the Fees within thirty (30) days of invoice."
+        )
+        if i % 50 == 49:
+            table = doc.add_table(rows=5, cols=4)
+            for row in table.rows:
+                for j, cell in enumerate(row.cells):
+                    cell.text = f"Item {i}-{j}"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(extract, content: bytes, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        extract(content)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    content = build_contract(paragraphs)
+    print(f"Document: {paragraphs} paragraphs, {len(content) / 1024:.0f} KB")
+
+    results = {}
+    for name, extract in (
+        ("python-docx", _extract_docx_object_model),
+        ("streaming", _extract_docx_streaming),
+    ):
+        best, peak = measure(extract, content, repeats)
+        results[name] = best
+        print(
+            f"{name:>12}: best {best * 1000:8.1f} ms, "
+            f"peak memory {peak / (1024 * 1024):6.1f} MB"
+        )
+
+    print(f"Speedup: {results['python-docx'] / results['streaming']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark JSON serialization and compression on large API payloads.
+
+Compares the default JSONResponse with ORJSONResponse, and the wire size
+of identity, gzip and brotli encodings, for upload- and search-shaped
+responses between 1 and 10 MB.
+
+Usage: python scripts/bench_serialization.py
+"""
+import gzip
+import os
+import random
+import sys
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = (
+    "plaintiff defendant agreement breach contract party shall notice "
+    "court jurisdiction damages hereby witness clause payment termination "
+    "obligation indemnify liability warranty schedule exhibit pursuant"
+).split()
+
+
+def legal_text(chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = []
+    total = 0
+    while total < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def upload_payload(size: int) -> dict:
+    return {
+        "filename": "contract.pdf",
+        "size": size,
+        "status": "uploaded",
+        "message": "File uploaded and processed successfully",
+        "extracted_text": legal_text(size),
+    }
+
+
+def search_payload(size: int) -> dict:
+    per_hit = 100000
+    return {"results": [
+        {
+            "text": legal_text(per_hit, seed=i),
+            "metadata": {"case_id": f"case-{i}", "type": "document"},
+            "distance": 0.1 * i,
+        }
+        for i in range(max(1, size // per_hit))
+    ]}
+
+
+def best_of(fn, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    mb = 1024 * 1024
+    print(
+        f"{'payload':<14}{'json ms':>9}{'orjson ms':>11}"
+        f"{'identity':>11}{'gzip':>10}{'br':>10}{'gzip ms':>9}{'br ms':>8}"
+    )
+    for shape, build in (("upload", upload_payload),
+                         ("search", search_payload)):
+        for size in (1 * mb, 5 * mb, 10 * mb):
+            payload = build(size)
+            json_time = best_of(lambda: JSONResponse(payload))
+            orjson_time = best_of(lambda: ORJSONResponse(payload))
+
+            body = ORJSONResponse(payload).body
+            gzip_time = best_of(lambda: gzip.compress(body, 4), 3)
+            gzipped = len(gzip.compress(body, 4))
+            if brotli:
+                br_time = best_of(lambda: brotli.compress(body, quality=4), 3)
+                br_size = f"{len(brotli.compress(body, quality=4)) // 1024}K"
+                br_ms = f"{br_time * 1000:8.1f}"
+            else:
+                br_size, br_ms = "n/a", f"{'n/a':>8}"
+
+            print(
+                f"{shape + ' ' + str(size // mb) + 'MB':<14}"
+                f"{json_time * 1000:9.1f}{orjson_time * 1000:11.1f}"
+                f"{len(body) // 1024:>10}K{gzipped // 1024:>9}K{br_size:>10}"
+                f"{gzip_time * 1000:9.1f}{br_ms}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Fake Ollama server for load tests without a model.
+
+Answers /api/generate and /api/chat with a canned response, streamed
+token by token after a time to first token and a per-token delay, and
+fails a configurable share of requests. /api/tags, /api/ps and
+/api/version report the configured model so health probes pass.
+
+Usage:
+    python scripts/fake_ollama.py --port 11434 --ttft 0.3 --token-latency 0.02
+    OLLAMA_HOST=http://127.0.0.1:11434 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = {
+    "summary": "The parties entered into a lease agreement; the tenant "
+               "alleges the landlord failed to make required repairs.",
+    "key_points": [
+        "Lease signed on January 1, 2023 for a term of two years",
+        "Tenant withheld rent after repeated repair requests",
+        "Landlord served a notice of termination on March 15, 2023",
+    ],
+    "entities": [
+        {"name": "Acme Properties LLC", "type": "Organization"},
+        {"name": "Jane Doe", "type": "Person"},
+        {"name": "January 1, 2023", "type": "Date"},
+    ],
+}
+
+# Roughly how a tokenizer splits text: words with their leading space
+_TOKEN = re.compile(r"\s*\S{1,6}")
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(text)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args):
+        super().__init__(address, Handler)
+        self.args = args
+        self.tokens = tokenize(args.response)
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.served = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.args.error_rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        model = {
+            "name": self.server.args.model,
+            "model": self.server.args.model,
+            "size": 4_900_000_000,
+            "details": {"family": "llama", "parameter_size": "8B"},
+        }
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [model]})
+        elif self.path == "/api/ps":
+            self._send_json(200, {"models": [model]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/":
+            self._send_json(200, {"status": "Ollama is running"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        with server.lock:
+            server.active += 1
+        try:
+            self._generate(request, chat=self.path == "/api/chat")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled; a real server stops generating too
+            pass
+        finally:
+            with server.lock:
+                server.active -= 1
+                server.served += 1
+
+    def _generate(self, request: dict, chat: bool):
+        args = self.server.args
+        started = time.perf_counter()
+        time.sleep(args.ttft)
+        if self.server.should_fail():
+            self._send_json(500, {"error": "fake failure"})
+            return
+
+        model = request.get("model", args.model)
+        tokens = self.server.tokens
+
+        def chunk(text: str, done: bool) -> dict:
+            body = {"model": model, "created_at": _now(), "done": done}
+            if chat:
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+            if done:
+                elapsed = int((time.perf_counter() - started) * 1e9)
+                body.update({
+                    "done_reason": "stop",
+                    "total_duration": elapsed,
+                    "load_duration": 0,
+                    "prompt_eval_count": len(
+                        str(request.get("prompt", request.get("messages")))
+                    ) // 4,
+                    "eval_count": len(tokens),
+                    "eval_duration": elapsed,
+                })
+            return body
+
+        if request.get("stream", True) is False:
+            time.sleep(args.token_latency * len(tokens))
+            final = chunk("".join(tokens), True)
+            self._send_json(200, final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            self._write_chunk(chunk(token, False))
+            time.sleep(args.token_latency)
+        self._write_chunk(chunk("", True))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, body: dict):
+        data = json.dumps(body).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="llama3.1:8b")
+    parser.add_argument(
+        "--ttft", type=float, default=0.3,
+        help="seconds before the first token"
+    )
+    parser.add_argument(
+        "--token-latency", type=float, default=0.02,
+        help="seconds between tokens"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0,
+        help="share of generations answered with HTTP 500"
+    )
+    parser.add_argument(
+        "--response-file",
+        help="file with the text to return (default: canned analysis JSON)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.response_file:
+        with open(args.response_file, encoding="utf-8") as f:
+            args.response = f.read()
+    else:
+        args.response = json.dumps(DEFAULT_RESPONSE)
+
+    server = FakeOllama((args.host, args.port), args)
+    print(
+        f"Fake Ollama serving {args.model} on http://{args.host}:{args.port} "
+        f"({len(server.tokens)} tokens, ttft {args.ttft}s, "
+        f"{args.token_latency}s/token, {args.error_rate:.0%} errors)",
+        file=sys.stderr
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.served} generations", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""End-to-end load test for the CaseStar API.
+
+Closed-loop workers upload synthetic legal documents as text, PDF and
+DOCX files (in proportions set by --formats), analyze them by document
+id and run searches, in proportions set by --mix, and the run ends with
+throughput, error counts and p50/p95/p99 latency per endpoint. Pair it
+with scripts/fake_ollama.py to measure the API rather than the model,
+and disable per-client rate limits on the server under test.
+``python main.py`` listens on $PORT (8001):
+
+    python scripts/fake_ollama.py &
+    RATE_LIMITING=0 OLLAMA_HOST=http://127.0.0.1:11434 python main.py
+    python scripts/load_test.py --base-url http://127.0.0.1:8001 \
+        --duration 60 --concurrency 16
+
+Usage: python scripts/load_test.py [--base-url URL] [--duration S]
+       [--concurrency N] [--mix upload=1,analyze=2,search=4]
+       [--formats txt=3,pdf=1,docx=1] [--json]
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zipfile
+from collections import defaultdict
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "plaintiff defendant agreement breach contract party shall notice "
+    "court jurisdiction damages hereby witness clause payment termination "
+    "obligation indemnify liability warranty schedule exhibit pursuant "
+    "lease tenant landlord premises rent deposit repair default remedy"
+).split()
+PARTIES = [
+    "Acme Properties LLC", "Jane Doe", "John Smith", "Globex Corporation",
+    "Initech Inc.", "Big Company LLC",
+]
+MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]
+
+# (share of documents, characters): letters, contracts, long filings
+DOCUMENT_MIX = [(0.5, 2_000), (0.35, 20_000), (0.15, 80_000)]
+SEARCH_QUERIES = [
+    "breach of lease", "termination notice", "security deposit",
+    "indemnification clause", "repair obligations", "payment default",
+    "jurisdiction of the court", "damages for late rent",
+]
+DEFAULT_MIX = "upload=1,analyze=2,search=4"
+DEFAULT_FORMATS = "txt=3,pdf=1,docx=1"
+CONTENT_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument"
+            ".wordprocessingml.document",
+}
+PDF_LINE_CHARS = 90
+PDF_PAGE_LINES = 60
+
+
+def legal_text(chars: int, rng: random.Random) -> str:
+    """Sentences of legal vocabulary with parties, dates and amounts"""
+    sentences = []
+    total = 0
+    while total < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        words.insert(rng.randrange(len(words)), rng.choice(PARTIES))
+        if rng.random() < 0.3:
+            words.append(
+                f"on {rng.choice(MONTHS)} {rng.randint(1, 28)}, "
+                f"{rng.randint(2015, 2024)}"
+            )
+        if rng.random() < 0.2:
+            words.append(f"for ${rng.randint(1, 500) * 100:,}")
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        total += len(sentence) + 1
+        if rng.random() < 0.1:
+            sentences.append("\n\n")
+    return " ".join(sentences)[:chars]
+
+
+def document_size(rng: random.Random) -> int:
+    roll = rng.random()
+    for share, size in DOCUMENT_MIX:
+        if roll < share:
+            return size
+        roll -= share
+    return DOCUMENT_MIX[-1][1]
+
+
+def pdf_bytes(text: str) -> bytes:
+    """A minimal PDF with the text laid out in Helvetica, page by page"""
+    lines = []
+    for paragraph in text.split("\n"):
+        while paragraph:
+            lines.append(paragraph[:PDF_LINE_CHARS])
+            paragraph = paragraph[PDF_LINE_CHARS:]
+    pages = [
+        lines[i:i + PDF_PAGE_LINES]
+        for i in range(0, len(lines), PDF_PAGE_LINES)
+    ] or [[]]
+
+    # 1: catalog, 2: page tree, 3: font, then a page and its content each
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 "
+               b"/BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        shown = " T* ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(")
+            .replace(")", "\\)") + ") Tj"
+            for line in page
+        )
+        stream = f"BT /F1 10 Tf 12 TL 50 750 Td {shown} ET".encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {len(objects) + 2} 0 R >>".encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream
+            + b"\nendstream"
+        )
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = (
+        f"<< /Type /Pages /Kids [{' '.join(kids)}] "
+        f"/Count {len(kids)} >>".encode()
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def docx_bytes(text: str) -> bytes:
+    """A minimal DOCX with one paragraph per blank-line separated block"""
+    body = "".join(
+        f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(block.strip())}"
+        f"</w:t></w:r></w:p>"
+        for block in text.split("\n\n")
+    )
+    ns = "http://schemas.openxmlformats.org"
+    parts = {
+        "[Content_Types].xml": (
+            f'<Types xmlns="{ns}/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="'
+            'application/vnd.openxmlformats-officedocument.'
+            'wordprocessingml.document.main+xml"/></Types>'
+        ),
+        "_rels/.rels": (
+            f'<Relationships xmlns="{ns}/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{ns}/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/>'
+            '</Relationships>'
+        ),
+        "word/document.xml": (
+            f'<w:document xmlns:w="{ns}/wordprocessingml/2006/main">'
+            f"<w:body>{body}</w:body></w:document>"
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in parts.items():
+            archive.writestr(name, xml)
+    return buffer.getvalue()
+
+
+def encode_document(text: str, file_type: str) -> bytes:
+    if file_type == "pdf":
+        return pdf_bytes(text)
+    if file_type == "docx":
+        return docx_bytes(text)
+    return text.encode()
+
+
+def parse_mix(mix: str, known=("upload", "analyze", "search"),
+              option: str = "--mix") -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(known)
+    if unknown:
+        raise SystemExit(f"Unknown names in {option}: {sorted(unknown)}")
+    return weights
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, status: int, seconds: float):
+        with self.lock:
+            self.statuses[endpoint][status] += 1
+            if 200 <= status < 300:
+                self.latencies[endpoint].append(seconds)
+
+    def report(self, elapsed: float) -> dict:
+        report = {}
+        for endpoint in sorted(self.statuses):
+            ordered = sorted(self.latencies[endpoint])
+            statuses = dict(self.statuses[endpoint])
+            ok = len(ordered)
+
+            def pct(q):
+                if not ordered:
+                    return None
+                return round(ordered[min(len(ordered) - 1,
+                                         int(len(ordered) * q))] * 1000, 1)
+
+            report[endpoint] = {
+                "requests": sum(statuses.values()),
+                "ok": ok,
+                "errors": {str(s): n for s, n in statuses.items()
+                           if not 200 <= s < 300},
+                "throughput_rps": round(ok / elapsed, 2),
+                "p50_ms": pct(0.50),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            }
+        return report
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = args.base_url.rstrip("/")
+        self.weights = parse_mix(args.mix)
+        self.formats = parse_mix(args.formats, CONTENT_TYPES, "--formats")
+        self.stats = Stats()
+        self.documents = []
+        self.documents_lock = threading.Lock()
+        self.stop_at = 0.0
+
+    def _request(self, endpoint: str, method: str, path: str,
+                 body: bytes = None, content_type: str = None):
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method
+        )
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.args.timeout
+            ) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            payload = b""
+            status = 0  # No response
+        self.stats.record(endpoint, status, time.perf_counter() - started)
+        if 200 <= status < 300 and payload:
+            return json.loads(payload)
+        return None
+
+    def upload(self, rng: random.Random):
+        text = legal_text(document_size(rng), rng)
+        file_type = rng.choices(
+            list(self.formats), list(self.formats.values())
+        )[0]
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; '
+            f'filename="doc-{boundary[:8]}.{file_type}"\r\n'
+            f"Content-Type: {CONTENT_TYPES[file_type]}\r\n\r\n"
+        ).encode() + encode_document(text, file_type) + (
+            f"\r\n--{boundary}--\r\n".encode()
+        )
+        result = self._request(
+            f"upload_{file_type}", "POST", "/api/upload", body,
+            f"multipart/form-data; boundary={boundary}"
+        )
+        if result and result.get("document_id"):
+            with self.documents_lock:
+                self.documents.append(result["document_id"])
+
+    def analyze(self, rng: random.Random):
+        with self.documents_lock:
+            document_id = rng.choice(self.documents) if self.documents \
+                else None
+        if document_id is None:
+            self.upload(rng)
+            return
+        fast = rng.random() < self.args.fast_ratio
+        body = {
+            "document_id": document_id,
+            "case_id": f"load-case-{rng.randrange(self.args.cases)}",
+            "mode": "fast" if fast else "full",
+        }
+        self._request(
+            "analyze_fast" if fast else "analyze", "POST", "/api/analyze",
+            json.dumps(body).encode(), "application/json"
+        )
+
+    def search(self, rng: random.Random):
+        body = {
+            "query": rng.choice(SEARCH_QUERIES),
+            "limit": 10,
+            "diverse": rng.random() < 0.25,
+        }
+        self._request(
+            "search", "POST", "/api/search",
+            json.dumps(body).encode(), "application/json"
+        )
+
+    def worker(self, seed: int):
+        rng = random.Random(seed)
+        names = list(self.weights)
+        weights = [self.weights[n] for n in names]
+        while time.monotonic() < self.stop_at:
+            getattr(self, rng.choices(names, weights)[0])(rng)
+
+    def run(self) -> dict:
+        self.stop_at = time.monotonic() + self.args.duration
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self.worker, args=(self.args.seed + i,))
+            for i in range(self.args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats.report(time.perf_counter() - started)
+
+
+def print_report(report: dict):
+    print(
+        f"{'endpoint':<14}{'ok':>7}{'errors':>18}{'req/s':>9}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    for endpoint, row in report.items():
+        errors = ",".join(f"{s}:{n}" for s, n in row["errors"].items()) or "-"
+
+        def fmt(value):
+            return "-" if value is None else f"{value:.1f}"
+
+        print(
+            f"{endpoint:<14}{row['ok']:>7}{errors:>18}"
+            f"{row['throughput_rps']:>9.2f}{fmt(row['p50_ms']):>10}"
+            f"{fmt(row['p95_ms']):>10}{fmt(row['p99_ms']):>10}"
+            f"{fmt(row['max_ms']):>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CaseStar load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument(
+        "--formats", default=DEFAULT_FORMATS,
+        help="relative share of txt, pdf and docx uploads"
+    )
+    parser.add_argument(
+        "--fast-ratio", type=float, default=0.2,
+        help="share of analyses sent in fast mode"
+    )
+    parser.add_argument("--cases", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(
+        f"Load testing {args.base_url} for {args.duration:.0f}s with "
+        f"{args.concurrency} workers ({args.mix})", file=sys.stderr
+    )
+    report = LoadTest(args).run()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
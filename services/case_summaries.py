@@ -0,0 +1,343 @@
+from typing import List, Optional
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from services.llm_scheduler import llm_scheduler, generation_fn, BATCH
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_POINTS = 10
+MERGE_ATTEMPTS = 3
+# Updates a failed merge is retried on before it is given up
+MAX_PENDING_RETRIES = int(os.getenv("CASE_SUMMARY_MAX_RETRIES", 5))
+
+MERGE_PROMPT = (
+    "You maintain the running summary of a legal case. Merge the new "
+    "document into the case summary and return strict JSON with the keys:\n"
+    "- \"summary\": the updated case summary, at most two paragraphs.\n"
+    "- \"key_points\": at most {max_points} main points for the whole "
+    "case.\n\n"
+    "Current case summary:\n{summary}\n\n"
+    "Current key points:\n{key_points}\n\n"
+    "New document summary:\n{doc_summary}\n\n"
+    "New document key points:\n{doc_key_points}\n\n"
+    "Respond ONLY with the JSON object. "
+    "Do not add any markdown formatting or extra text."
+)
+
+
+def _bullets(points: List[str]) -> str:
+    return "\n".join(f"- {point}" for point in points) or "- (none)"
+
+
+class CaseSummaryStore:
+    """Versioned per-case rolling summaries in SQLite.
+
+    Each row carries a version that increases with every merged document.
+    Writers commit with compare-and-set on that version, so two workers
+    merging into the same case never overwrite each other's result.
+    Documents whose merge failed are kept as pending until one succeeds.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv(
+            "CASE_SUMMARY_DB", "./case_summaries.db"
+        )
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_summaries (
+                    case_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    key_points TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    documents INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_summary_documents (
+                    case_id TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    PRIMARY KEY (case_id, doc_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_summary_pending (
+                    case_id TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    key_points TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (case_id, doc_id)
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def get(self, case_id: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT summary, key_points, version, documents, updated "
+            "FROM case_summaries WHERE case_id = ?", (case_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "case_id": case_id,
+            "summary": row[0],
+            "key_points": json.loads(row[1]),
+            "version": row[2],
+            "documents": row[3],
+            "updated": row[4],
+        }
+
+    def has_document(self, case_id: str, doc_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM case_summary_documents "
+            "WHERE case_id = ? AND doc_id = ?", (case_id, doc_id)
+        ).fetchone() is not None
+
+    def commit(
+        self,
+        case_id: str,
+        doc_id: str,
+        expected_version: int,
+        summary: str,
+        key_points: List[str]
+    ) -> bool:
+        """Store a merged summary if the case is still at ``expected_version``
+
+        ``expected_version`` is 0 for a case without a summary. Returns
+        False when another writer got there first.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT version FROM case_summaries WHERE case_id = ?",
+                (case_id,)
+            ).fetchone()
+            if (row[0] if row else 0) != expected_version:
+                conn.execute("ROLLBACK")
+                return False
+
+            conn.execute(
+                "INSERT OR REPLACE INTO case_summaries "
+                "(case_id, summary, key_points, version, documents, updated) "
+                "VALUES (?, ?, ?, ?, "
+                "(SELECT COUNT(*) + 1 FROM case_summary_documents "
+                "WHERE case_id = ?), ?)",
+                (case_id, summary, json.dumps(key_points[:MAX_KEY_POINTS]),
+                 expected_version + 1, case_id, time.time())
+            )
+            conn.execute(
+                "INSERT INTO case_summary_documents (case_id, doc_id) "
+                "VALUES (?, ?)", (case_id, doc_id)
+            )
+            conn.execute(
+                "DELETE FROM case_summary_pending "
+                "WHERE case_id = ? AND doc_id = ?", (case_id, doc_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def add_pending(
+        self,
+        case_id: str,
+        doc_id: str,
+        summary: str,
+        key_points: List[str]
+    ) -> int:
+        """Record a failed merge; returns how often it has failed"""
+        return self._connection().execute(
+            "INSERT INTO case_summary_pending "
+            "(case_id, doc_id, summary, key_points, attempts, updated) "
+            "VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (case_id, doc_id) DO UPDATE SET "
+            "attempts = attempts + 1, updated = excluded.updated "
+            "RETURNING attempts",
+            (case_id, doc_id, summary, json.dumps(key_points), time.time())
+        ).fetchone()[0]
+
+    def pending(self, case_id: str) -> List[dict]:
+        """Documents of a case whose merge failed, oldest first"""
+        rows = self._connection().execute(
+            "SELECT doc_id, summary, key_points FROM case_summary_pending "
+            "WHERE case_id = ? ORDER BY updated", (case_id,)
+        ).fetchall()
+        return [
+            {"doc_id": row[0], "summary": row[1],
+             "key_points": json.loads(row[2])}
+            for row in rows
+        ]
+
+    def drop_pending(self, case_id: str, doc_id: str):
+        self._connection().execute(
+            "DELETE FROM case_summary_pending "
+            "WHERE case_id = ? AND doc_id = ?", (case_id, doc_id)
+        )
+
+
+def _parse_merge(response_text: str) -> Optional[dict]:
+    clean_response = re.sub(r'```json\s*|\s*```', '', response_text).strip()
+    try:
+        parsed = json.loads(clean_response)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict) or not isinstance(
+        parsed.get("summary"), str
+    ):
+        return None
+    key_points = parsed.get("key_points", [])
+    if not isinstance(key_points, list):
+        key_points = [key_points]
+    return {
+        "summary": parsed["summary"],
+        "key_points": [str(point) for point in key_points],
+    }
+
+
+class CaseSummarizer:
+    """Fold each newly analyzed document into its case's summary.
+
+    Only the document's own summary and key points are sent to the LLM,
+    together with the stored case summary, so the cost of an update does
+    not grow with the number of documents in the case. A document whose
+    merge fails is recorded and retried after the case's next successful
+    update.
+    """
+
+    def __init__(self, store: CaseSummaryStore):
+        self.store = store
+
+    async def merge_document(
+        self,
+        case_id: str,
+        doc_id: str,
+        doc_summary: str,
+        doc_key_points: List[str],
+        llm
+    ) -> bool:
+        for _ in range(MERGE_ATTEMPTS):
+            current = await asyncio.to_thread(self.store.get, case_id)
+            if current is None:
+                # The first document's summary is the case summary
+                merged = {"summary": doc_summary, "key_points": doc_key_points}
+                version = 0
+            else:
+                if await asyncio.to_thread(
+                    self.store.has_document, case_id, doc_id
+                ):
+                    return True
+                prompt = MERGE_PROMPT.format(
+                    max_points=MAX_KEY_POINTS,
+                    summary=current["summary"],
+                    key_points=_bullets(current["key_points"]),
+                    doc_summary=doc_summary,
+                    doc_key_points=_bullets(doc_key_points)
+                )
+                response_text = await llm_scheduler.run(
+                    generation_fn(llm), prompt,
+                    flow=case_id, priority=BATCH
+                )
+                merged = _parse_merge(response_text)
+                if merged is None:
+                    logger.warning(
+                        f"Unparseable case summary merge for {case_id}"
+                    )
+                    return False
+                version = current["version"]
+
+            try:
+                committed = await asyncio.to_thread(
+                    self.store.commit, case_id, doc_id, version,
+                    merged["summary"], merged["key_points"]
+                )
+            except sqlite3.IntegrityError:
+                # Merged concurrently by another worker
+                return True
+            if committed:
+                return True
+            logger.info(f"Case summary for {case_id} changed, retrying merge")
+
+        logger.warning(f"Gave up merging {doc_id} into case {case_id}")
+        return False
+
+    async def _try_merge(
+        self,
+        case_id: str,
+        doc_id: str,
+        doc_summary: str,
+        doc_key_points: List[str],
+        llm
+    ) -> bool:
+        """Merge a document, recording it as pending if that fails"""
+        try:
+            if await self.merge_document(
+                case_id, doc_id, doc_summary, doc_key_points, llm
+            ):
+                return True
+        except Exception as e:
+            logger.error(f"Case summary update failed: {e}")
+        attempts = await asyncio.to_thread(
+            self.store.add_pending, case_id, doc_id, doc_summary,
+            doc_key_points
+        )
+        if attempts > MAX_PENDING_RETRIES:
+            logger.error(
+                f"Dropping {doc_id} from the summary of case {case_id} "
+                f"after {attempts} failed merges"
+            )
+            await asyncio.to_thread(self.store.drop_pending, case_id, doc_id)
+        return False
+
+    async def update(
+        self,
+        case_id: str,
+        doc_id: str,
+        doc_summary: str,
+        doc_key_points: List[str],
+        llm
+    ):
+        """Background-task entry point; failures are logged, not raised
+
+        Once the document is merged, earlier failed merges for the case
+        are retried in order, stopping at the first that fails again.
+        """
+        try:
+            if not await self._try_merge(
+                case_id, doc_id, doc_summary, doc_key_points, llm
+            ):
+                return
+            for pending in await asyncio.to_thread(
+                self.store.pending, case_id
+            ):
+                if not await self._try_merge(
+                    case_id, pending["doc_id"], pending["summary"],
+                    pending["key_points"], llm
+                ):
+                    return
+        except Exception as e:
+            logger.error(f"Case summary update failed: {e}")
+
+
+# Global instances
+case_summary_store = CaseSummaryStore()
+case_summarizer = CaseSummarizer(case_summary_store)
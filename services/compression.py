@@ -0,0 +1,202 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import anyio
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "text/", "application/javascript", "image/svg+xml"
+)
+
+# Chunks at least this large are compressed off the event loop
+THREAD_OFFLOAD_SIZE = 256 * 1024
+
+
+def _accepted_encodings(accept_encoding: str) -> dict:
+    """Parse Accept-Encoding into coding -> q, dropping refused codings"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        weight = 1.0
+        if q.startswith("q="):
+            try:
+                weight = float(q[2:])
+            except ValueError:
+                continue
+        if coding and weight > 0:
+            accepted[coding.strip()] = weight
+    return accepted
+
+
+def _choose_encoding(accepted: dict):
+    """The coding the client weights highest, gzip on a tie, or None"""
+    # gzip first: on JSON it is faster than brotli for a similar size
+    supported = ("gzip", "br") if brotli is not None else ("gzip",)
+    best = None
+    for coding in supported:
+        if coding in accepted and (
+            best is None or accepted[coding] > accepted[best]
+        ):
+            best = coding
+    return best
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 writes a gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip or brotli above a size threshold.
+
+    The coding the client gives the highest q-value is used; gzip wins
+    ties, and brotli is only offered when the ``brotli`` package is
+    installed. Small bodies, non-text types and responses that
+    already carry a Content-Encoding are passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 4,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            encoding = _choose_encoding(_accepted_encodings(
+                Headers(scope=scope).get("accept-encoding", "")
+            ))
+            if encoding == "br":
+                responder = _CompressionResponder(
+                    self.app, "br", self.minimum_size,
+                    lambda: _BrotliCompressor(self.brotli_quality)
+                )
+                await responder(scope, receive, send)
+                return
+            if encoding == "gzip":
+                responder = _CompressionResponder(
+                    self.app, "gzip", self.minimum_size,
+                    lambda: _GzipCompressor(self.gzip_level)
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int,
+                 compressor_factory):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.compressor_factory = compressor_factory
+        self.compressor = None
+        self.send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        def run():
+            data = self.compressor.compress(body)
+            if more_body:
+                # Flush so each streamed chunk is decodable on arrival
+                return data + self.compressor.flush()
+            return data + self.compressor.finish()
+
+        if len(body) >= THREAD_OFFLOAD_SIZE:
+            return await anyio.to_thread.run_sync(run)
+        return run()
+
+    def _set_headers(self, content_length=None):
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send_compressed(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until the first body chunk decides
+            # whether the headers change
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers or
+                not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if self.passthrough or (
+                len(body) < self.minimum_size and not more_body
+            ):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressor = self.compressor_factory()
+            data = await self._compress(body, more_body)
+            self._set_headers(None if more_body else len(data))
+            message["body"] = data
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        message["body"] = await self._compress(body, more_body)
+        await self.send(message)
@@ -0,0 +1,463 @@
+from collections import OrderedDict
+from typing import List, Optional
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Optional: fall back to zlib only
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Extractors separate PDF pages with a form feed
+PAGE_BREAK = "\f"
+# Documents without page breaks are paged in chunks of about this size
+FALLBACK_PAGE_CHARS = 3000
+
+# Characters per independently compressed block
+BLOCK_CHARS = int(os.getenv("DOCUMENT_BLOCK_CHARS", 64 * 1024))
+# Decompressed blocks kept in memory for sequential page reads
+BLOCK_CACHE_SIZE = 64
+# Temporary files older than this are leftovers from a crashed write
+STALE_TMP_SECONDS = 3600
+
+BLOB_MAGIC = b"CSDB"
+BLOB_VERSION = 1
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+# magic, version, codec, block chars, block count, total chars
+_HEADER = struct.Struct("<4sBBIIQ")
+# byte offset, byte length of each block
+_BLOCK = struct.Struct("<QI")
+
+_DOCUMENT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def page_offsets(text: str) -> List[int]:
+    """Start offsets of each page of ``text``"""
+    if PAGE_BREAK in text:
+        offsets = [0]
+        position = text.find(PAGE_BREAK)
+        while position != -1:
+            offsets.append(position + 1)
+            position = text.find(PAGE_BREAK, position + 1)
+        if offsets[-1] == len(text) and len(offsets) > 1:
+            offsets.pop()
+        return offsets
+
+    offsets = [0]
+    while len(text) - offsets[-1] > FALLBACK_PAGE_CHARS:
+        limit = offsets[-1] + FALLBACK_PAGE_CHARS
+        # Prefer to break after a paragraph or line near the limit
+        cut = text.rfind("\n", offsets[-1] + FALLBACK_PAGE_CHARS // 2, limit)
+        offsets.append(cut + 1 if cut != -1 else limit)
+    return offsets
+
+
+def _default_codec() -> str:
+    codec = os.getenv("DOCUMENT_STORE_CODEC", "zstd" if zstandard else "zlib")
+    if codec == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed, storing with zlib")
+        codec = "zlib"
+    return codec
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed; install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def encode_blob(
+    text: str, codec: int, block_chars: int = BLOCK_CHARS
+) -> bytes:
+    """Serialize ``text`` as a header, a block table and compressed blocks"""
+    blocks = [
+        _compress(codec, text[i:i + block_chars].encode("utf-8"))
+        for i in range(0, len(text), block_chars)
+    ]
+    offset = _HEADER.size + _BLOCK.size * len(blocks)
+    table = []
+    for block in blocks:
+        table.append(_BLOCK.pack(offset, len(block)))
+        offset += len(block)
+    header = _HEADER.pack(
+        BLOB_MAGIC, BLOB_VERSION, codec, block_chars, len(blocks), len(text)
+    )
+    return b"".join([header] + table + blocks)
+
+
+class DocumentStore:
+    """Extracted document text kept server-side behind opaque ids.
+
+    Text is stored once per distinct content as a blob named by its
+    SHA-256 and compressed in fixed-size character blocks, so a page or
+    range is served by decompressing only the blocks it spans from a
+    memory-mapped file. Document ids reference blobs through a SQLite
+    index that counts references; blobs nobody references any more are
+    removed by :meth:`compact`.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        codec: Optional[str] = None,
+        block_chars: int = BLOCK_CHARS
+    ):
+        self.root = root or os.getenv("DOCUMENT_STORE_DIR", "./document_store")
+        self.codec = CODECS[codec or _default_codec()]
+        self.block_chars = block_chars
+        self.blob_dir = os.path.join(self.root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db_path = os.path.join(self.root, "index.db")
+        self._local = threading.local()
+        self._blocks = OrderedDict()  # (digest, block) -> text, LRU first
+        self._blocks_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    refcount INTEGER NOT NULL,
+                    chars INTEGER NOT NULL,
+                    stored_bytes INTEGER NOT NULL,
+                    pages TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    filename TEXT,
+                    created REAL NOT NULL,
+                    case_id TEXT
+                )
+            """)
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(documents)")
+            }
+            if "case_id" not in columns:
+                # Stores made before documents were tied to a case
+                conn.execute("ALTER TABLE documents ADD COLUMN case_id TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS documents_digest "
+                "ON documents (digest)"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def is_valid_id(document_id: str) -> bool:
+        return bool(_DOCUMENT_ID.match(document_id))
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def put(
+        self,
+        text: str,
+        filename: Optional[str] = None,
+        case_id: Optional[str] = None
+    ) -> dict:
+        """Store ``text`` and return its metadata, including the new id
+
+        Given a ``case_id``, a document already stored for that case with
+        the same content and filename is returned instead of adding
+        another id for it. Otherwise every call gets its own document,
+        sharing the blob with any identical text.
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        document_id = uuid.uuid4().hex
+        created = time.time()
+        conn = self._connection()
+        if case_id is not None:
+            existing = self._document_with(digest, filename, case_id)
+            if existing is not None:
+                return self.meta(existing)
+
+        blob = None
+        if not self._has_blob(digest):
+            # Compress outside the write lock; duplicates are discarded
+            blob = encode_blob(text, self.codec, self.block_chars)
+            os.makedirs(os.path.dirname(self._blob_path(digest)),
+                        exist_ok=True)
+            tmp_path = f"{self._blob_path(digest)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+
+        pages = page_offsets(text)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = None if case_id is None else self._document_with(
+                digest, filename, case_id
+            )
+            if existing is not None:
+                # Stored by someone else since we looked
+                conn.execute("ROLLBACK")
+                return self.meta(existing)
+            updated = conn.execute(
+                "UPDATE blobs SET refcount = refcount + 1 WHERE digest = ?",
+                (digest,)
+            ).rowcount
+            if not updated:
+                if blob is None:
+                    # Compacted away since we looked; write it after all
+                    conn.execute("ROLLBACK")
+                    return self.put(text, filename, case_id)
+                os.replace(tmp_path, self._blob_path(digest))
+                blob = None
+                conn.execute(
+                    "INSERT INTO blobs (digest, refcount, chars, "
+                    "stored_bytes, pages) VALUES (?, 1, ?, ?, ?)",
+                    (digest, len(text),
+                     os.path.getsize(self._blob_path(digest)),
+                     json.dumps(pages))
+                )
+            conn.execute(
+                "INSERT INTO documents (document_id, digest, filename, "
+                "created, case_id) VALUES (?, ?, ?, ?, ?)",
+                (document_id, digest, filename, created, case_id)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            if blob is not None:
+                os.remove(tmp_path)
+
+        return {
+            "document_id": document_id,
+            "digest": digest,
+            "filename": filename,
+            "chars": len(text),
+            "pages": pages,
+            "created": created,
+        }
+
+    def _document_with(
+        self, digest: str, filename: Optional[str], case_id: str
+    ) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT document_id FROM documents WHERE digest = ? "
+            "AND filename IS ? AND case_id = ? ORDER BY created LIMIT 1",
+            (digest, filename, case_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _has_blob(self, digest: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone() is not None
+
+    def delete(self, document_id: str) -> bool:
+        """Drop a document; its blob goes at the next compaction if unused"""
+        if not self.is_valid_id(document_id):
+            return False
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT digest FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "DELETE FROM documents WHERE document_id = ?",
+                    (document_id,)
+                )
+                conn.execute(
+                    "UPDATE blobs SET refcount = refcount - 1 "
+                    "WHERE digest = ?", (row[0],)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def meta(self, document_id: str) -> Optional[dict]:
+        if not self.is_valid_id(document_id):
+            return None
+        row = self._connection().execute(
+            "SELECT d.digest, d.filename, d.created, b.chars, b.pages "
+            "FROM documents d JOIN blobs b ON b.digest = d.digest "
+            "WHERE d.document_id = ?",
+            (document_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "document_id": document_id,
+            "digest": row[0],
+            "filename": row[1],
+            "chars": row[3],
+            "pages": json.loads(row[4]),
+            "created": row[2],
+        }
+
+    def _read_blocks(self, digest: str, start: int, end: int) -> str:
+        """Decoded text of the blocks covering [start, end)"""
+        parts = []
+        with open(self._blob_path(digest), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, version, codec, block_chars, count, _ = \
+                _HEADER.unpack_from(view, 0)
+            if magic != BLOB_MAGIC or version != BLOB_VERSION:
+                raise ValueError(f"Unrecognized blob {digest}")
+            first = start // block_chars
+            last = min(count, -(-end // block_chars))
+            for block in range(first, last):
+                key = (digest, block)
+                with self._blocks_lock:
+                    text = self._blocks.get(key)
+                    if text is not None:
+                        self._blocks.move_to_end(key)
+                if text is None:
+                    offset, length = _BLOCK.unpack_from(
+                        view, _HEADER.size + _BLOCK.size * block
+                    )
+                    text = _decompress(
+                        codec, view[offset:offset + length]
+                    ).decode("utf-8")
+                    with self._blocks_lock:
+                        self._blocks[key] = text
+                        while len(self._blocks) > BLOCK_CACHE_SIZE:
+                            self._blocks.popitem(last=False)
+                parts.append(text)
+        joined = "".join(parts)
+        base = first * block_chars
+        return joined[start - base:end - base]
+
+    def get_range(
+        self, document_id: str, start: int, end: Optional[int] = None
+    ) -> Optional[str]:
+        """Characters [start, end) of a document"""
+        meta = self.meta(document_id)
+        if meta is None:
+            return None
+        chars = meta["chars"]
+        end = chars if end is None else min(end, chars)
+        start = min(max(start, 0), end)
+        if start == end:
+            return ""
+        return self._read_blocks(meta["digest"], start, end)
+
+    def get_text(self, document_id: str) -> Optional[str]:
+        return self.get_range(document_id, 0)
+
+    def stats(self) -> dict:
+        row = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(chars), 0), "
+            "COALESCE(SUM(stored_bytes), 0), "
+            "COALESCE(SUM(refcount = 0), 0) FROM blobs"
+        ).fetchone()
+        documents = self._connection().execute(
+            "SELECT COUNT(*) FROM documents"
+        ).fetchone()[0]
+        return {
+            "documents": documents,
+            "blobs": row[0],
+            "chars": row[1],
+            "stored_bytes": row[2],
+            "unreferenced_blobs": row[3],
+        }
+
+    def compact(self) -> dict:
+        """Remove unreferenced and orphaned blobs; return what was freed"""
+        removed = 0
+        freed = 0
+        conn = self._connection()
+        # Hold the write lock while unlinking so a concurrent put cannot
+        # reference a blob between its row and its file going away
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            unreferenced = [
+                row[0] for row in conn.execute(
+                    "SELECT digest FROM blobs WHERE refcount <= 0"
+                )
+            ]
+            conn.execute("DELETE FROM blobs WHERE refcount <= 0")
+            known = {
+                row[0] for row in conn.execute("SELECT digest FROM blobs")
+            }
+            now = time.time()
+            for entry in _scan_files(self.blob_dir):
+                name = os.path.basename(entry.path)
+                if name.endswith(".tmp"):
+                    # In-flight writes are recent; old ones were abandoned
+                    stale = now - entry.stat().st_mtime > STALE_TMP_SECONDS
+                else:
+                    stale = name not in known
+                if stale:
+                    freed += entry.stat().st_size
+                    os.remove(entry.path)
+                    removed += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._blocks_lock:
+            self._blocks.clear()
+        conn.execute("VACUUM")
+        logger.info(
+            f"Document store compacted: {removed} files, {freed} bytes freed "
+            f"({len(unreferenced)} unreferenced blobs)"
+        )
+        return {"removed_files": removed, "freed_bytes": freed}
+
+
+def _scan_files(directory: str):
+    for shard in os.scandir(directory):
+        if shard.is_dir():
+            yield from (e for e in os.scandir(shard.path) if e.is_file())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CaseStar document store")
+    parser.add_argument("command", choices=["compact", "stats"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    store = DocumentStore()
+    if args.command == "compact":
+        result = store.compact()
+    else:
+        result = store.stats()
+    print(json.dumps(result, indent=2))
+
+
+# Global instance
+document_store = DocumentStore()
+
+
+if __name__ == "__main__":
+    main()
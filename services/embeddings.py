@@ -0,0 +1,268 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Callable, Dict, List, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Chroma's default model; downloaded on first use if no directory is set
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+class OnnxEmbedder:
+    """Sentence embeddings from a local ONNX transformer model.
+
+    ``model_dir`` must hold ``tokenizer.json`` and the ONNX graph named by
+    ``onnx_file``; point ``onnx_file`` at a quantized export (for example
+    ``model_quint8.onnx``) to trade a little accuracy for speed. Batches
+    are padded to their longest member rather than to ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        onnx_file: str = "model.onnx",
+        threads: int = 0,
+        max_tokens: int = 256
+    ):
+        self.model_dir = model_dir
+        self.onnx_file = onnx_file
+        self.threads = threads
+        self.max_tokens = max_tokens
+        name = os.path.basename(os.path.normpath(model_dir)) if model_dir \
+            else DEFAULT_MODEL_NAME
+        self.model_id = f"{name}/{onnx_file}"
+
+    def _resolve_model_dir(self) -> str:
+        if self.model_dir:
+            return self.model_dir
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        default = ONNXMiniLM_L6_V2()
+        default._download_model_if_not_exists()
+        return os.path.join(
+            default.DOWNLOAD_PATH, default.EXTRACTED_FOLDER_NAME
+        )
+
+    @cached_property
+    def _files(self) -> str:
+        return self._resolve_model_dir()
+
+    @cached_property
+    def _tokenizer(self):
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(
+            os.path.join(self._files, "tokenizer.json")
+        )
+        tokenizer.enable_truncation(max_length=self.max_tokens)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        return tokenizer
+
+    @cached_property
+    def _session(self):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.log_severity_level = 3
+        # Parallelism comes from the batch thread pool; keep each run's
+        # intra-op pool small so workers do not oversubscribe the CPU
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(
+            os.path.join(self._files, self.onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        logger.info(
+            f"Loaded embedding model {self.model_id} "
+            f"({self.threads or 'default'} intra-op threads)"
+        )
+        return session
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        encoded = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array(
+            [e.attention_mask for e in encoded], dtype=np.int64
+        )
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        input_names = {i.name for i in self._session.get_inputs()}
+        if "token_type_ids" in input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        last_hidden_state = self._session.run(None, feeds)[0]
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., np.newaxis].astype(np.float32)
+        summed = (last_hidden_state * mask).sum(axis=1)
+        embeddings = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-12
+        return (embeddings / norms).astype(np.float32)
+
+
+class EmbeddingCache:
+    """Embeddings keyed by model and text hash, stored in SQLite"""
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 0):
+        self.db_path = db_path or os.getenv(
+            "EMBEDDING_CACHE_DB", "./embedding_cache.db"
+        )
+        self.max_entries = max_entries or int(
+            os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000)
+        )
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    used REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_used "
+                "ON embeddings (used)"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8", "surrogatepass"))
+        return f"{model_id}:{digest.hexdigest()}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        conn = self._connection()
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings "
+                f"WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        if found:
+            conn.executemany(
+                "UPDATE embeddings SET used = ? WHERE key = ?",
+                [(time.time(), key) for key in found]
+            )
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        now = time.time()
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, used) "
+            "VALUES (?, ?, ?)",
+            [
+                (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for key, vector in items.items()
+            ]
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self) -> dict:
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()
+        return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Chroma embedding function with a text-hash cache and batching.
+
+    Texts already in the cache cost no inference. The rest are
+    deduplicated, sorted by length so batches need little padding, and
+    embedded ``batch_size`` at a time on a thread pool of ``workers``.
+    """
+
+    def __init__(
+        self,
+        embedder: Callable[[List[str]], np.ndarray],
+        model_id: str,
+        cache: Optional[EmbeddingCache] = None,
+        batch_size: int = 32,
+        workers: int = 1
+    ):
+        self.embedder = embedder
+        self.model_id = model_id
+        self.cache = cache
+        self.batch_size = batch_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="embed"
+        )
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [EmbeddingCache.make_key(self.model_id, text) for text in input]
+        found = self.cache.get_many(keys) if self.cache else {}
+
+        pending = {}
+        for key, text in zip(keys, input):
+            if key not in found:
+                pending.setdefault(key, text)
+
+        if pending:
+            order = sorted(pending, key=lambda k: len(pending[k]))
+            batches = [
+                order[i:i + self.batch_size]
+                for i in range(0, len(order), self.batch_size)
+            ]
+            results = self._pool.map(
+                lambda batch: self.embedder([pending[k] for k in batch]),
+                batches
+            )
+            computed = {}
+            for batch, vectors in zip(batches, results):
+                computed.update(zip(batch, vectors))
+            if self.cache:
+                self.cache.put_many(computed)
+            found.update(computed)
+
+        return [np.asarray(found[key], dtype=np.float32) for key in keys]
+
+
+def build_embedding_function() -> CachedEmbeddingFunction:
+    """Configure the embedding layer from environment variables"""
+    embedder = OnnxEmbedder(
+        model_dir=os.getenv("EMBEDDING_MODEL_DIR") or None,
+        onnx_file=os.getenv("EMBEDDING_ONNX_FILE", "model.onnx"),
+        threads=int(os.getenv("EMBEDDING_THREADS", 0)),
+        max_tokens=int(os.getenv("EMBEDDING_MAX_TOKENS", 256))
+    )
+    cache = None
+    if os.getenv("EMBEDDING_CACHE", "1") != "0":
+        cache = EmbeddingCache()
+    return CachedEmbeddingFunction(
+        embedder,
+        embedder.model_id,
+        cache=cache,
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", 32)),
+        workers=int(os.getenv("EMBEDDING_WORKERS", 1))
+    )
@@ -0,0 +1,333 @@
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import re
+import threading
+import time
+
+from services.entity_index import entity_key, normalize_entity_name
+from services.timeline import find_dates
+
+logger = logging.getLogger(__name__)
+
+MIN_GAZETTEER_NAME = 3
+MAX_RULE_ENTITIES = 200
+GAZETTEER_REBUILD_SECONDS = float(os.getenv("GAZETTEER_REBUILD_SECONDS", 30))
+# Least recently seen names are dropped past this many
+GAZETTEER_MAX_NAMES = int(os.getenv("GAZETTEER_MAX_NAMES", 50000))
+# Analyses that must report a name before the LLM's word is taken for it
+GAZETTEER_PROMOTE_AFTER = int(os.getenv("GAZETTEER_PROMOTE_AFTER", 2))
+# Words that say what a party is rather than who; a name made only of
+# these ("the Court", "Plaintiff") would match in every document
+GAZETTEER_STOPWORDS = {
+    "a", "an", "and", "of", "the", "this", "that", "said", "such", "mr",
+    "mrs", "ms", "dr", "court", "plaintiff", "plaintiffs", "defendant",
+    "defendants", "party", "parties", "petitioner", "respondent",
+    "appellant", "appellee", "company", "corporation", "state", "city",
+    "county", "agreement", "contract", "landlord", "tenant", "buyer",
+    "seller", "employer", "employee", "client", "witness", "judge",
+    "attorney", "counsel", "government", "united", "states",
+}
+
+MONEY = re.compile(
+    r"(?:[$€£]\s?\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|"
+    r"\b\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?\s?"
+    # 500 dollars, 5 million dollars
+    r"(?:(?:thousand|million|billion)\s)?(?:dollars|euros|usd|eur|gbp)\b)"
+    r"(?:\s?(?:thousand|million|billion))?",
+    re.I
+)
+CASE_NUMBER = re.compile(
+    # 1:23-cv-04567-ABC, 2023-CV-01234
+    r"\b(?:\d{1,2}:)?\d{2,4}-?(?:cv|cr|civ|crim|mc|bk|ap)-?\d{2,6}"
+    r"(?:-[a-z]{1,4})*\b"
+    # Case No. 12-3456 / Civil Action No. A-123
+    r"|\b(?:case|docket|civil\s+action|index)\s+no\.?\s*[a-z]?[\d][\w:-]*",
+    re.I
+)
+STATUTE = re.compile(
+    # 42 U.S.C. § 1983, 29 C.F.R. 1910.1200
+    r"\b\d+\s+(?:U\.?\s?S\.?\s?C\.?(?:A\.?)?|C\.?\s?F\.?\s?R\.?)\s*"
+    r"(?:§+\s*)?\d+[\w.-]*(?:\([a-z0-9]+\))*"
+    # § 2-207(1)
+    r"|§+\s*\d+[\w.-]*(?:\([a-z0-9]+\))*",
+    re.I
+)
+
+REGEX_EXTRACTORS = [
+    ("Money", MONEY),
+    ("CaseNumber", CASE_NUMBER),
+    ("Statute", STATUTE),
+]
+RULE_ENTITY_TYPES = {"Date", "Money", "CaseNumber", "Statute"}
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher over a trie with failure links.
+
+    Finds every occurrence of every pattern in one pass over the text,
+    independent of how many patterns there are.
+    """
+
+    def __init__(self, patterns: Dict[str, object]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), value))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter(self, text: str) -> Iterable[Tuple[int, int, object]]:
+        """Yield (start, end, value) for every pattern occurrence"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+class _FoldTable(dict):
+    """str.translate table lowering each character on its own"""
+
+    def __missing__(self, code: int):
+        lowered = chr(code).lower()
+        # Keep characters whose lowercase is longer (e.g. "İ") as they are
+        self[code] = lowered if len(lowered) == 1 else code
+        return self[code]
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def _fold(text: str) -> str:
+    # Match offsets index the original text, so folding must keep every
+    # character in place; lower() and casefold() can both add characters
+    if text.isascii():
+        return text.lower()
+    return text.translate(_FOLD_TABLE)
+
+
+class Gazetteer:
+    """Known party names matched in one pass with Aho-Corasick.
+
+    Names come from graph ``Entity`` nodes, added directly, and from
+    entities found by earlier analyses, which are learned once reported
+    ``promote_after`` times. Names made only of stopwords are ignored,
+    and past ``max_names`` the least recently seen are dropped.
+
+    After names change, the automaton is rebuilt at most every
+    ``rebuild_seconds`` in a background thread; matching keeps using the
+    previous automaton meanwhile.
+    """
+
+    def __init__(
+        self,
+        rebuild_seconds: float = GAZETTEER_REBUILD_SECONDS,
+        max_names: int = GAZETTEER_MAX_NAMES,
+        promote_after: int = GAZETTEER_PROMOTE_AFTER
+    ):
+        self.rebuild_seconds = rebuild_seconds
+        self.max_names = max_names
+        self.promote_after = promote_after
+        self._names: Dict[str, Tuple[str, str]] = OrderedDict()
+        # surface -> times reported, for names not yet promoted
+        self._candidates: Dict[str, int] = OrderedDict()
+        self._automaton: Optional[AhoCorasick] = None
+        self._dirty = False
+        self._built_at = 0.0
+        self._rebuilding: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _surface(name: str, entity_type: str) -> Optional[str]:
+        surface = " ".join(_fold(name).split())
+        if len(surface) < MIN_GAZETTEER_NAME or \
+                entity_type in RULE_ENTITY_TYPES:
+            return None
+        words = re.findall(r"\w+", surface)
+        if all(w in GAZETTEER_STOPWORDS or w.isdigit() for w in words):
+            return None
+        return surface
+
+    def _insert(self, surface: str, name: str, entity_type: str):
+        # Caller holds the lock
+        if surface in self._names:
+            self._names.move_to_end(surface)
+            return
+        self._names[surface] = (name, entity_type)
+        if len(self._names) > self.max_names:
+            self._names.popitem(last=False)
+        self._dirty = True
+
+    def add(
+        self, name: str, entity_type: str, canonical: Optional[str] = None
+    ):
+        """Match ``name`` in text, reporting it as ``canonical``"""
+        surface = self._surface(name, entity_type)
+        if surface is None:
+            return
+        with self._lock:
+            self._insert(surface, canonical or name, entity_type)
+
+    def learn(self, name: str, entity_type: str):
+        """Count a name an analysis reported; add it once seen enough"""
+        surface = self._surface(name, entity_type)
+        if surface is None:
+            return
+        with self._lock:
+            if surface in self._names:
+                self._names.move_to_end(surface)
+                return
+            seen = self._candidates.pop(surface, 0) + 1
+            if seen < self.promote_after:
+                self._candidates[surface] = seen
+                if len(self._candidates) > self.max_names:
+                    self._candidates.popitem(last=False)
+                return
+            self._insert(surface, name, entity_type)
+
+    def _rebuild(self):
+        with self._lock:
+            names = dict(self._names)
+            self._dirty = False
+        automaton = AhoCorasick(names)
+        with self._lock:
+            self._automaton = automaton
+            self._built_at = time.monotonic()
+            self._rebuilding = None
+
+    def rebuild(self):
+        """Build the automaton now, in the calling thread"""
+        self._rebuild()
+
+    def _current(self) -> Optional[AhoCorasick]:
+        with self._lock:
+            automaton = self._automaton
+            if not self._dirty or self._rebuilding is not None:
+                return automaton
+            if automaton is not None:
+                if time.monotonic() - self._built_at > self.rebuild_seconds:
+                    self._rebuilding = threading.Thread(
+                        target=self._rebuild, name="gazetteer-rebuild",
+                        daemon=True
+                    )
+                    self._rebuilding.start()
+                return automaton
+        # Nothing to match with yet, so the first build cannot wait
+        self._rebuild()
+        return self._automaton
+
+    def find(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """Whole-word (start, end, name, type) matches, longest first"""
+        automaton = self._current()
+        if automaton is None:
+            return []
+        folded = _fold(text)
+        matches = []
+        for start, end, (name, entity_type) in automaton.iter(folded):
+            if (start > 0 and folded[start - 1].isalnum()) or \
+                    (end < len(folded) and folded[end].isalnum()):
+                continue
+            matches.append((start, end, name, entity_type))
+        return matches
+
+
+def _non_overlapping(spans: List[tuple]) -> List[tuple]:
+    spans.sort(key=lambda s: (s[0], -(s[1] - s[0])))
+    kept = []
+    last_end = -1
+    for span in spans:
+        if span[0] >= last_end:
+            kept.append(span)
+            last_end = span[1]
+    return kept
+
+
+def extract_rule_entities(
+    text: str, gazetteer: Optional["Gazetteer"] = None
+) -> List[dict]:
+    """Dates, money, case numbers, statutes and known parties in ``text``
+
+    Returns entities in the same shape as the LLM's, in order of first
+    appearance and without duplicates.
+    """
+    spans = [
+        (start, end, text[start:end], "Date")
+        for start, end, _, _ in find_dates(text)
+    ]
+    for entity_type, pattern in REGEX_EXTRACTORS:
+        spans.extend(
+            (m.start(), m.end(), m.group().strip(), entity_type)
+            for m in pattern.finditer(text)
+        )
+    if gazetteer is not None:
+        spans.extend(gazetteer.find(text))
+
+    entities = []
+    seen = set()
+    for _, _, name, entity_type in _non_overlapping(spans):
+        name = " ".join(name.split())
+        key = (entity_type, normalize_entity_name(name))
+        if key in seen:
+            continue
+        seen.add(key)
+        entities.append({"name": name, "type": entity_type})
+        if len(entities) >= MAX_RULE_ENTITIES:
+            break
+    return entities
+
+
+def merge_entities(first: List[dict], second: List[dict]) -> List[dict]:
+    """Concatenate entity lists, dropping entities already present
+
+    Entities match on name within a category (see ``entity_category``).
+    """
+    merged = []
+    seen = set()
+    for entity in list(first) + list(second):
+        if not isinstance(entity, dict) or not entity.get("name"):
+            continue
+        key = entity_key(
+            normalize_entity_name(str(entity["name"])),
+            str(entity.get("type") or "")
+        )
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(entity)
+    return merged
+
+
+# Global instance
+gazetteer = Gazetteer()
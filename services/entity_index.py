@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Trailing company designators, dropped so "Acme Corp." matches
+# "ACME Corporation"
+ENTITY_SUFFIXES = {
+    "co", "company", "corp", "corporation", "inc", "incorporated",
+    "llc", "llp", "lp", "ltd", "limited", "plc", "pc", "pllc", "gmbh"
+}
+
+# Leading honorifics and articles that do not identify an entity
+ENTITY_PREFIXES = {"the", "mr", "mrs", "ms", "dr", "hon"}
+
+# Entity types that name the same kind of thing. Names only merge within
+# a category, so "Jordan" the person and "Jordan" the country stay apart
+ENTITY_CATEGORIES = {
+    "person": {
+        "person", "people", "individual", "human", "plaintiff",
+        "defendant", "witness", "judge", "attorney", "lawyer"
+    },
+    "organization": {
+        "organization", "organisation", "org", "company", "corporation",
+        "business", "firm", "agency", "institution", "court", "government"
+    },
+    "location": {
+        "location", "place", "city", "country", "state", "address", "gpe",
+        "region"
+    },
+    "date": {"date", "time", "datetime", "deadline"},
+    "money": {"money", "amount", "monetary", "currency"},
+}
+_CATEGORY_OF = {
+    alias: category
+    for category, aliases in ENTITY_CATEGORIES.items()
+    for alias in aliases
+}
+
+_PERIODS = re.compile(r"\.")
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_entity_name(name: str) -> str:
+    """Build the merge key for an entity name
+
+    Casefolds, strips punctuation and drops leading honorifics and
+    trailing company designators, e.g. "ACME Corporation" -> "acme".
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    text = text.replace("&", " and ")
+    # Remove periods outright so "U.S.A." becomes "usa", not "u s a"
+    text = _PERIODS.sub("", text)
+    tokens = _NON_WORD.sub(" ", text).replace("_", " ").split()
+
+    while len(tokens) > 1 and tokens[0] in ENTITY_PREFIXES:
+        tokens.pop(0)
+    while len(tokens) > 1 and (
+        tokens[-1] in ENTITY_SUFFIXES or tokens[-1] == "and"
+    ):
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def entity_category(entity_type: Optional[str]) -> str:
+    """Coarse category of an entity type, e.g. "Company" -> "organization"
+
+    Types outside ENTITY_CATEGORIES are their own category.
+    """
+    text = _NON_WORD.sub("", (entity_type or "").casefold()).replace("_", "")
+    return _CATEGORY_OF.get(text, text or "entity")
+
+
+def entity_key(name_key: str, entity_type: Optional[str]) -> str:
+    """Graph key of an entity: its category and normalized name"""
+    return f"{entity_category(entity_type)}:{name_key}"
+
+
+class EntityIndex:
+    """In-process index resolving entity names to canonical graph keys.
+
+    Keys combine the entity's category with its normalized name (see
+    ``entity_key``). The first name seen for a key becomes its canonical
+    display name. Explicit aliases (e.g. "IBM" -> "International Business
+    Machines") map one name onto another in every category. The index is
+    bounded and evicts least recently used keys.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._names = OrderedDict()  # key -> canonical name
+        self._aliases = {}  # alias name key -> canonical name
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add_alias(self, alias: str, canonical: str):
+        alias_key = normalize_entity_name(alias)
+        canonical_key = normalize_entity_name(canonical)
+        if not canonical_key:
+            return
+        if alias_key:
+            self._aliases[alias_key] = canonical
+        self._aliases.setdefault(canonical_key, canonical)
+
+    def load_aliases(self, path: str):
+        """Load a JSON object mapping alias -> canonical name"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                aliases = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load entity aliases from {path}: {e}")
+            return
+        for alias, canonical in aliases.items():
+            self.add_alias(alias, canonical)
+        logger.info(f"Loaded {len(aliases)} entity aliases")
+
+    def remember(self, key: str, name: str):
+        """Record the canonical name for a key if it has none yet"""
+        with self._lock:
+            if key in self._names:
+                self._names.move_to_end(key)
+                return
+            self._names[key] = name
+            if len(self._names) > self.max_entries:
+                self._names.popitem(last=False)
+
+    def resolve(
+        self, name: str, entity_type: Optional[str] = None
+    ) -> Optional[Tuple[str, str]]:
+        """Return (key, canonical name) for a raw name, or None if blank"""
+        name = " ".join(name.split())
+        name_key = normalize_entity_name(name)
+        if not name_key:
+            return None
+        if name_key in self._aliases:
+            name = self._aliases[name_key]
+            name_key = normalize_entity_name(name)
+        key = entity_key(name_key, entity_type)
+        self.remember(key, name)
+        return key, self._names.get(key, name)
+
+
+# Global instance
+entity_index = EntityIndex()
+if os.getenv("ENTITY_ALIASES_PATH"):
+    entity_index.load_aliases(os.getenv("ENTITY_ALIASES_PATH"))
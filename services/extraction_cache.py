@@ -0,0 +1,232 @@
+from typing import Optional, Tuple
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from services.text_extractor import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = ".z"
+INDEX_FILE = "index.db"
+# Least recently used entries removed per pass once over the cap
+EVICT_BATCH = 64
+
+
+class ExtractionCache:
+    """Content-addressed on-disk cache of extracted document text.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes, the file type
+    and the extractor version, and stored zlib-compressed. Sizes and
+    last-use times live in a SQLite index next to the entries, so every
+    worker on the host shares one size cap; past ``max_bytes`` the least
+    recently used entries are evicted.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None
+    ):
+        self.cache_dir = cache_dir or os.getenv(
+            "EXTRACTION_CACHE_DIR", "./extraction_cache"
+        )
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv("EXTRACTION_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+            )
+        self.max_bytes = max_bytes
+        self.version = EXTRACTOR_VERSION
+        self._local = threading.local()
+        self._prepared = False
+        self._lock = threading.Lock()
+
+    def make_key(self, content: bytes, file_ext: str) -> str:
+        """Build the cache key for an upload"""
+        digest = hashlib.sha256(content).hexdigest()
+        kind = file_ext.lstrip('.').lower() or "bin"
+        return f"v{self.version}-{kind}-{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(self.cache_dir, INDEX_FILE),
+                timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    used REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)"
+            )
+            self._local.conn = conn
+        with self._lock:
+            if not self._prepared:
+                self._prepared = True
+                self._prepare(conn)
+        return conn
+
+    def _prepare(self, conn: sqlite3.Connection):
+        """Index entry files the index lacks and drop other versions"""
+        current = f"v{self.version}-"
+        stale = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                known = {
+                    row[0] for row in conn.execute("SELECT key FROM entries")
+                }
+                for entry in os.scandir(self.cache_dir):
+                    if not entry.name.endswith(CACHE_FILE_SUFFIX):
+                        continue
+                    key = entry.name[:-len(CACHE_FILE_SUFFIX)]
+                    if not key.startswith(current):
+                        # Written by an older extractor, never served again
+                        stale.append(key)
+                    elif key not in known:
+                        stat = entry.stat()
+                        conn.execute(
+                            "INSERT OR IGNORE INTO entries (key, size, used) "
+                            "VALUES (?, ?, ?)",
+                            (key, stat.st_size, stat.st_mtime)
+                        )
+                conn.execute(
+                    "DELETE FROM entries WHERE substr(key, 1, ?) != ?",
+                    (len(current), current)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Failed to load extraction cache: {e}")
+        self._remove_files(stale)
+
+    def _remove_files(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for ``key``, or None on a miss"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+            self._discard(key)
+            return None
+        try:
+            conn.execute(
+                "UPDATE entries SET used = ? WHERE key = ?", (time.time(), key)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache update failed: {e}")
+        return text
+
+    def lookup(
+        self, content: bytes, file_ext: str
+    ) -> Tuple[str, Optional[str]]:
+        """Key for an upload and its cached text, or None on a miss"""
+        key = self.make_key(content, file_ext)
+        return key, self.get(key)
+
+    def put(self, key: str, text: str):
+        """Store extracted text, evicting old entries past the size cap"""
+        data = zlib.compress(text.encode("utf-8"), 6)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            conn = self._connection()
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Failed to write extraction cache entry: {e}")
+            return
+
+        evicted = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, size, used) "
+                    "VALUES (?, ?, ?)",
+                    (key, len(data), time.time())
+                )
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()[0]
+                while total > self.max_bytes:
+                    rows = conn.execute(
+                        "SELECT key, size FROM entries WHERE key != ? "
+                        "ORDER BY used LIMIT ?", (key, EVICT_BATCH)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for old_key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        conn.execute(
+                            "DELETE FROM entries WHERE key = ?", (old_key,)
+                        )
+                        evicted.append(old_key)
+                        total -= size
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Failed to index extraction cache entry: {e}")
+            return
+        self._remove_files(evicted)
+
+    def _discard(self, key: str):
+        try:
+            self._connection().execute(
+                "DELETE FROM entries WHERE key = ?", (key,)
+            )
+        except sqlite3.Error:
+            pass
+        self._remove_files([key])
+
+    def stats(self) -> dict:
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes
+        }
+
+
+# Global instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,43 @@
+"""Non-blocking exclusive locks on lock files, shared between processes."""
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Without either, nothing stops two processes sharing a lock file
+LOCKING_AVAILABLE = fcntl is not None or msvcrt is not None
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        # Windows locks byte ranges; every holder locks the first byte
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def try_lock(path: str):
+    """Open ``path`` and take an exclusive lock on it, or return None
+
+    The lock is held until the returned file is closed. Where the
+    platform has no file locks the file is returned unlocked; check
+    ``LOCKING_AVAILABLE`` first.
+    """
+    f = open(path, "a+")
+    try:
+        _lock(f)
+        # A claimant may have removed the file since we opened it
+        if os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+            raise OSError("lock file replaced")
+    except OSError:
+        f.close()
+        return None
+    return f
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CaseGraphCache:
+    """LRU cache of case subgraph responses.
+
+    Each case carries a version that is bumped whenever its documents
+    change, which drops every cached traversal of that case. A TTL bounds
+    staleness for deeper traversals that reach into other cases.
+    """
+
+    def __init__(
+        self, max_entries: Optional[int] = None, ttl: Optional[float] = None
+    ):
+        self.max_entries = max_entries or int(
+            os.getenv("CASE_GRAPH_CACHE_SIZE", 256)
+        )
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("CASE_GRAPH_CACHE_TTL", 300)
+        )
+        self._entries = OrderedDict()  # (case_id, depth, limit) -> entry
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, case_id: str) -> int:
+        return self._versions.get(case_id, 0)
+
+    def get(self, case_id: str, depth: int, limit: int) -> Optional[dict]:
+        key = (case_id, depth, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, stored_at, graph = entry
+            if (version != self.version(case_id) or
+                    time.monotonic() - stored_at > self.ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return graph
+
+    def put(
+        self, case_id: str, depth: int, limit: int, graph: dict, version: int
+    ):
+        """Store a traversal read at ``version`` unless the case changed"""
+        with self._lock:
+            if version != self.version(case_id):
+                return
+            self._entries[(case_id, depth, limit)] = (
+                version, time.monotonic(), graph
+            )
+            self._entries.move_to_end((case_id, depth, limit))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, case_id: str):
+        with self._lock:
+            self._versions[case_id] = self.version(case_id) + 1
+
+
+class CaseListCache:
+    """Versioned cache of the case list backing conditional GETs.
+
+    The version is bumped whenever a case is created in this process, and
+    also when a refresh after ``ttl`` finds the list changed by another
+    writer. ETags are a digest of the list itself, so every worker hands
+    out the same tag for the same list.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("CASE_LIST_CACHE_TTL", 30)
+        )
+        self._version = 0
+        self._modified = time.time()
+        self._cases = None
+        self._etag = None
+        self._cached_version = None
+        self._stored_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _stamp(self):
+        return self._etag, self._modified
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._modified = time.time()
+
+    def get(self):
+        """Return (cases, etag, last_modified) if fresh, else None"""
+        with self._lock:
+            if (self._cases is None or
+                    self._cached_version != self._version or
+                    time.monotonic() - self._stored_at > self.ttl):
+                return None
+            return (self._cases, *self._stamp())
+
+    def put(self, cases: list, version: int):
+        """Store a list read at ``version``
+
+        Returns (etag, last_modified) describing ``cases``, or None if a
+        case was created while it was being read.
+        """
+        with self._lock:
+            if version != self._version:
+                return None
+            if (self._cached_version == version and
+                    self._cases != cases):
+                # Changed by another worker or writer since the last read
+                self._version += 1
+                self._modified = time.time()
+            self._cases = cases
+            digest = hashlib.sha256(
+                json.dumps(cases, sort_keys=True, default=str).encode()
+            ).hexdigest()
+            self._etag = f'"cases-{digest[:20]}"'
+            self._cached_version = self._version
+            self._stored_at = time.monotonic()
+            return self._stamp()
+
+
+# Global instances
+case_graph_cache = CaseGraphCache()
+case_list_cache = CaseListCache()
@@ -1,28 +1,155 @@
 from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable
+from typing import List
 import os
 import logging
 
+from services.entity_index import entity_index, entity_key
+from services.entity_extractor import gazetteer
+from services.graph_cache import case_graph_cache, case_list_cache
+
 logger = logging.getLogger(__name__)
 
+# Constraints back every MERGE key with an index instead of a label scan
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT case_id IF NOT EXISTS "
+    "FOR (c:Case) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT document_id IF NOT EXISTS "
+    "FOR (d:Document) REQUIRE d.id IS UNIQUE",
+    "CREATE CONSTRAINT entity_key IF NOT EXISTS "
+    "FOR (e:Entity) REQUIRE e.key IS UNIQUE",
+    "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+    "CREATE INDEX case_created_at IF NOT EXISTS "
+    "FOR (c:Case) ON (c.created_at)",
+]
+
+# Canonical entity names loaded into the in-process index at connect
+ENTITY_INDEX_PRELOAD = 50000
+
+# One query per traversal depth around a case, each returning
+# (source, relationship, target) rows for the edges it adds
+SUBGRAPH_LAYERS = [
+    # 1: documents in the case
+    """
+    MATCH (c:Case {id: $case_id})-[r:CONTAINS]->(t:Document)
+    RETURN 'case:' + c.id AS source, type(r) AS type, t AS target,
+           'Document' AS label
+    LIMIT $limit
+    """,
+    # 2: entities those documents mention
+    """
+    MATCH (:Case {id: $case_id})-[:CONTAINS]->(d:Document)
+          -[r:MENTIONS]->(t:Entity)
+    RETURN 'document:' + d.id AS source, type(r) AS type, t AS target,
+           'Entity' AS label
+    LIMIT $limit
+    """,
+    # 3: documents in other cases mentioning the same entities
+    """
+    MATCH (c:Case {id: $case_id})-[:CONTAINS]->(:Document)
+          -[:MENTIONS]->(e:Entity)<-[r:MENTIONS]-(t:Document)
+    WHERE NOT (c)-[:CONTAINS]->(t)
+    RETURN DISTINCT 'entity:' + e.key AS source, type(r) AS type,
+           t AS target, 'Document' AS label
+    LIMIT $limit
+    """,
+]
+MAX_SUBGRAPH_DEPTH = len(SUBGRAPH_LAYERS)
+
 
 class GraphService:
     def __init__(self):
         self.uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.user = os.getenv("NEO4J_USER", "neo4j")
         self.password = os.getenv("NEO4J_PASSWORD", "password")
+        # Seconds to open a connection, so an unreachable server fails fast
+        self.connection_timeout = float(
+            os.getenv("NEO4J_CONNECTION_TIMEOUT", 10)
+        )
         self.driver = None
 
     def connect(self):
         try:
             self.driver = GraphDatabase.driver(
                 self.uri,
-                auth=(self.user, self.password)
+                auth=(self.user, self.password),
+                connection_timeout=self.connection_timeout
             )
             self.driver.verify_connectivity()
             logger.info("Connected to Neo4j Graph Database")
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
             self.driver = None
+            return
+
+        self.ensure_schema()
+        self.migrate_entity_keys()
+        self.load_entity_index()
+
+    def ensure_schema(self):
+        """Create uniqueness constraints and indexes if missing"""
+        try:
+            with self.driver.session() as session:
+                for statement in SCHEMA_STATEMENTS:
+                    session.run(statement).consume()
+        except Exception as e:
+            logger.error(f"Error creating graph schema: {e}")
+
+    def migrate_entity_keys(self):
+        """Re-key entities keyed by name alone to their typed keys
+
+        An entity whose typed key is already taken keeps its old key.
+        """
+        query = """
+        MATCH (e:Entity)
+        WHERE e.key IS NOT NULL AND NOT e.key CONTAINS ':'
+        RETURN e.key AS key, e.type AS type
+        """
+        update = """
+        UNWIND $rows AS row
+        MATCH (e:Entity {key: row.old})
+        OPTIONAL MATCH (taken:Entity {key: row.new})
+        WITH e, row, taken
+        WHERE taken IS NULL
+        SET e.key = row.new
+        """
+        try:
+            with self.driver.session() as session:
+                rows = [
+                    {
+                        "old": record["key"],
+                        "new": entity_key(record["key"], record["type"])
+                    }
+                    for record in session.run(query)
+                ]
+                if rows:
+                    session.run(update, rows=rows).consume()
+                    logger.info(f"Re-keyed {len(rows)} entities by type")
+        except Exception as e:
+            logger.error(f"Error migrating entity keys: {e}")
+
+    def load_entity_index(self):
+        """Seed the entity index and gazetteer with entities from the graph"""
+        query = """
+        MATCH (e:Entity)
+        WHERE e.key IS NOT NULL
+        RETURN e.key AS key, e.name AS name, e.type AS type,
+               e.aliases AS aliases
+        LIMIT $limit
+        """
+        try:
+            with self.driver.session() as session:
+                result = session.run(query, limit=ENTITY_INDEX_PRELOAD)
+                for record in result:
+                    entity_index.remember(record["key"], record["name"])
+                    entity_type = record["type"] or "Entity"
+                    gazetteer.add(record["name"], entity_type)
+                    for alias in record["aliases"] or []:
+                        gazetteer.add(alias, entity_type, record["name"])
+            # Here at connect rather than on the first request's path
+            gazetteer.rebuild()
+        except Exception as e:
+            logger.error(f"Error loading entity index: {e}")
 
     def close(self):
         if self.driver:
@@ -39,7 +166,8 @@ class GraphService:
         """
         try:
             with self.driver.session() as session:
-                session.run(query, case_id=case_id, title=title)
+                session.run(query, case_id=case_id, title=title).consume()
+            case_list_cache.bump()
         except Exception as e:
             logger.error(f"Error creating case in graph: {e}")
 
@@ -48,6 +176,7 @@ class GraphService:
     ):
         if not self.driver:
             return
+        case_graph_cache.invalidate(case_id)
 
         query = """
         MATCH (c:Case {id: $case_id})
@@ -73,10 +202,17 @@ class GraphService:
         if not self.driver:
             return
 
+        resolved = entity_index.resolve(name, entity_type)
+        if not resolved:
+            return
+        key, canonical_name = resolved
+
         query = """
         MATCH (d:Document {id: $doc_id})
-        MERGE (e:Entity {name: $name})
-        SET e.type = $entity_type
+        MERGE (e:Entity {key: $key})
+        ON CREATE SET e.name = $name, e.aliases = [], e.type = $entity_type
+        SET e.aliases = CASE WHEN $alias IN e.aliases
+                             THEN e.aliases ELSE e.aliases + $alias END
         MERGE (d)-[:MENTIONS]->(e)
         """
         try:
@@ -84,16 +220,168 @@ class GraphService:
                 session.run(
                     query,
                     doc_id=doc_id,
-                    name=name,
+                    key=key,
+                    name=canonical_name,
+                    alias=name,
                     entity_type=entity_type
                 )
         except Exception as e:
             logger.error(f"Error adding entity to graph: {e}")
 
+    def write_batch(self, ops: List[dict]):
+        """Apply queued case/document/entity writes in one transaction
+
+        Unlike the single-write helpers this raises on failure so the
+        caller can keep the batch and retry.
+        """
+        if not self.driver:
+            self.connect()
+        if not self.driver:
+            raise ServiceUnavailable("Neo4j is not connected")
+
+        cases = [op for op in ops if op["op"] == "case"]
+        documents = [op for op in ops if op["op"] == "document"]
+        # One MERGE per (document, entity) even if several aliases appeared
+        entities = list({
+            (op["doc_id"], op["key"]): op
+            for op in ops if op["op"] == "entity"
+        }.values())
+
+        with self.driver.session() as session:
+            cases_created = session.execute_write(
+                self._write_batch_tx, cases, documents, entities
+            )
+        # Analyses re-queue their case every time; only new ones count
+        if cases_created:
+            case_list_cache.bump()
+        for case_id in {op["case_id"] for op in documents}:
+            case_graph_cache.invalidate(case_id)
+
+    @staticmethod
+    def _write_batch_tx(tx, cases, documents, entities) -> int:
+        """Apply a batch, returning how many cases it created"""
+        cases_created = 0
+        # Parents first so the MATCH clauses below find them
+        if cases:
+            cases_created = tx.run("""
+            UNWIND $rows AS row
+            MERGE (c:Case {id: row.case_id})
+            ON CREATE SET c.title = row.title, c.created_at = datetime()
+            """, rows=cases).consume().counters.nodes_created
+        if documents:
+            tx.run("""
+            UNWIND $rows AS row
+            MATCH (c:Case {id: row.case_id})
+            MERGE (d:Document {id: row.doc_id})
+            SET d.filename = row.filename,
+                d.summary = row.summary,
+                d.created_at = datetime()
+            MERGE (c)-[:CONTAINS]->(d)
+            """, rows=documents)
+        if entities:
+            tx.run("""
+            UNWIND $rows AS row
+            MATCH (d:Document {id: row.doc_id})
+            MERGE (e:Entity {key: row.key})
+            ON CREATE SET e.name = row.name, e.aliases = [],
+                          e.type = row.entity_type
+            SET e.aliases = CASE WHEN row.alias IN e.aliases
+                                 THEN e.aliases
+                                 ELSE e.aliases + row.alias END
+            MERGE (d)-[:MENTIONS]->(e)
+            """, rows=entities)
+        return cases_created
+
+    @staticmethod
+    def _graph_node(node_id: str, label: str, node) -> dict:
+        properties = {}
+        for name, value in dict(node).items():
+            # Neo4j temporal values are not JSON serializable
+            properties[name] = (
+                value if isinstance(value, (str, int, float, bool, list))
+                else str(value)
+            )
+        return {"id": node_id, "label": label, "properties": properties}
+
+    def get_case_subgraph(self, case_id: str, depth: int, limit: int):
+        """Fetch a case with its documents, entities and relationships
+
+        Traverses up to ``depth`` layers (see SUBGRAPH_LAYERS) and stops
+        after ``limit`` edges. Records are consumed as the driver streams
+        them, and edges from nodes left out of the result are dropped.
+        Returns None if the case does not exist.
+        """
+        if not self.driver:
+            return None
+
+        depth = max(1, min(depth, MAX_SUBGRAPH_DEPTH))
+        nodes = {}
+        edges = []
+        truncated = False
+        try:
+            with self.driver.session(fetch_size=min(limit, 1000)) as session:
+                record = session.run(
+                    "MATCH (c:Case {id: $case_id}) RETURN c",
+                    case_id=case_id
+                ).single()
+                if record is None:
+                    return None
+                case_node_id = f"case:{case_id}"
+                nodes[case_node_id] = self._graph_node(
+                    case_node_id, "Case", record["c"]
+                )
+
+                for query in SUBGRAPH_LAYERS[:depth]:
+                    remaining = limit - len(edges)
+                    if remaining <= 0:
+                        truncated = True
+                        break
+                    result = session.run(
+                        query, case_id=case_id, limit=remaining + 1
+                    )
+                    for record in result:
+                        if len(edges) == limit:
+                            truncated = True
+                            break
+                        if record["source"] not in nodes:
+                            # Its source was cut from an earlier layer
+                            truncated = True
+                            continue
+                        label = record["label"]
+                        target = record["target"]
+                        key = target["key"] if label == "Entity" else (
+                            target["id"]
+                        )
+                        target_id = f"{label.lower()}:{key}"
+                        if target_id not in nodes:
+                            nodes[target_id] = self._graph_node(
+                                target_id, label, target
+                            )
+                        edges.append({
+                            "source": record["source"],
+                            "target": target_id,
+                            "type": record["type"]
+                        })
+                    result.consume()
+        except Exception as e:
+            logger.error(f"Error fetching case subgraph: {e}")
+            raise
+
+        return {
+            "case_id": case_id,
+            "depth": depth,
+            "nodes": list(nodes.values()),
+            "edges": edges,
+            "truncated": truncated
+        }
+
     def get_all_cases(self):
-        """Fetch all cases from the graph database"""
+        """Fetch all cases from the graph database
+
+        Returns None, rather than an empty list, if Neo4j is unavailable.
+        """
         if not self.driver:
-            return []
+            return None
 
         query = """
         MATCH (c:Case)
@@ -108,7 +396,7 @@ class GraphService:
                 return [dict(record) for record in result]
         except Exception as e:
             logger.error(f"Error fetching cases from graph: {e}")
-            return []
+            return None
 
 
 # Global instance
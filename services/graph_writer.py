@@ -0,0 +1,444 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+import asyncio
+import json
+import logging
+import os
+import re
+
+from services.entity_index import entity_index
+from services.file_lock import LOCKING_AVAILABLE, try_lock
+from services.graph_db import graph_service, GraphService
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 60.0
+# A batch failing this often while Neo4j is reachable is written op by
+# op, and ops that still fail are set aside in the dead-letter file
+MAX_BATCH_ATTEMPTS = int(os.getenv("GRAPH_MAX_BATCH_ATTEMPTS", 5))
+# Neo4j being unreachable is retried indefinitely, never dead-lettered
+UNAVAILABLE_ERRORS = (
+    ServiceUnavailable, SessionExpired, TransientError, OSError
+)
+# Past this many pending writes the oldest are set aside in the
+# dead-letter file, so a long outage cannot exhaust memory
+MAX_PENDING = int(os.getenv("GRAPH_MAX_PENDING", 100000))
+# Written writes are acknowledged by appending to the journal; it is only
+# rewritten once acknowledged writes outnumber pending ones and this
+JOURNAL_COMPACT_OPS = int(os.getenv("GRAPH_JOURNAL_COMPACT_OPS", 1000))
+
+
+class GraphWriteBuffer:
+    """Write-behind buffer for graph writes made on the analysis path.
+
+    Writes are appended to a local JSON-lines journal and queued in memory.
+    A background task flushes them to Neo4j in batched transactions once
+    ``batch_size`` writes are pending or every ``flush_interval`` seconds,
+    backing off while Neo4j is unavailable.
+
+    Each process journals to its own ``<name>.<pid><ext>`` file, which it
+    holds a lock on, and all journal I/O runs on one dedicated thread.
+    Flushed writes are acknowledged with an ``ack`` line rather than by
+    rewriting the journal, which is compacted only now and then. At
+    startup a process replays its own journal and claims those of
+    processes that are gone, so queued writes survive a restart without
+    being applied twice.
+    """
+
+    def __init__(
+        self,
+        service: GraphService,
+        journal_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None
+    ):
+        self.service = service
+        self.journal_base = journal_path or os.getenv(
+            "GRAPH_JOURNAL_PATH", "./graph_journal.jsonl"
+        )
+        root, ext = os.path.splitext(self.journal_base)
+        self.journal_path = f"{root}.{os.getpid()}{ext}"
+        self.dead_letter_path = f"{root}.dead{ext}"
+        self.batch_size = batch_size or int(
+            os.getenv("GRAPH_FLUSH_BATCH_SIZE", 200)
+        )
+        self.flush_interval = flush_interval or float(
+            os.getenv("GRAPH_FLUSH_INTERVAL", 2.0)
+        )
+        self.max_pending = MAX_PENDING
+        self._pending: List[dict] = []
+        # Acknowledged writes still taking up space in the journal
+        self._acked = 0
+        self._failures = 0
+        self._journal = None
+        self._lock_file = None
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def enqueue_case(self, case_id: str, title: str):
+        self._enqueue([{"op": "case", "case_id": case_id, "title": title}])
+
+    def enqueue_document(
+        self,
+        case_id: str,
+        doc_id: str,
+        filename: Optional[str],
+        summary: str,
+        entities: List[dict]
+    ):
+        """Queue a document and its entities under an existing case"""
+        ops = [{
+            "op": "document",
+            "case_id": case_id,
+            "doc_id": doc_id,
+            "filename": filename,
+            "summary": summary
+        }]
+        for entity in entities:
+            # Entities come straight from the LLM, so skip malformed ones
+            name = entity.get("name") if isinstance(entity, dict) else None
+            if not isinstance(name, str):
+                continue
+            op = self._entity_op(
+                doc_id, name, str(entity.get("type") or "Unknown")
+            )
+            if op:
+                ops.append(op)
+        self._enqueue(ops)
+
+    @staticmethod
+    def _entity_op(doc_id: str, name: str, entity_type: str):
+        """Resolve a raw entity name to its canonical graph key"""
+        resolved = entity_index.resolve(name, entity_type)
+        if not resolved:
+            return None
+        key, canonical_name = resolved
+        return {
+            "op": "entity",
+            "doc_id": doc_id,
+            "key": key,
+            "name": canonical_name,
+            "alias": " ".join(name.split()),
+            "entity_type": entity_type
+        }
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # One thread keeps appends and compactions in order
+        if self._io is None:
+            self._io = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="graph-journal"
+            )
+        return self._io
+
+    def _enqueue(self, ops: List[dict]):
+        lines = "".join(json.dumps(op) + "\n" for op in ops)
+        self._executor().submit(self._append_journal, lines)
+
+        self._pending.extend(ops)
+        if self._wake and len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def sync_journal(self):
+        """Block until every queued journal write has been made"""
+        self._executor().submit(lambda: None).result()
+
+    def _append_journal(self, lines: str, durable: bool = False):
+        try:
+            journal = self._open_journal()
+            journal.write(lines)
+            journal.flush()
+            if durable:
+                os.fsync(journal.fileno())
+        except OSError as e:
+            logger.error(f"Failed to journal graph writes: {e}")
+            if durable:
+                raise
+
+    def _open_journal(self):
+        if self._journal is None:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._lock_file is None:
+                self._lock_file = try_lock(self.journal_path + ".lock")
+                if self._lock_file is None:
+                    logger.warning(
+                        f"Graph journal {self.journal_path} is locked by "
+                        f"another writer"
+                    )
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return self._journal
+
+    def _rewrite_journal(self, ops: List[dict]):
+        """Replace the journal with the writes that are still pending"""
+        try:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(op) + "\n" for op in ops))
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logger.error(f"Failed to compact graph journal: {e}")
+
+    def _read_journal(self, path: str) -> List[dict]:
+        ops = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    logger.warning("Skipping corrupt graph journal entry")
+                    continue
+                if op.get("op") == "ack":
+                    # The oldest writes before it were dealt with
+                    del ops[:op["count"]]
+                    continue
+                if op.get("op") == "entity" and ":" not in op.get("key", ""):
+                    # Journaled before entities were keyed by type
+                    op = self._entity_op(
+                        op["doc_id"], op["name"], op["entity_type"]
+                    )
+                if op:
+                    ops.append(op)
+        return ops
+
+    def _orphaned_journals(self) -> List[str]:
+        """Journals of other processes, and the pre-per-process journal"""
+        directory = os.path.dirname(self.journal_base) or "."
+        root, ext = os.path.splitext(os.path.basename(self.journal_base))
+        pattern = re.compile(re.escape(root) + r"(\.\d+)?" + re.escape(ext))
+        own = os.path.abspath(self.journal_path)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        return sorted(
+            path for path in (
+                os.path.join(directory, name) for name in names
+                if pattern.fullmatch(name)
+            )
+            if os.path.abspath(path) != own
+        )
+
+    def _claim(self, path: str) -> List[dict]:
+        """Take over the journal of a process that is no longer running"""
+        lock_path = path + ".lock"
+        lock = try_lock(lock_path)
+        if lock is None:
+            return []  # Its writer is still running
+        try:
+            if not os.path.exists(path):
+                return []
+            ops = self._read_journal(path)
+            if ops:
+                # Durable here before the orphan goes; a crash in between
+                # only repeats writes, which are idempotent MERGEs
+                self._append_journal(
+                    "".join(json.dumps(op) + "\n" for op in ops),
+                    durable=True
+                )
+                logger.info(f"Claimed {len(ops)} graph writes from {path}")
+            os.remove(path)
+            return ops
+        except OSError as e:
+            logger.error(f"Failed to claim graph journal {path}: {e}")
+            return []
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+            lock.close()
+
+    def _recover(self) -> List[dict]:
+        """Pending writes from our journal plus any orphaned ones"""
+        self._open_journal()
+        ops = self._read_journal(self.journal_path)
+        if not LOCKING_AVAILABLE:
+            # A running writer's journal would look orphaned
+            logger.warning(
+                "No file locking on this platform; not claiming the "
+                "journals of other processes"
+            )
+            return ops
+        for path in self._orphaned_journals():
+            ops.extend(self._claim(path))
+        return ops
+
+    def _dead_letter(self, op: dict, error: Exception):
+        logger.error(f"Setting aside graph write that keeps failing: {error}")
+        self._set_aside([op], str(error))
+
+    def _set_aside(self, ops: List[dict], error: str):
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write("".join(
+                    json.dumps({"op": op, "error": error}) + "\n"
+                    for op in ops
+                ))
+        except OSError as e:
+            logger.error(f"Failed to record dead graph write: {e}")
+
+    def _acknowledge(self, count: int, remaining: Optional[List[dict]]):
+        """Mark the oldest ``count`` journaled writes as dealt with"""
+        if remaining is not None:
+            self._rewrite_journal(remaining)
+        else:
+            self._append_journal(
+                json.dumps({"op": "ack", "count": count}) + "\n"
+            )
+
+    async def _settle(self, count: int):
+        """Acknowledge ``count`` writes removed from the front of the queue"""
+        self._acked += count
+        remaining = None
+        if not self._pending or self._acked > max(
+            JOURNAL_COMPACT_OPS, len(self._pending)
+        ):
+            remaining = list(self._pending)
+            self._acked = 0
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor(), self._acknowledge, count, remaining
+        )
+
+    async def _shed(self):
+        """Set aside the oldest writes beyond ``max_pending``"""
+        overflow = len(self._pending) - self.max_pending
+        if overflow <= 0:
+            return
+        shed = self._pending[:overflow]
+        del self._pending[:overflow]
+        logger.error(
+            f"Graph write buffer full; set aside {overflow} oldest writes "
+            f"in {self.dead_letter_path}"
+        )
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor(), self._set_aside, shed, "write buffer full"
+        )
+        await self._settle(overflow)
+
+    def _write_each(self, batch: List[dict]) -> int:
+        """Write ops one at a time, dead-lettering those that fail
+
+        Returns how many ops were dealt with before Neo4j became
+        unavailable, if it did.
+        """
+        for done, op in enumerate(batch):
+            try:
+                self.service.write_batch([op])
+            except UNAVAILABLE_ERRORS:
+                return done
+            except Exception as e:
+                self._dead_letter(op, e)
+        return len(batch)
+
+    async def flush(self) -> bool:
+        """Write one batch to Neo4j, returning False if it failed"""
+        # Only trimmed here, so no batch is in flight while it happens
+        await self._shed()
+        batch = self._pending[:self.batch_size]
+        if not batch:
+            return True
+        done = len(batch)
+        try:
+            await asyncio.to_thread(self.service.write_batch, batch)
+        except UNAVAILABLE_ERRORS as e:
+            logger.warning(f"Graph flush failed, will retry: {e}")
+            return False
+        except Exception as e:
+            self._failures += 1
+            if self._failures < MAX_BATCH_ATTEMPTS:
+                logger.warning(
+                    f"Graph flush failed ({self._failures}/"
+                    f"{MAX_BATCH_ATTEMPTS}), will retry: {e}"
+                )
+                return False
+            logger.error(f"Graph batch keeps failing, writing op by op: {e}")
+            done = await asyncio.to_thread(self._write_each, batch)
+
+        if done == len(batch):
+            self._failures = 0
+        if done:
+            del self._pending[:done]
+            await self._settle(done)
+        return done == len(batch)
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            while self._pending:
+                if await self.flush():
+                    backoff = self.flush_interval
+                    continue
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RETRY_DELAY)
+
+    async def start(self):
+        """Replay journaled writes and start the background flusher"""
+        replayed = await asyncio.get_running_loop().run_in_executor(
+            self._executor(), self._recover
+        )
+        if replayed:
+            logger.info(f"Replaying {len(replayed)} journaled graph writes")
+        # The journal already holds anything enqueued before startup
+        self._pending = replayed
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def _close(self):
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        if not self._pending:
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+        if self._lock_file:
+            # Left-over writes are claimed by the next process to start
+            try:
+                os.remove(self.journal_path + ".lock")
+            except OSError:
+                pass
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def stop(self):
+        """Stop the flusher, attempting one last flush of pending writes"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._pending:
+            if not await self.flush():
+                logger.warning(
+                    f"{len(self._pending)} graph writes left in journal"
+                )
+                break
+        io = self._executor()
+        await asyncio.get_running_loop().run_in_executor(io, self._close)
+        io.shutdown(wait=True)
+        self._io = None
+
+
+# Global instance
+graph_writer = GraphWriteBuffer(graph_service)
@@ -0,0 +1,164 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 15))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 5))
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+def ollama_base_url(llm) -> str:
+    """Base URL the Ollama client talks to, resolved like the client does"""
+    url = getattr(llm, "base_url", None) or os.getenv("OLLAMA_HOST") \
+        or DEFAULT_OLLAMA_URL
+    if "://" not in url:
+        url = "http://" + url
+    return url.rstrip("/")
+
+
+def _get_json(url: str, timeout: float) -> dict:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def check_ollama(llm, timeout: float = HEALTH_PROBE_TIMEOUT) -> dict:
+    """Whether Ollama answers, has the model, and has it in memory"""
+    base = ollama_base_url(llm)
+    model = llm.model
+    installed = _get_json(f"{base}/api/tags", timeout).get("models", [])
+    running = _get_json(f"{base}/api/ps", timeout).get("models", [])
+    if not any(_is_model(m, model) for m in installed):
+        raise LookupError(f"model {model} is not installed")
+    return {
+        "model": model,
+        "model_loaded": any(_is_model(m, model) for m in running),
+    }
+
+
+def _is_model(entry: dict, model: str) -> bool:
+    # "llama3.1" is served as "llama3.1:latest", or under another tag
+    name = entry.get("name") or ""
+    return name == model or name.startswith(model + ":")
+
+
+def check_neo4j(graph_service) -> dict:
+    if graph_service.driver is None:
+        raise ConnectionError("not connected")
+    graph_service.driver.verify_connectivity()
+    return {}
+
+
+def check_chroma(client, collection) -> dict:
+    client.heartbeat()
+    return {"documents": collection.count()}
+
+
+class HealthProber:
+    """Probes dependencies in the background and caches the results.
+
+    Each registered check runs on its own thread every ``interval``
+    seconds with a ``timeout``; ``/health`` serves the last snapshot
+    instead of touching any dependency itself. A check succeeds unless it
+    raises, and may return extra details to report. A check still stuck
+    in an earlier run is reported as timed out rather than started again,
+    so a hung dependency holds one thread, not one per probe.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEALTH_PROBE_INTERVAL,
+        timeout: float = HEALTH_PROBE_TIMEOUT
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self._checks: Dict[str, Callable[[], dict]] = {}
+        self._snapshot: Dict[str, dict] = {}
+        self._threads: Dict[str, ThreadPoolExecutor] = {}
+        self._running: Dict[str, Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: Callable[[], dict]):
+        self._checks[name] = check
+
+    def _submit(self, name: str, check: Callable[[], dict]) -> Future:
+        """Start ``check`` unless its previous run is still going"""
+        running = self._running.get(name)
+        if running is not None and not running.done():
+            return running
+        if name not in self._threads:
+            self._threads[name] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"health-{name}"
+            )
+        future = self._threads[name].submit(check)
+        self._running[name] = future
+        return future
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Latest result of every check that has run"""
+        return self._snapshot
+
+    async def _probe(self, name: str, check: Callable[[], dict]) -> dict:
+        started = time.perf_counter()
+        future = self._submit(name, check)
+        try:
+            # Shielded: a timed-out run keeps its thread until it returns
+            details = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self.timeout
+            )
+            result = {"ok": True, **(details or {})}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": "timeout"}
+        except Exception as e:
+            logger.warning(f"Health probe {name} failed: {e}")
+            # Messages can carry URIs; report only that it failed
+            result = {"ok": False, "error": "unavailable"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = time.time()
+        return result
+
+    async def probe_all(self) -> Dict[str, dict]:
+        """Run every check concurrently and publish the results"""
+        names = list(self._checks)
+        results = await asyncio.gather(
+            *(self._probe(name, self._checks[name]) for name in names)
+        )
+        # Swap in a new dict so readers never see a partial update
+        self._snapshot = dict(zip(names, results))
+        return self._snapshot
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health probing failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for executor in self._threads.values():
+            # Don't wait on a check that is hung
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._threads = {}
+        self._running = {}
+
+
+# Global instance
+health_prober = HealthProber()
@@ -0,0 +1,363 @@
+from collections import deque
+from typing import Callable, Dict, Optional
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import math
+import os
+import time
+
+from services.llm_slots import llm_slots
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Lower value is served first
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+DEFAULT_DEADLINES = {
+    INTERACTIVE: float(os.getenv("LLM_INTERACTIVE_DEADLINE", 60)),
+    BATCH: float(os.getenv("LLM_BATCH_DEADLINE", 900)),
+}
+
+# Longest predicted queue wait at which new work is still accepted
+ADMISSION_SLOS = {
+    INTERACTIVE: float(os.getenv("LLM_INTERACTIVE_SLO", 30)),
+    BATCH: float(os.getenv("LLM_BATCH_SLO", 600)),
+}
+# Weight of each new observation in the service time average
+SERVICE_TIME_ALPHA = 0.2
+
+WAIT_SAMPLES = 500
+DISCONNECT_POLL_SECONDS = 0.5
+MAX_TRACKED_FLOWS = 10000
+
+
+class LLMDeadlineExceeded(Exception):
+    """Queued LLM work was dropped because its deadline passed"""
+
+
+class LLMOverloaded(Exception):
+    """New LLM work was refused because the queue is too long"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientDisconnected(Exception):
+    """The client went away before its LLM result was ready"""
+
+
+def generation_fn(llm) -> Callable:
+    """Pick the model's async API when it has one
+
+    Cancelling an async generation closes its HTTP stream, which makes
+    Ollama stop generating; a call running in a thread cannot be stopped.
+    """
+    ainvoke = getattr(llm, "ainvoke", None)
+    if inspect.iscoroutinefunction(ainvoke):
+        return ainvoke
+    return llm.invoke
+
+
+class _Ticket:
+    __slots__ = ("priority", "flow", "start", "cost", "future", "enqueued")
+
+    def __init__(self, priority, flow, start, cost, future):
+        self.priority = priority
+        self.flow = flow
+        self.start = start
+        self.cost = cost
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+def _admitted(ticket: _Ticket) -> bool:
+    return ticket.future.done() and not ticket.future.cancelled()
+
+
+class LLMScheduler:
+    """Admits LLM calls in priority order with per-flow fairness.
+
+    Interactive work always goes ahead of batch work. Within a priority
+    class, requests are ordered by start-time fair queuing over flows (a
+    case or a client), with each request's tag advanced by its cost, so a
+    large ingest for one case cannot starve other cases. Requests still
+    queued when their deadline passes are dropped with
+    ``LLMDeadlineExceeded``.
+
+    :meth:`admit` sheds load before it queues: it predicts the wait from
+    the queued and running cost and the observed service time per unit
+    of cost, and refuses work whose wait would exceed its class's SLO.
+
+    The scheduler orders work inside one process; admitted calls still
+    take a server-wide slot from ``llm_slots``.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, slots=llm_slots):
+        self.slots = slots
+        self.capacity = capacity or slots.max_concurrency
+        self._queue = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_cost = 0.0
+        self._service_time: Optional[float] = None
+        self._shed = {p: 0 for p in PRIORITIES}
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[str, float] = {}
+        self._waits = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITIES}
+        self._dropped = {p: 0 for p in PRIORITIES}
+        self._completed = 0
+        self._durations = deque(maxlen=WAIT_SAMPLES)
+        self._cancelled = {"queued": 0, "running": 0}
+        self._cancelled_seconds = 0.0
+        self._saved_seconds = 0.0
+
+    def _enqueue(self, flow: str, priority: str, cost: float) -> _Ticket:
+        start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        self._flow_finish[flow] = start + cost
+        if len(self._flow_finish) > MAX_TRACKED_FLOWS:
+            # Flows that finished in the past carry no backlog
+            self._flow_finish = {
+                f: finish for f, finish in self._flow_finish.items()
+                if finish > self._virtual_time
+            }
+
+        future = asyncio.get_running_loop().create_future()
+        ticket = _Ticket(priority, flow, start, cost, future)
+        heapq.heappush(
+            self._queue,
+            (PRIORITIES[priority], start, next(self._seq), ticket)
+        )
+        return ticket
+
+    def _dispatch(self):
+        while self._queue and self._running < self.capacity:
+            *_, ticket = heapq.heappop(self._queue)
+            if ticket.future.done():
+                # Timed out or cancelled while queued
+                continue
+            self._running += 1
+            self._running_cost += ticket.cost
+            self._virtual_time = max(self._virtual_time, ticket.start)
+            self._waits[ticket.priority].append(
+                time.monotonic() - ticket.enqueued
+            )
+            ticket.future.set_result(None)
+
+    def _release(self, cost: float):
+        self._running -= 1
+        self._running_cost -= cost
+        self._dispatch()
+
+    def _record_service(self, seconds: float, cost: float):
+        per_cost = seconds / max(cost, 1e-6)
+        if self._service_time is None:
+            self._service_time = per_cost
+        else:
+            self._service_time += SERVICE_TIME_ALPHA * (
+                per_cost - self._service_time
+            )
+
+    def predicted_wait(self, priority: str) -> float:
+        """Seconds new ``priority`` work would likely wait in the queue"""
+        if self._service_time is None:
+            return 0.0
+        rank = PRIORITIES[priority]
+        ahead = sum(
+            ticket.cost for rank_, _, _, ticket in self._queue
+            if rank_ <= rank and not ticket.future.done()
+        )
+        # Running work is on average half done
+        backlog = ahead + self._running_cost / 2
+        if self._running < self.capacity and not ahead:
+            return 0.0
+        return backlog * self._service_time / self.capacity
+
+    def admit(self, priority: str = INTERACTIVE) -> float:
+        """Raise ``LLMOverloaded`` if new work would miss its SLO
+
+        Returns the predicted wait otherwise. Until a call has completed
+        there is no service time to predict from, and everything is
+        admitted.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        wait = self.predicted_wait(priority)
+        slo = ADMISSION_SLOS[priority]
+        if wait > slo:
+            self._shed[priority] += 1
+            retry_after = max(1, math.ceil(wait - slo))
+            logger.warning(
+                f"Shed {priority} LLM request: predicted wait "
+                f"{wait:.0f}s exceeds {slo:.0f}s"
+            )
+            raise LLMOverloaded(
+                f"predicted wait {wait:.0f}s exceeds {slo:.0f}s",
+                retry_after
+            )
+        return wait
+
+    def _record_cancel(self, elapsed: float):
+        self._cancelled["running"] += 1
+        self._cancelled_seconds += elapsed
+        if self._durations:
+            # Estimate the rest of the generation from recent completions
+            typical = sum(self._durations) / len(self._durations)
+            self._saved_seconds += max(0.0, typical - elapsed)
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        flow: str,
+        priority: str = INTERACTIVE,
+        deadline: Optional[float] = None,
+        cost: float = 1.0
+    ):
+        """Run ``func(*args)`` once the scheduler admits it
+
+        Coroutine functions are awaited, so cancelling the caller aborts
+        the generation; plain functions run in a thread and keep their
+        slot until they return. ``deadline`` is the longest the call may
+        wait, in seconds, in the queue and then for a server-wide slot; it
+        defaults to the priority class's deadline.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        if deadline is None:
+            deadline = DEFAULT_DEADLINES[priority]
+        give_up = time.monotonic() + deadline
+
+        ticket = self._enqueue(flow, priority, cost)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(ticket.future, deadline)
+        except asyncio.TimeoutError:
+            # The grant can land in the same tick the deadline fires
+            if not _admitted(ticket):
+                raise self._dropped_error(priority, flow, deadline)
+        except asyncio.CancelledError:
+            if _admitted(ticket):
+                # Admitted just before the caller went away
+                self._release(cost)
+            else:
+                self._cancelled["queued"] += 1
+            raise
+
+        # Waiting for a server-wide slot is still part of queueing: the
+        # deadline bounds it, and cancelling it counts as queued
+        queued = True
+        try:
+            async with self.slots.slot(
+                timeout=max(0.0, give_up - time.monotonic())
+            ):
+                queued = False
+                started = time.monotonic()
+                try:
+                    result = await self._generate(func, *args)
+                except asyncio.CancelledError:
+                    self._record_cancel(time.monotonic() - started)
+                    raise
+                elapsed = time.monotonic() - started
+                self._durations.append(elapsed)
+                self._record_service(elapsed, cost)
+                self._completed += 1
+                return result
+        except asyncio.TimeoutError:
+            if not queued:
+                raise
+            raise self._dropped_error(priority, flow, deadline)
+        except asyncio.CancelledError:
+            if queued:
+                self._cancelled["queued"] += 1
+            raise
+        finally:
+            self._release(cost)
+
+    def _dropped_error(
+        self, priority: str, flow: str, deadline: float
+    ) -> LLMDeadlineExceeded:
+        self._dropped[priority] += 1
+        logger.warning(
+            f"Dropped {priority} LLM request for {flow} "
+            f"after {deadline:.0f}s in queue"
+        )
+        return LLMDeadlineExceeded(
+            f"LLM request waited longer than {deadline:.0f}s"
+        )
+
+    async def _generate(self, func: Callable, *args):
+        if inspect.iscoroutinefunction(func):
+            return await func(*args)
+
+        work = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        try:
+            return await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # The thread keeps running; hold the slot until it is done
+            await asyncio.wait({work})
+            raise
+
+    def stats(self) -> dict:
+        queued = {p: 0 for p in PRIORITIES}
+        for *_, ticket in self._queue:
+            if not ticket.future.done():
+                queued[ticket.priority] += 1
+
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[priority] = {
+                "samples": len(ordered),
+                "mean": round(sum(ordered) / len(ordered), 3)
+                if ordered else 0.0,
+                "p95": round(ordered[int(len(ordered) * 0.95)], 3)
+                if ordered else 0.0,
+                "max": round(ordered[-1], 3) if ordered else 0.0,
+            }
+
+        return {
+            "capacity": self.capacity,
+            "running": self._running,
+            "queued": queued,
+            "wait_seconds": waits,
+            "dropped": dict(self._dropped),
+            "shed": dict(self._shed),
+            "predicted_wait_seconds": {
+                p: round(self.predicted_wait(p), 3) for p in PRIORITIES
+            },
+            "service_seconds_per_cost": round(self._service_time, 3)
+            if self._service_time is not None else None,
+            "completed": self._completed,
+            "cancelled": dict(self._cancelled),
+            "cancelled_generation_seconds": round(self._cancelled_seconds, 3),
+            "saved_generation_seconds": round(self._saved_seconds, 3),
+        }
+
+
+async def cancel_on_disconnect(
+    request, awaitable, poll_interval: float = DISCONNECT_POLL_SECONDS
+):
+    """Await ``awaitable``, cancelling it if the HTTP client disconnects"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.wait({task})
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# Global instance
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,162 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+POLL_INITIAL = 0.05
+POLL_MAX = 1.0
+
+
+class LLMSlots:
+    """Cross-process semaphore bounding concurrent LLM generations.
+
+    Slots are leases in a SQLite database shared by every worker on the
+    host, so ``max_concurrency`` is a budget for the whole server rather
+    than per process. Leases expire after ``lease_seconds`` in case a
+    worker dies while holding one.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None
+    ):
+        self.db_path = db_path or os.getenv("LLM_SLOTS_DB", "./llm_slots.db")
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("LLM_MAX_CONCURRENCY", 2)
+        )
+        self.lease_seconds = lease_seconds or float(
+            os.getenv("LLM_SLOT_LEASE_SECONDS", 600)
+        )
+        self._local = threading.local()
+        self._active = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def active(self) -> int:
+        """Slots currently held by this process"""
+        return self._active
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_slots (
+                    holder TEXT PRIMARY KEY,
+                    expires REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self) -> Optional[str]:
+        """Take a slot if one is free, returning its lease id"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM llm_slots WHERE expires < ?", (now,))
+            (held,) = conn.execute("SELECT COUNT(*) FROM llm_slots").fetchone()
+            lease = None
+            if held < self.max_concurrency:
+                lease = f"{os.getpid()}-{uuid.uuid4().hex}"
+                conn.execute(
+                    "INSERT INTO llm_slots (holder, expires) VALUES (?, ?)",
+                    (lease, now + self.lease_seconds)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return lease
+
+    def release(self, lease: str):
+        self._connection().execute(
+            "DELETE FROM llm_slots WHERE holder = ?", (lease,)
+        )
+
+    def _abandon(self, attempt: asyncio.Future):
+        # An acquire whose waiter was cancelled may still have got a slot
+        if not attempt.cancelled() and attempt.exception() is None:
+            lease = attempt.result()
+            if lease:
+                asyncio.get_running_loop().run_in_executor(
+                    None, self.release, lease
+                )
+
+    async def _acquire(self, timeout: Optional[float]) -> str:
+        give_up = None if timeout is None else time.monotonic() + timeout
+        delay = POLL_INITIAL
+        while True:
+            attempt = asyncio.ensure_future(
+                asyncio.to_thread(self.try_acquire)
+            )
+            try:
+                lease = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                attempt.add_done_callback(self._abandon)
+                raise
+            if lease:
+                return lease
+            if give_up is not None:
+                remaining = give_up - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """Hold one server-wide LLM slot for the duration of the block
+
+        Raises ``asyncio.TimeoutError`` if no slot is free within
+        ``timeout`` seconds.
+        """
+        lease = await self._acquire(timeout)
+
+        self._active += 1
+        if self._idle:
+            self._idle.clear()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0 and self._idle:
+                self._idle.set()
+            try:
+                await asyncio.to_thread(self.release, lease)
+            except sqlite3.Error as e:
+                # The lease expires on its own
+                logger.error(f"Failed to release LLM slot: {e}")
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for this process's in-flight generations to finish"""
+        if self._active == 0:
+            return True
+        self._idle = asyncio.Event()
+        logger.info(f"Draining {self._active} in-flight LLM generations")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{self._active} LLM generations still running at shutdown"
+            )
+            return False
+
+
+# Global instance
+llm_slots = LLMSlots()
@@ -0,0 +1,267 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+)
+from typing import Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+from services.profiling import track_stages
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "{pid}" is replaced, so several workers can each rotate their own file
+LOG_FILE = os.getenv("LOG_FILE", "backend.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+# e.g. "midnight" or "H" to rotate by time instead of size
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN")
+# Console format: "text" or "json"; the file is always JSON lines
+LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "text")
+# Repeats of a warning within this many seconds are counted, not logged
+LOG_DEDUP_WINDOW = float(os.getenv("LOG_DEDUP_WINDOW", 10))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+TEXT_FORMAT = (
+    "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+)
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+requests_logger = logging.getLogger("casestar.requests")
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "request_id"
+}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request being served"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DedupFilter(logging.Filter):
+    """Log a repeated warning once per window and count the rest.
+
+    Records at WARNING and above with the same logger, level and message
+    are dropped for ``window`` seconds after the first; the next one to
+    get through reports how many were suppressed. Lower levels pass.
+    """
+
+    def __init__(self, window: float = LOG_DEDUP_WINDOW,
+                 max_keys: int = 1024):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [first seen, suppressed count]
+        self._seen = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.window <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._seen = {
+                    k: v for k, v in self._seen.items()
+                    if now - v[0] < self.window
+                }
+            self._seen[key] = [now, 0]
+        if entry and entry[1]:
+            record.suppressed = entry[1]
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields kept as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        body = {
+            "ts": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                body[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            body["exc"] = record.exc_text
+        return json.dumps(body, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "suppressed", 0):
+            line += f" ({record.suppressed} similar suppressed)"
+        return line
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render on the caller's thread so the listener never touches
+        # arguments that may have changed, and keep ``extra`` attributes
+        # (the stock handler would fold everything into the message)
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropping a record beats blocking the event loop on I/O
+            pass
+
+
+def _file_handler(path: str) -> logging.Handler:
+    if LOG_ROTATE_WHEN:
+        return TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8"
+        )
+    return RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(log_file: Optional[str] = LOG_FILE) -> QueueListener:
+    """Route the root logger through a queue to a background thread
+
+    Callers only enqueue records; formatting, file writes and rotation
+    happen on the listener thread. Calling it again is a no-op.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler()
+    console.setFormatter(
+        JsonFormatter() if LOG_CONSOLE_FORMAT == "json"
+        else TextFormatter(TEXT_FORMAT)
+    )
+    handlers = [console]
+    if log_file:
+        file_handler = _file_handler(
+            log_file.replace("{pid}", str(os.getpid()))
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    handler = _QueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DedupFilter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(
+        handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class RequestLogMiddleware:
+    """Give each request an id and log one record when it completes.
+
+    The id comes from a well-formed ``X-Request-ID`` header or is
+    generated, is echoed on the response, and is attached to every
+    record logged while serving the request. The completion record
+    carries the status, duration and per-stage times in milliseconds.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"")
+        request_id = supplied.decode("latin-1")
+        if not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_with_id(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode())
+                ]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        try:
+            with track_stages() as stages:
+                await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            requests_logger.info(
+                f"{scope['method']} {scope['path']} {status} "
+                f"{duration_ms:.0f} ms",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 1),
+                    "stages_ms": {
+                        name: round(seconds * 1000, 1)
+                        for name, seconds in stages.items()
+                    },
+                }
+            )
+            request_id_var.reset(token)
@@ -0,0 +1,302 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Share of requests to PROFILE_PATHS profiled without being asked
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_PATHS = tuple(
+    p for p in os.getenv(
+        "PROFILE_PATHS", "/api/upload,/api/analyze"
+    ).split(",") if p
+)
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+PROFILE_HEADER = b"x-profile"
+
+_current: ContextVar[Optional["Profile"]] = ContextVar(
+    "profile", default=None
+)
+# Seconds per stage for the current request, for its log record
+_stage_times: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "stage_times", default=None
+)
+_NO_SPAN = nullcontext()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # co_qualname is new in Python 3.11
+    return (
+        f"{getattr(code, 'co_qualname', code.co_name)} "
+        f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class Profile:
+    """Stack samples and stage spans for one request.
+
+    Only threads doing this request's work are sampled: the event loop
+    thread while the request's own task is running, and worker threads
+    started through ``run_in_thread``. Each sample is prefixed with the
+    spans open on its thread, so stages show up as the flamegraph roots.
+    """
+
+    def __init__(self, name: str, interval: float = PROFILE_INTERVAL):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.interval = interval
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.samples: Counter = Counter()
+        self.spans: List[dict] = []
+        # thread ident -> (loop, task) on the loop thread, None in workers
+        self._threads: Dict[int, Optional[tuple]] = {}
+        self._open: Dict[int, List[str]] = defaultdict(list)
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling the calling thread (the event loop) and its task"""
+        loop = asyncio.get_running_loop()
+        self._threads[threading.get_ident()] = (
+            loop, asyncio.current_task()
+        )
+        self._sampler = threading.Thread(
+            target=self._sample, name=f"profiler-{self.id}", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, owner in list(self._threads.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if owner is not None:
+                    loop, task = owner
+                    # The loop thread may be running another request
+                    if asyncio.current_task(loop) is not task:
+                        continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[
+                    ";".join(self._open.get(ident, []) + stack)
+                ] += 1
+
+    @contextmanager
+    def span(self, name: str):
+        ident = threading.get_ident()
+        stack = self._open[ident]
+        stack.append(f"[{name}]")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            _add_stage_time(name, end - start)
+            self.spans.append({
+                "name": name,
+                "tid": ident,
+                "start": start - self.started,
+                "duration": end - start,
+            })
+
+    def call(self, parent: List[str], func: Callable, *args):
+        """Run ``func`` in this worker thread with it sampled"""
+        ident = threading.get_ident()
+        self._open[ident] = list(parent)
+        self._threads[ident] = None
+        try:
+            return func(*args)
+        finally:
+            self._threads.pop(ident, None)
+            self._open.pop(ident, None)
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = defaultdict(float)
+        for s in self.spans:
+            totals[s["name"]] += s["duration"]
+        return {name: round(total * 1000, 1) for name, total in totals.items()}
+
+    def write(self, directory: str = PROFILE_DIR) -> str:
+        """Write ``<base>.folded`` and ``<base>.trace.json``; return base
+
+        The folded stacks load into speedscope or flamegraph.pl; the
+        trace (Chrome trace event format) into Perfetto or
+        chrome://tracing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        slug = "".join(
+            c if c.isalnum() else "_" for c in self.name
+        ).strip("_")
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started_at))
+        base = os.path.join(directory, f"{stamp}-{slug}-{self.id}")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        trace = {
+            "traceEvents": [
+                {
+                    "name": s["name"],
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": s["tid"],
+                    "ts": round(s["start"] * 1e6),
+                    "dur": round(s["duration"] * 1e6),
+                }
+                for s in self.spans
+            ],
+            "displayTimeUnit": "ms",
+            "metadata": {
+                "request": self.name,
+                "profile_id": self.id,
+                "started_at": self.started_at,
+                "duration_ms": round(self.duration * 1000, 1),
+                "samples": sum(self.samples.values()),
+                "interval_ms": self.interval * 1000,
+                "stages_ms": self.stage_totals(),
+            },
+        }
+        with open(base + ".trace.json", "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        return base
+
+
+def _add_stage_time(name: str, seconds: float):
+    times = _stage_times.get()
+    if times is not None:
+        times[name] = times.get(name, 0.0) + seconds
+
+
+@contextmanager
+def track_stages():
+    """Collect the time spent in each span of the enclosed request"""
+    times: Dict[str, float] = {}
+    token = _stage_times.set(times)
+    try:
+        yield times
+    finally:
+        _stage_times.reset(token)
+
+
+@contextmanager
+def _timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_stage_time(name, time.perf_counter() - start)
+
+
+def span(name: str):
+    """Time a stage of the current request; a no-op outside requests"""
+    profile = _current.get()
+    if profile is not None:
+        return profile.span(name)
+    if _stage_times.get() is None:
+        return _NO_SPAN
+    return _timed(name)
+
+
+async def run_in_thread(stage: str, func: Callable, *args):
+    """``asyncio.to_thread`` as a span, sampling the worker when profiling"""
+    profile = _current.get()
+    if profile is None:
+        with span(stage):
+            return await asyncio.to_thread(func, *args)
+    with profile.span(stage):
+        parent = list(profile._open[threading.get_ident()])
+        return await asyncio.to_thread(profile.call, parent, func, *args)
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it, plus a random share of the rest.
+
+    A request is profiled when it sends ``X-Profile: 1`` and ``authorize``
+    accepts its headers, or, for paths starting with one of ``paths``,
+    with probability ``sample_rate``. Profiled responses carry
+    ``X-Profile-Id``; the files are written once the response is sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        authorize: Callable[[dict], bool] = lambda headers: False,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        paths: tuple = PROFILE_PATHS,
+        directory: str = PROFILE_DIR
+    ):
+        self.app = app
+        self.authorize = authorize
+        self.sample_rate = sample_rate
+        self.paths = paths
+        self.directory = directory
+
+    def _wanted(self, scope: Scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) == b"1":
+            return self.authorize({
+                k.decode("latin-1"): v.decode("latin-1")
+                for k, v in headers.items()
+            })
+        return (
+            self.sample_rate > 0
+            and scope["path"].startswith(self.paths)
+            and random.random() < self.sample_rate
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode())
+                ]
+            await send(message)
+
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _current.reset(token)
+            try:
+                base = await asyncio.to_thread(profile.write, self.directory)
+                logger.info(
+                    f"Profiled {profile.name} in "
+                    f"{profile.duration * 1000:.0f} ms: {base}.folded"
+                )
+            except OSError as e:
+                logger.error(f"Could not write profile {profile.id}: {e}")
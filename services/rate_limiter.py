@@ -0,0 +1,181 @@
+from typing import Awaitable, Callable, Dict, Optional
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Buckets untouched for this long are full again and can be dropped
+STALE_BUCKET_SECONDS = 24 * 60 * 60
+CLEANUP_EVERY = 1000
+
+
+class SharedRateLimiter:
+    """Token-bucket rate limiter shared by all workers on a host.
+
+    Bucket state lives in a SQLite database, and every update runs in an
+    IMMEDIATE transaction, so concurrent uvicorn workers see one set of
+    counters. Each hit spends a request-specific cost in tokens, which
+    lets a 100K-character analysis count for more than a short one.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv(
+            "RATE_LIMIT_DB", "./rate_limits.db"
+        )
+        self._local = threading.local()
+        self._hits = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def hit(
+        self, key: str, capacity: float, period: float, cost: float = 1.0
+    ) -> float:
+        """Spend ``cost`` tokens from the bucket for ``key``
+
+        The bucket holds ``capacity`` tokens and refills completely over
+        ``period`` seconds. Returns 0 if the hit is allowed, otherwise the
+        seconds until enough tokens will be available. If the database
+        cannot be used the hit is allowed.
+        """
+        rate = capacity / period
+        # A request costlier than the bucket would never pass; it drains
+        # the whole bucket instead
+        cost = min(cost, capacity)
+        now = time.time()
+
+        try:
+            retry_after = self._spend(key, capacity, rate, cost, now)
+        except sqlite3.OperationalError as e:
+            # e.g. "database is locked": an unusable limiter must not
+            # take the API down with it
+            logger.warning(f"Rate limiter unavailable, allowing hit: {e}")
+            return 0.0
+
+        self._hits += 1
+        if self._hits % CLEANUP_EVERY == 0:
+            self._cleanup(now)
+        return retry_after
+
+    def _spend(
+        self, key: str, capacity: float, rate: float, cost: float, now: float
+    ) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tokens = capacity
+            else:
+                elapsed = max(0.0, now - row[1])
+                tokens = min(capacity, row[0] + elapsed * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def _cleanup(self, now: float):
+        try:
+            self._connection().execute(
+                "DELETE FROM buckets WHERE updated < ?",
+                (now - STALE_BUCKET_SECONDS,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit cleanup failed: {e}")
+
+    def reset(self):
+        """Forget all buckets"""
+        self._connection().execute("DELETE FROM buckets")
+
+
+class RateLimitMiddleware:
+    """Charge requests to some paths before their body is read.
+
+    FastAPI reads a multipart body in full, spooling it to disk, before
+    the endpoint runs, so a limit charged by size in the endpoint comes
+    too late to spare the server the upload. ``charges`` maps a path to
+    a coroutine called with the request and its declared Content-Length
+    for POSTs to that path; an HTTPException it raises (e.g. a 429) is
+    sent as the response. A POST without a Content-Length (a chunked
+    body) is refused with 411, as its size could not be charged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        charges: Dict[str, Callable[[Request, int], Awaitable[None]]]
+    ):
+        self.app = app
+        self.charges = charges
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        charge = self.charges.get(scope.get("path")) if (
+            scope["type"] == "http" and scope["method"] == "POST"
+        ) else None
+        if charge is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        try:
+            size = int(request.headers["content-length"])
+            if size < 0:
+                raise ValueError(size)
+        except (KeyError, ValueError):
+            response = JSONResponse(
+                {"detail": "Content-Length required"}, status_code=411
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await charge(request, size)
+        except HTTPException as e:
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code,
+                headers=e.headers
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+# Global instance
+rate_limiter = SharedRateLimiter()
@@ -0,0 +1,164 @@
+from typing import List, Sequence, Tuple
+import re
+
+import numpy as np
+
+DEFAULT_SNIPPET_CHARS = 300
+# Diverse search re-ranks this many candidates per requested result
+MMR_FETCH_FACTOR = 5
+MAX_MMR_CANDIDATES = 400
+DEFAULT_MMR_LAMBDA = 0.5
+MIN_TERM_LENGTH = 2
+
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or that
+    the this to was were will with
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lowercase query words worth highlighting, in query order"""
+    terms = []
+    for word in _WORD.findall(query.lower()):
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS \
+                and word not in terms:
+            terms.append(word)
+    return terms
+
+
+def _term_hits(text: str, terms: List[str]) -> List[Tuple[int, int, int]]:
+    """(start, end, term index) of words in ``text`` starting with a term"""
+    if not terms:
+        return []
+    # Longest first so "contractor" is not reported as "contract"
+    ordered = sorted(range(len(terms)), key=lambda i: -len(terms[i]))
+    pattern = re.compile(
+        r"\b(?:" + "|".join(
+            f"(?P<t{i}>{re.escape(terms[i])})" for i in ordered
+        ) + r")\w*",
+        re.I
+    )
+    hits = []
+    for match in pattern.finditer(text):
+        term = int(match.lastgroup[1:])
+        hits.append((match.start(), match.end(), term))
+    return hits
+
+
+def _best_window(
+    hits: List[Tuple[int, int, int]], max_chars: int
+) -> Tuple[int, int]:
+    """Hit index range [i, j) covering the most distinct terms, then hits"""
+    best = (0, 1)
+    best_score = (0, 0)
+    counts = {}
+    i = 0
+    for j, (_, end, term) in enumerate(hits):
+        counts[term] = counts.get(term, 0) + 1
+        while i < j and end - hits[i][0] > max_chars:
+            counts[hits[i][2]] -= 1
+            if not counts[hits[i][2]]:
+                del counts[hits[i][2]]
+            i += 1
+        score = (len(counts), j + 1 - i)
+        if score > best_score:
+            best_score = score
+            best = (i, j + 1)
+    return best
+
+
+def _snap_start(text: str, start: int) -> int:
+    """Move ``start`` forward to the beginning of a word"""
+    if start <= 0 or text[start - 1].isspace():
+        return max(start, 0)
+    space = text.find(" ", start, start + 30)
+    return space + 1 if space != -1 else start
+
+
+def _snap_end(text: str, end: int) -> int:
+    """Move ``end`` back to the end of a word"""
+    if end >= len(text) or text[end].isspace():
+        return min(end, len(text))
+    space = text.rfind(" ", end - 30, end)
+    return space if space != -1 else end
+
+
+def make_snippet(
+    text: str, query: str, max_chars: int = DEFAULT_SNIPPET_CHARS
+) -> dict:
+    """Window of at most ``max_chars`` around the best-matching region
+
+    Returns the snippet text, its [start, end) offsets in ``text`` and
+    highlight [start, end) offsets relative to the snippet. Without any
+    matching term the snippet is the opening of the document.
+    """
+    hits = _term_hits(text, query_terms(query))
+    if len(text) <= max_chars:
+        start, end = 0, len(text)
+    elif not hits:
+        start, end = 0, _snap_end(text, max_chars)
+    else:
+        first, last = _best_window(hits, max_chars)
+        covered_start = hits[first][0]
+        covered_end = hits[last - 1][1]
+        # Spread the spare room around the matches, clamped to the text
+        spare = max_chars - (covered_end - covered_start)
+        start = max(0, covered_start - spare // 2)
+        end = min(len(text), start + max_chars)
+        start = max(0, end - max_chars)
+        start = min(_snap_start(text, start), covered_start)
+        end = min(max(_snap_end(text, end), covered_end), start + max_chars)
+
+    snippet = text[start:end]
+    highlights = [
+        [s - start, e - start] for s, e, _ in hits
+        if s >= start and e <= end
+    ]
+    return {
+        "text": snippet,
+        "start": start,
+        "end": end,
+        "highlights": highlights,
+    }
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_: float = DEFAULT_MMR_LAMBDA
+) -> List[int]:
+    """Indices of ``k`` candidates by maximal marginal relevance
+
+    Each step picks the candidate maximizing
+    ``lambda_ * sim(query, c) - (1 - lambda_) * max sim(c, selected)``
+    using cosine similarity; ``lambda_ = 1`` is plain relevance order.
+    """
+    candidates = _unit_rows(np.asarray(candidate_embeddings, dtype=np.float32))
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+    query = _unit_rows(np.asarray(query_embedding, dtype=np.float32))
+    relevance = candidates @ query
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+
+    selected = []
+    for _ in range(min(k, len(candidates))):
+        if selected:
+            scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return selected
@@ -0,0 +1,129 @@
+"""Production launcher: a shared Chroma server plus N uvicorn workers.
+
+Several workers cannot safely open ``chromadb.PersistentClient`` on the
+same directory, so in production Chroma runs as one local server process
+and every worker connects to it over HTTP.
+
+The supervisor never imports ``main``, so it opens neither Chroma nor
+any other client itself; only the workers do.
+
+Usage: python -m services.server [--workers N] [--port PORT]
+   or: python main.py --production [--workers N] [--port PORT]
+"""
+from typing import List, Optional
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+
+from services.file_lock import LOCKING_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+CHROMA_STARTUP_TIMEOUT = 60.0
+
+
+def start_chroma_server(path: str, host: str, port: int) -> subprocess.Popen:
+    """Start `chroma run` and wait until its heartbeat answers"""
+    process = subprocess.Popen([
+        sys.executable, "-m", "chromadb.cli.cli", "run",
+        "--path", path,
+        "--host", host,
+        "--port", str(port),
+        "--log-path", os.getenv("CHROMA_LOG_PATH", "chroma.log"),
+    ])
+
+    deadline = time.monotonic() + CHROMA_STARTUP_TIMEOUT
+    url = f"http://{host}:{port}/api/v1/heartbeat"
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"Chroma server exited with code {process.returncode}"
+            )
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                logger.info(f"Chroma server ready at {host}:{port}")
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    stop_chroma_server(process)
+    raise RuntimeError("Chroma server did not become ready in time")
+
+
+def stop_chroma_server(process: Optional[subprocess.Popen]):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_production(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CaseStar production server")
+    parser.add_argument("--production", action="store_true")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 4))
+    )
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("PORT", 8001))
+    )
+    parser.add_argument(
+        "--chroma-port", type=int,
+        default=int(os.getenv("CHROMA_SERVER_PORT", 8002))
+    )
+    parser.add_argument(
+        "--drain-seconds", type=float,
+        default=float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 120))
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    workers = args.workers
+    if workers > 1 and not LOCKING_AVAILABLE:
+        # Workers lock their graph journals so others leave them alone
+        logger.warning(
+            f"No file locking on this platform; running 1 worker instead "
+            f"of {workers}"
+        )
+        workers = 1
+
+    chroma = None
+    if not os.getenv("CHROMA_SERVER_HOST"):
+        chroma = start_chroma_server(
+            os.getenv("CHROMA_PERSIST_DIR", "./chroma_db"),
+            "127.0.0.1",
+            args.chroma_port
+        )
+        # Inherited by the worker processes
+        os.environ["CHROMA_SERVER_HOST"] = "127.0.0.1"
+        os.environ["CHROMA_SERVER_PORT"] = str(args.chroma_port)
+    os.environ["SHUTDOWN_DRAIN_SECONDS"] = str(args.drain_seconds)
+    # Each worker rotates its own log file; they must not share one
+    os.environ.setdefault("LOG_FILE", "backend-{pid}.log")
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            timeout_graceful_shutdown=int(args.drain_seconds),
+            proxy_headers=True
+        )
+    finally:
+        stop_chroma_server(chroma)
+
+
+if __name__ == "__main__":
+    run_production()
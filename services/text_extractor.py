@@ -2,14 +2,50 @@ import fitz  # PyMuPDF
 from docx import Document
 import io
 import logging
+import xml.etree.ElementTree as ET
+import zipfile
+
+from services.profiling import run_in_thread
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever extraction output changes so cached results are invalidated
+EXTRACTOR_VERSION = "3"
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_BODY = W_NS + "body"
+W_P = W_NS + "p"
+W_R = W_NS + "r"
+W_HYPERLINK = W_NS + "hyperlink"
+W_TBL = W_NS + "tbl"
+W_TR = W_NS + "tr"
+W_TC = W_NS + "tc"
+W_GRID_COL = W_NS + "gridCol"
+W_GRID_SPAN = W_NS + "gridSpan"
+W_V_MERGE = W_NS + "vMerge"
+W_TYPE = W_NS + "type"
+
+# Run children with a fixed text equivalent, mirroring python-docx
+RUN_SYMBOLS = {
+    W_NS + "tab": "\t",
+    W_NS + "ptab": "\t",
+    W_NS + "cr": "\n",
+    W_NS + "noBreakHyphen": "-",
+}
+
+
+class ExtractionError(Exception):
+    """Raised when no text can be extracted from a document"""
+
+
+class UnsupportedDocxLayout(Exception):
+    """Raised when the streaming DOCX parser cannot reproduce a layout"""
+
 
 def extract_text_from_pdf(file_content: bytes) -> str:
     """Extract text from PDF content using PyMuPDF"""
     try:
-        text = ""
+        pages = []
         with fitz.open(stream=file_content, filetype="pdf") as doc:
 
             # Check for encryption
@@ -18,45 +54,158 @@ def extract_text_from_pdf(file_content: bytes) -> str:
                 doc.authenticate("")
                 if doc.is_encrypted:
                     logger.warning("PDF is encrypted and cannot be read")
-                    return "Error: PDF is password protected"
+                    raise ExtractionError("PDF is password protected")
 
             for page in doc:
-                text += page.get_text()
+                pages.append(page.get_text())
 
-        return text
+        # Form feeds mark page boundaries for ranged retrieval
+        return "\f".join(pages)
+    except ExtractionError:
+        raise
     except Exception as e:
         logger.error(f"PDF extraction error: {e}")
-        return f"Error extracting text from PDF: {str(e)}"
+        raise ExtractionError(f"Could not extract text from PDF: {e}") from e
+
+
+def _run_text(run) -> str:
+    parts = []
+    for child in run:
+        if child.tag == W_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == W_NS + "br":
+            if child.get(W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag in RUN_SYMBOLS:
+            parts.append(RUN_SYMBOLS[child.tag])
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == W_R)
+    return "".join(parts)
+
+
+def _table_rows(table):
+    """Yield the cell texts of each row of a body-level table"""
+    grid = [col for col in table.iter(W_GRID_COL)]
+    for row in table:
+        if row.tag != W_TR:
+            continue
+        cells = []
+        for cell in row:
+            if cell.tag != W_TC:
+                continue
+            for prop in cell.iter():
+                if prop.tag == W_TBL:
+                    raise UnsupportedDocxLayout("nested table")
+                if prop.tag in (W_GRID_SPAN, W_V_MERGE):
+                    raise UnsupportedDocxLayout("merged cells")
+            cells.append("\n".join(
+                _paragraph_text(p) for p in cell if p.tag == W_P
+            ))
+        if len(cells) != len(grid):
+            raise UnsupportedDocxLayout("row does not match table grid")
+        yield cells
+
+
+def _extract_docx_streaming(file_content: bytes) -> str:
+    """Stream-parse word/document.xml, keeping body order
+
+    Raises UnsupportedDocxLayout for layouts python-docx resolves through
+    its table model (merged or nested cells) and for non-standard packages.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(file_content))
+        part = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise UnsupportedDocxLayout(str(e))
+
+    full_text = []
+    body = None
+    depth = 0
+    with archive, part:
+        try:
+            for event, elem in ET.iterparse(part, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if elem.tag == W_BODY:
+                        body = elem
+                    continue
+
+                depth -= 1
+                # Only direct children of w:body are blocks (root is depth 1)
+                if body is None or depth != 2:
+                    continue
+                if elem.tag == W_P:
+                    text = _paragraph_text(elem)
+                    if text.strip():
+                        full_text.append(text)
+                elif elem.tag == W_TBL:
+                    for cells in _table_rows(elem):
+                        row_text = [c for c in cells if c.strip()]
+                        if row_text:
+                            full_text.append(" | ".join(row_text))
+                # Drop processed blocks so memory stays flat
+                body.remove(elem)
+        except ET.ParseError as e:
+            raise UnsupportedDocxLayout(str(e))
+
+    return "\n\n".join(full_text)
+
+
+def _extract_docx_object_model(file_content: bytes) -> str:
+    """Extract DOCX text through the python-docx object model"""
+    doc = Document(io.BytesIO(file_content))
+    full_text = []
+
+    # Extract paragraphs
+    for para in doc.paragraphs:
+        if para.text.strip():
+            full_text.append(para.text)
+
+    # Extract tables
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = [
+                cell.text for cell in row.cells if cell.text.strip()
+            ]
+            if row_text:
+                full_text.append(" | ".join(row_text))
+
+    return "\n\n".join(full_text)
 
 
 def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX content using python-docx"""
+    """Extract text from DOCX content in document order
+
+    Uses the streaming parser and falls back to python-docx for
+    layouts it does not handle.
+    """
     try:
-        doc = Document(io.BytesIO(file_content))
-        full_text = []
-
-        # Extract paragraphs
-        for para in doc.paragraphs:
-            if para.text.strip():
-                full_text.append(para.text)
-
-        # Extract tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = [
-                    cell.text for cell in row.cells if cell.text.strip()
-                ]
-                if row_text:
-                    full_text.append(" | ".join(row_text))
-
-        return "\n\n".join(full_text)
+        return _extract_docx_streaming(file_content)
+    except UnsupportedDocxLayout as e:
+        logger.info(f"Falling back to python-docx for DOCX: {e}")
+    except Exception as e:
+        logger.warning(f"Streaming DOCX parse failed, falling back: {e}")
+
+    try:
+        return _extract_docx_object_model(file_content)
     except Exception as e:
         logger.error(f"DOCX extraction error: {e}")
-        return f"Error extracting text from DOCX: {str(e)}"
+        raise ExtractionError(f"Could not extract text from DOCX: {e}") from e
 
 
-async def process_document_content(filename: str, content: bytes) -> str:
-    """Route document processing based on file extension"""
+def extract_document_content(filename: str, content: bytes) -> str:
+    """Route document processing based on file extension
+
+    Raises ExtractionError if the document cannot be read.
+    """
     filename = filename.lower()
 
     if filename.endswith('.pdf'):
@@ -69,4 +218,11 @@ async def process_document_content(filename: str, content: bytes) -> str:
         except UnicodeDecodeError:
             return content.decode('utf-8', errors='ignore')
     else:
-        return "Unsupported file format"
+        raise ExtractionError("Unsupported file format")
+
+
+async def process_document_content(filename: str, content: bytes) -> str:
+    """Extract text in a worker thread, off the event loop"""
+    return await run_in_thread(
+        "extraction", extract_document_content, filename, content
+    )
@@ -0,0 +1,343 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import List, Optional
+import calendar
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAX_SENTENCE_CHARS = 400
+# How far after "30 days after" to look for the date it refers to
+RELATIVE_ANCHOR_WINDOW = 40
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5,
+    "june": 6, "july": 7, "august": 8, "september": 9, "october": 10,
+    "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7,
+    "aug": 8, "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "fourteen": 14, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty-five": 45, "sixty": 60, "ninety": 90,
+}
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "inc", "co", "corp", "ltd", "llc", "no", "v",
+    "vs", "st", "jr", "sr", "u.s", "e.g", "i.e", "et al", "art", "sec",
+} | set(MONTHS)
+
+# Written as a prefix trie; a flat alternation is much slower with re.I
+_MONTH = (
+    r"(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|"
+    r"june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|"
+    r"nov(?:ember)?|dec(?:ember)?)\b\.?"
+)
+_FULL_MONTH = (
+    r"(?P<month>january|february|march|april|may|june|july|august|"
+    r"september|october|november|december)"
+)
+_DAY = r"(?P<day>[0-3]?\d)(?:st|nd|rd|th)?"
+_YEAR = r"(?P<year>(?:19|20)\d{2})"
+
+# (pattern, precision); earlier patterns win when matches overlap
+DATE_PATTERNS = [
+    # January 1st, 2023 / Jan. 1 2023
+    (re.compile(rf"\b{_MONTH}\s+{_DAY},?\s+{_YEAR}\b", re.I), "day"),
+    # 1st day of January, 2023 / 1 January 2023
+    (re.compile(
+        rf"\b{_DAY}\s+(?:day\s+of\s+)?{_MONTH},?\s+{_YEAR}\b", re.I
+    ), "day"),
+    # 2023-01-01
+    (re.compile(
+        r"\b(?P<year>(?:19|20)\d{2})-(?P<month>[01]\d)-(?P<day>[0-3]\d)\b"
+    ), "day"),
+    # 01/01/2023 (US order)
+    (re.compile(
+        r"\b(?P<month>1[0-2]|0?[1-9])/(?P<day>3[01]|[12]\d|0?[1-9])/"
+        r"(?P<year>(?:19|20)\d{2}|\d{2})\b"
+    ), "day"),
+    # January 2023 / March of 2023
+    (re.compile(rf"\b{_FULL_MONTH}\s+(?:of\s+)?{_YEAR}\b", re.I), "month"),
+]
+
+_COUNT = r"(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")"
+RELATIVE_OFFSET = re.compile(
+    rf"\b{_COUNT}\s*(?:\(\d+\)\s*)?(?P<unit>day|week|month|year)s?\s+"
+    r"(?P<direction>after|following|from|before|prior\s+to)\b",
+    re.I
+)
+RELATIVE_DAY = re.compile(
+    r"\bthe\s+(?:(?P<next>next|following)\s+day|"
+    r"day\s+(?P<direction>before|after))\b",
+    re.I
+)
+# "... after January 1, 2023" / "... from the date of January 1, 2023"
+ANCHOR_GAP = re.compile(
+    r"\s*(?:(?:the\s+)?(?:date|day)\s+of\s+|on\s+)?", re.I
+)
+# "... after such date" / "... after that day": the last date mentioned
+PREVIOUS_DATE = re.compile(
+    r"\s+(?:the|such|that|said|this)\s+(?:date|day)\b(?!\s+of)", re.I
+)
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+
+
+def _to_date(year: str, month: str, day: Optional[str]) -> Optional[date]:
+    y = int(year)
+    if len(year) == 2:
+        y += 2000 if y < 50 else 1900
+    m = int(month) if month.isdigit() else MONTHS[month.lower()]
+    try:
+        return date(y, m, int(day) if day else 1)
+    except ValueError:
+        return None
+
+
+def _shift(anchor: date, count: int, unit: str) -> date:
+    unit = unit.lower()
+    if unit == "day":
+        return anchor + timedelta(days=count)
+    if unit == "week":
+        return anchor + timedelta(weeks=count)
+    months = count * (12 if unit == "year" else 1)
+    index = anchor.month - 1 + months
+    year, month = anchor.year + index // 12, index % 12 + 1
+    day = min(anchor.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def _sentence_starts(text: str) -> List[int]:
+    starts = [0]
+    for match in SENTENCE_END.finditer(text):
+        word = re.search(r"([\w.]+)\W*$", text[max(0, match.start() - 12):
+                                             match.start() + 1])
+        if match.group().startswith(".") and word and \
+                word.group(1).rstrip(".").lower() in ABBREVIATIONS:
+            continue
+        starts.append(match.end())
+    return starts
+
+
+def _sentence(text: str, starts: List[int], start: int, end: int) -> str:
+    i = bisect_right(starts, start) - 1
+    begin = starts[i]
+    finish = starts[i + 1] if i + 1 < len(starts) else len(text)
+    if finish - begin > MAX_SENTENCE_CHARS:
+        half = (MAX_SENTENCE_CHARS - (end - start)) // 2
+        begin = max(begin, start - half)
+        finish = min(finish, end + half)
+    return " ".join(text[begin:finish].split())
+
+
+def find_dates(text: str) -> List[tuple]:
+    """Non-overlapping (start, end, date, precision) mentions in order"""
+    found = []
+    taken = []  # sorted, non-overlapping (start, end) spans
+    for pattern, precision in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            i = bisect_right(taken, (start, end))
+            if (i and taken[i - 1][1] > start) or \
+                    (i < len(taken) and taken[i][0] < end):
+                continue
+            parts = match.groupdict()
+            when = _to_date(parts["year"], parts["month"], parts.get("day"))
+            if when:
+                taken.insert(i, (start, end))
+                found.append((start, end, when, precision))
+    found.sort()
+    return found
+
+
+def extract_events(
+    text: str, reference_date: Optional[date] = None
+) -> List[dict]:
+    """Find dated events in ``text`` without calling the LLM
+
+    Absolute dates are read in common legal formats. Relative offsets
+    ("thirty (30) days after January 1, 2023") are resolved against the
+    date they name, or against the closest earlier date for "after such
+    date" and "the following day", falling back to ``reference_date``.
+    Offsets from undated events are skipped. Each event carries the
+    sentence that mentions it.
+    """
+    absolute = find_dates(text)
+    starts = _sentence_starts(text)
+    mention_starts = [a[0] for a in absolute]
+
+    def anchor_before(position: int) -> Optional[date]:
+        i = bisect_right(mention_starts, position) - 1
+        return absolute[i][2] if i >= 0 else reference_date
+
+    def anchor_after(position: int) -> Optional[date]:
+        i = bisect_right(mention_starts, position - 1)
+        if i < len(absolute) and \
+                absolute[i][0] - position <= RELATIVE_ANCHOR_WINDOW and \
+                ANCHOR_GAP.fullmatch(text, position, absolute[i][0]):
+            return absolute[i][2]
+        return None
+
+    events = []
+    for start, end, when, precision in absolute:
+        events.append((start, end, when, precision, "absolute"))
+
+    for match in RELATIVE_OFFSET.finditer(text):
+        count = match.group("count").lower()
+        count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        anchor = anchor_after(match.end())
+        if anchor is None and PREVIOUS_DATE.match(text, match.end()):
+            anchor = anchor_before(match.start())
+        if anchor is None:
+            # Relative to an undated event ("30 days after delivery")
+            continue
+        if match.group("direction").lower().startswith(("before", "prior")):
+            count = -count
+        when = _shift(anchor, count, match.group("unit"))
+        events.append((*match.span(), when, "day", "relative"))
+
+    for match in RELATIVE_DAY.finditer(text):
+        anchor = anchor_before(match.start())
+        if anchor is None:
+            continue
+        step = -1 if (match.group("direction") or "").lower() == "before" \
+            else 1
+        events.append((*match.span(), anchor + timedelta(days=step), "day",
+                       "relative"))
+
+    events.sort(key=lambda e: e[0])
+    results = []
+    seen = set()
+    for start, end, when, precision, kind in events:
+        sentence = _sentence(text, starts, start, end)
+        if (when, sentence) in seen:
+            continue
+        seen.add((when, sentence))
+        results.append({
+            "date": when.isoformat(),
+            "precision": precision,
+            "kind": kind,
+            "mention": text[start:end],
+            "sentence": sentence,
+            "offset": start,
+        })
+    return results
+
+
+class TimelineIndex:
+    """Per-case events kept sorted by date in SQLite.
+
+    The (case_id, date) index makes a date-range query one B-tree seek
+    followed by an ordered scan.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("TIMELINE_DB", "./timeline.db")
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=5, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS timeline_events (
+                    case_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    precision TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    mention TEXT NOT NULL,
+                    sentence TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS timeline_case_date "
+                "ON timeline_events (case_id, date)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS timeline_case_doc "
+                "ON timeline_events (case_id, doc_id)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def add_events(self, case_id: str, doc_id: str, events: List[dict]):
+        """Replace the events recorded for one document"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM timeline_events WHERE case_id = ? AND doc_id = ?",
+                (case_id, doc_id)
+            )
+            conn.executemany(
+                "INSERT INTO timeline_events (case_id, date, doc_id, offset, "
+                "precision, kind, mention, sentence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (case_id, e["date"], doc_id, e["offset"], e["precision"],
+                     e["kind"], e["mention"], e["sentence"])
+                    for e in events
+                ]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def query(
+        self,
+        case_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: int = 500
+    ) -> List[dict]:
+        """Events for a case between ``start`` and ``end`` inclusive"""
+        rows = self._connection().execute(
+            "SELECT date, doc_id, offset, precision, kind, mention, sentence "
+            "FROM timeline_events WHERE case_id = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date, doc_id, offset LIMIT ?",
+            (
+                case_id,
+                start.isoformat() if start else "0000-00-00",
+                end.isoformat() if end else "9999-99-99",
+                limit
+            )
+        ).fetchall()
+        return [
+            {
+                "date": row[0], "doc_id": row[1], "offset": row[2],
+                "precision": row[3], "kind": row[4], "mention": row[5],
+                "sentence": row[6],
+            }
+            for row in rows
+        ]
+
+    def index_document(self, case_id: str, doc_id: str, text: str) -> int:
+        events = extract_events(text)
+        self.add_events(case_id, doc_id, events)
+        return len(events)
+
+    def update(self, case_id: str, doc_id: str, text: str):
+        """Background-task entry point; failures are logged, not raised"""
+        try:
+            count = self.index_document(case_id, doc_id, text)
+            logger.info(f"Indexed {count} timeline events for {doc_id}")
+        except Exception as e:
+            logger.error(f"Timeline indexing failed for {doc_id}: {e}")
+
+
+# Global instance
+timeline_index = TimelineIndex()
@@ -0,0 +1,249 @@
+from collections import deque
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "casestar_documents"
+# Query latencies kept for percentiles
+LATENCY_SAMPLES = 1000
+# Records copied per batch during a rebuild
+REBUILD_BATCH_SIZE = 500
+
+# Collection metadata key -> (environment variable, type)
+HNSW_SETTINGS = {
+    "hnsw:space": ("CHROMA_HNSW_SPACE", str),
+    "hnsw:M": ("CHROMA_HNSW_M", int),
+    "hnsw:construction_ef": ("CHROMA_HNSW_CONSTRUCTION_EF", int),
+    "hnsw:search_ef": ("CHROMA_HNSW_SEARCH_EF", int),
+    "hnsw:num_threads": ("CHROMA_HNSW_NUM_THREADS", int),
+}
+# Fixed when the index is built; changing them needs a rebuild
+STRUCTURAL_SETTINGS = {"hnsw:space", "hnsw:M", "hnsw:construction_ef"}
+# Safe to change on a live collection
+TUNABLE_SETTINGS = set(HNSW_SETTINGS) - STRUCTURAL_SETTINGS
+
+
+def hnsw_metadata() -> Dict[str, object]:
+    """HNSW parameters set in the environment; unset ones use Chroma's"""
+    metadata = {}
+    for key, (env, cast) in HNSW_SETTINGS.items():
+        value = os.getenv(env)
+        if value:
+            metadata[key] = cast(value)
+    return metadata
+
+
+def open_collection(client, embedding_function, name: str = COLLECTION_NAME):
+    """Get or create the collection and apply configured HNSW settings"""
+    wanted = hnsw_metadata()
+    collection = client.get_or_create_collection(
+        name=name,
+        embedding_function=embedding_function,
+        metadata=wanted or None
+    )
+    current = collection.metadata or {}
+    changed = {
+        key: value for key, value in wanted.items()
+        if current.get(key) != value
+    }
+    # A tuned collection no longer lists its build settings (see below),
+    # so only settings it does list can be known to differ
+    structural = sorted(
+        key for key in set(changed) & STRUCTURAL_SETTINGS if key in current
+    )
+    if structural:
+        logger.warning(
+            f"Collection {name} was built with different {structural}; "
+            "run `python -m services.vector_index rebuild` to apply them"
+        )
+    tunable = {
+        key: value for key, value in changed.items()
+        if key in TUNABLE_SETTINGS
+    }
+    if tunable:
+        # Metadata is replaced wholesale, but Chroma rejects any hnsw:space
+        # in it, even an unchanged one; the index keeps its build settings
+        kept = {
+            key: value for key, value in current.items()
+            if key in TUNABLE_SETTINGS
+        }
+        collection.modify(metadata={**kept, **tunable})
+        logger.info(f"Updated {name} index settings: {tunable}")
+    return collection
+
+
+class QueryLatency:
+    """Recent vector query durations for percentile reporting"""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentiles(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return {"samples": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0,
+                    "max": 0.0}
+        return {
+            "samples": len(ordered),
+            "p50": round(ordered[int(len(ordered) * 0.50)], 4),
+            "p95": round(ordered[int(len(ordered) * 0.95)], 4),
+            "p99": round(ordered[int(len(ordered) * 0.99)], 4),
+            "max": round(ordered[-1], 4),
+        }
+
+
+def directory_size(path: Optional[str]) -> Optional[int]:
+    """Total bytes of the files under ``path``, or None if not local"""
+    if not path or not os.path.isdir(path):
+        return None
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                # Chroma may remove files while we walk
+                pass
+    return total
+
+
+def index_stats(collection, persist_dir: Optional[str]) -> dict:
+    """Size, settings and recent query latency of the collection"""
+    metadata = collection.metadata or {}
+    return {
+        "collection": collection.name,
+        "count": collection.count(),
+        "settings": {
+            key: value for key, value in metadata.items()
+            if key.startswith("hnsw:")
+        },
+        "configured": hnsw_metadata(),
+        "disk_bytes": directory_size(persist_dir),
+        "query_latency_seconds": query_latency.percentiles(),
+    }
+
+
+def rebuild(
+    persist_dir: str,
+    name: str = COLLECTION_NAME,
+    batch_size: int = REBUILD_BATCH_SIZE,
+    keep_old: bool = True
+) -> dict:
+    """Copy the collection into a fresh directory and swap it into place
+
+    Stored embeddings are copied, not recomputed. The new index is built
+    with the configured HNSW settings and without the space held by
+    deleted records. Run it with the server stopped.
+    """
+    import chromadb
+
+    persist_dir = os.path.abspath(persist_dir)
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    new_dir = f"{persist_dir}.rebuild-{stamp}"
+    old_dir = f"{persist_dir}.old-{stamp}"
+    before = directory_size(persist_dir)
+
+    source = chromadb.PersistentClient(path=persist_dir)
+    source_collection = source.get_collection(name)
+    count = source_collection.count()
+    metadata = {**(source_collection.metadata or {}), **hnsw_metadata()}
+
+    target = chromadb.PersistentClient(path=new_dir)
+    # Embeddings are supplied, so the target needs no embedding function
+    target_collection = target.create_collection(
+        name=name, metadata=metadata or None, embedding_function=None
+    )
+    copied = 0
+    for offset in range(0, count, batch_size):
+        batch = source_collection.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not batch["ids"]:
+            break
+        target_collection.add(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"]
+        )
+        copied += len(batch["ids"])
+    if target_collection.count() != count:
+        shutil.rmtree(new_dir, ignore_errors=True)
+        raise RuntimeError(
+            f"Rebuild copied {target_collection.count()} of {count} records"
+        )
+    # Drop cached clients so nothing keeps using the renamed paths
+    chromadb.api.client.SharedSystemClient.clear_system_cache()
+
+    # Each rename is atomic; the old index stays whole until the new one
+    # is in place
+    os.rename(persist_dir, old_dir)
+    os.rename(new_dir, persist_dir)
+    if not keep_old:
+        shutil.rmtree(old_dir)
+
+    result = {
+        "collection": name,
+        "records": copied,
+        "settings": {k: v for k, v in metadata.items()
+                     if k.startswith("hnsw:")},
+        "bytes_before": before,
+        "bytes_after": directory_size(persist_dir),
+        "previous_index": old_dir if keep_old else None,
+    }
+    logger.info(f"Rebuilt {name}: {result}")
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CaseStar vector index")
+    parser.add_argument("command", choices=["rebuild", "stats"])
+    parser.add_argument(
+        "--persist-dir", default=os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+    )
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument(
+        "--batch-size", type=int, default=REBUILD_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--discard-old", action="store_true",
+        help="delete the previous index after a successful rebuild"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "rebuild":
+        result = rebuild(
+            args.persist_dir, args.collection, args.batch_size,
+            keep_old=not args.discard_old
+        )
+    else:
+        import chromadb
+        client = chromadb.PersistentClient(path=args.persist_dir)
+        result = index_stats(
+            client.get_collection(args.collection), args.persist_dir
+        )
+    print(json.dumps(result, indent=2, default=str))
+
+
+# Global instance
+query_latency = QueryLatency()
+
+
+if __name__ == "__main__":
+    main()
@@ -37,9 +37,12 @@ export default function Home() {
       setStage('reading');
       setProgress(50);
 
-      const textToAnalyze = uploadResult.extracted_text || `Document: ${uploadResult.filename}\n(No text extracted)`;
+      // The server keeps the text; analyze it by id rather than sending it back
+      const source = uploadResult.document_id
+        ? { documentId: uploadResult.document_id }
+        : `Document: ${uploadResult.filename}\n(No text extracted)`;
 
-      if (!uploadResult.extracted_text) {
+      if (!uploadResult.document_id) {
         console.warn('No text extracted from document');
         toast.warning('Could not extract text from document');
       }
@@ -52,7 +55,7 @@ export default function Home() {
       setStage('analyzing');
       const caseId = `case-${Date.now()}`;
 
-      const analysisResult = await analyzeDocument(textToAnalyze, caseId);
+      const analysisResult = await analyzeDocument(source, caseId);
       toast.success('AI Analysis Complete!');
       setProgress(100);
 
@@ -19,11 +19,38 @@ export interface UploadResult {
   size: number;
   status: string;
   message: string;
+  // Handle for analysis and ranged text; null if nothing was extracted
+  document_id: string | null;
+  chars: number;
+  pages: number;
+  // Preview only: the opening of the text, see text_truncated
   extracted_text?: string;
+  text_truncated: boolean;
+  // Why no text could be extracted, if it could not
+  error?: string | null;
+}
+
+export interface DocumentText {
+  document_id: string;
+  start: number;
+  end: number;
+  page: number | null;
+  total_chars: number;
+  total_pages: number;
+  text: string;
 }
 
 export interface SearchResult {
+  id: string | null;
+  // Fetch the full text with getDocumentText
+  document_id: string | null;
+  // Snippet: characters [start, end) of a document of `chars` characters
   text: string;
+  start: number;
+  end: number;
+  // [start, end) offsets of matched words within the snippet
+  highlights: [number, number][];
+  chars: number;
   metadata: Record<string, unknown>;
   distance: number | null;
 }
@@ -40,6 +67,51 @@ export interface CaseListResponse {
   message: string;
 }
 
+export interface GraphNode {
+  id: string;
+  label: 'Case' | 'Document' | 'Entity';
+  properties: Record<string, unknown>;
+}
+
+export interface GraphEdge {
+  source: string;
+  target: string;
+  type: string;
+}
+
+export interface CaseGraph {
+  case_id: string;
+  depth: number;
+  nodes: GraphNode[];
+  edges: GraphEdge[];
+  truncated: boolean;
+}
+
+export interface TimelineEvent {
+  date: string;
+  doc_id: string;
+  offset: number;
+  precision: 'day' | 'month';
+  kind: 'absolute' | 'relative';
+  mention: string;
+  sentence: string;
+}
+
+export interface CaseTimeline {
+  case_id: string;
+  events: TimelineEvent[];
+  truncated: boolean;
+}
+
+export interface CaseSummary {
+  case_id: string;
+  summary: string;
+  key_points: string[];
+  version: number;
+  documents: number;
+  updated: number;
+}
+
 /**
  * Upload a document file to the backend
  */
@@ -61,11 +133,12 @@ export async function uploadDocument(file: File): Promise<UploadResult> {
 }
 
 /**
- * Analyze document text with AI
+ * Analyze document text with AI, given the text or an uploaded document id
  */
 export async function analyzeDocument(
-  text: string,
-  caseId?: string
+  source: string | { documentId: string },
+  caseId?: string,
+  mode: 'full' | 'fast' = 'full'
 ): Promise<AnalysisResult> {
   const response = await fetch(`${API_BASE_URL}/api/analyze`, {
     method: 'POST',
@@ -73,8 +146,11 @@ export async function analyzeDocument(
       'Content-Type': 'application/json',
     },
     body: JSON.stringify({
-      text,
+      ...(typeof source === 'string'
+        ? { text: source }
+        : { document_id: source.documentId }),
       case_id: caseId,
+      mode,
     }),
   });
 
@@ -91,7 +167,10 @@ export async function analyzeDocument(
  */
 export async function searchDocuments(
   query: string,
-  limit: number = 5
+  limit: number = 5,
+  maxChars: number = 300,
+  // Re-rank for variety; lambda 1 is pure relevance, 0 pure diversity
+  diversity?: { lambda?: number }
 ): Promise<SearchResult[]> {
   const response = await fetch(`${API_BASE_URL}/api/search`, {
     method: 'POST',
@@ -101,6 +180,11 @@ export async function searchDocuments(
     body: JSON.stringify({
       query,
       limit,
+      max_chars: maxChars,
+      ...(diversity && {
+        diverse: true,
+        diversity_lambda: diversity.lambda ?? 0.5,
+      }),
     }),
   });
 
@@ -126,12 +210,112 @@ export async function getCases(): Promise<CaseListResponse> {
   return response.json();
 }
 
+/**
+ * Fetch a case with its documents, entities and relationships in one call
+ */
+export async function getCaseGraph(
+  caseId: string,
+  depth: number = 2,
+  limit: number = 500
+): Promise<CaseGraph> {
+  const params = new URLSearchParams({
+    depth: String(depth),
+    limit: String(limit),
+  });
+  const response = await fetch(
+    `${API_BASE_URL}/api/cases/${encodeURIComponent(caseId)}/graph?${params}`
+  );
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch case graph');
+  }
+
+  return response.json();
+}
+
+/**
+ * Fetch the rolling summary of a case, or null if none exists yet
+ */
+export async function getCaseSummary(
+  caseId: string
+): Promise<CaseSummary | null> {
+  const response = await fetch(
+    `${API_BASE_URL}/api/cases/${encodeURIComponent(caseId)}/summary`
+  );
+
+  if (response.status === 404) {
+    return null;
+  }
+  if (!response.ok) {
+    throw new Error('Failed to fetch case summary');
+  }
+
+  return response.json();
+}
+
+/**
+ * Fetch a case's dated events, optionally within [start, end] (YYYY-MM-DD)
+ */
+export async function getCaseTimeline(
+  caseId: string,
+  start?: string,
+  end?: string
+): Promise<CaseTimeline> {
+  const params = new URLSearchParams();
+  if (start) params.set('start', start);
+  if (end) params.set('end', end);
+  const response = await fetch(
+    `${API_BASE_URL}/api/cases/${encodeURIComponent(caseId)}/timeline?${params}`
+  );
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch case timeline');
+  }
+
+  return response.json();
+}
+
+/**
+ * Fetch one page (1-based) or a [start, end) character range of an
+ * uploaded document
+ */
+export async function getDocumentText(
+  documentId: string,
+  range: { page: number } | { start: number; end?: number }
+): Promise<DocumentText> {
+  const params = new URLSearchParams();
+  if ('page' in range) {
+    params.set('page', String(range.page));
+  } else {
+    params.set('start', String(range.start));
+    if (range.end !== undefined) params.set('end', String(range.end));
+  }
+  const response = await fetch(
+    `${API_BASE_URL}/api/documents/${encodeURIComponent(documentId)}/text?${params}`
+  );
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch document text');
+  }
+
+  return response.json();
+}
+
 /**
  * Check backend health
  */
+export interface HealthCheck {
+  ok: boolean;
+  latency_ms: number;
+  checked_at: number;
+  error?: string;
+  [detail: string]: unknown;
+}
+
 export async function checkHealth(): Promise<{
   status: string;
   services: Record<string, boolean>;
+  checks: Record<string, HealthCheck>;
 }> {
   const response = await fetch(`${API_BASE_URL}/health`);
 
@@ -10,6 +10,29 @@ import sys
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Keep rate-limit buckets out of the working tree and fresh for each run
+os.environ.setdefault(
+    "RATE_LIMIT_DB", os.path.join(tempfile.mkdtemp(), "rate_limits.db")
+)
+os.environ.setdefault(
+    "LLM_SLOTS_DB", os.path.join(tempfile.mkdtemp(), "llm_slots.db")
+)
+os.environ.setdefault(
+    "CASE_SUMMARY_DB", os.path.join(tempfile.mkdtemp(), "case_summaries.db")
+)
+os.environ.setdefault(
+    "EMBEDDING_CACHE_DB", os.path.join(tempfile.mkdtemp(), "embeddings.db")
+)
+os.environ.setdefault(
+    "TIMELINE_DB", os.path.join(tempfile.mkdtemp(), "timeline.db")
+)
+os.environ.setdefault("DOCUMENT_STORE_DIR", tempfile.mkdtemp())
+os.environ.setdefault("PROFILE_DIR", tempfile.mkdtemp())
+os.environ.setdefault(
+    "GRAPH_JOURNAL_PATH",
+    os.path.join(tempfile.mkdtemp(), "graph_journal.jsonl")
+)
+
 @pytest.fixture
 def client():
     """Create a test client for the FastAPI app."""
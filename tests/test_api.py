@@ -152,6 +152,12 @@ class TestAnalyzeEndpoint:
 @pytest.mark.api
 class TestUploadEndpoint:
     """Test the /api/upload endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self):
+        # Every POST is charged, including ones rejected as malformed
+        from main import rate_limiter
+        rate_limiter.reset()
     
     def test_upload_text_file(self, client, sample_txt_file):
         """Test uploading a text file."""
@@ -326,6 +332,69 @@ class TestCasesEndpoint:
         assert "neo4j" in data["message"].lower() or "pending" in data["message"].lower()
 
 
+@pytest.mark.api
+class TestCasesConditionalGet:
+    """Test ETag and Last-Modified handling on /api/cases."""
+
+    @pytest.fixture
+    def case_cache(self):
+        from services.graph_cache import CaseListCache
+        cache = CaseListCache(ttl=60)
+        with patch('main.case_list_cache', cache), \
+                patch('main.graph_service.get_all_cases', return_value=[]):
+            yield cache
+
+    def test_cases_validators_present(self, client, case_cache):
+        """Test that the case list carries ETag and Last-Modified."""
+        response = client.get("/api/cases")
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        assert response.headers["last-modified"]
+
+    def test_if_none_match_returns_304(self, client, case_cache):
+        """Test that a matching ETag skips the database."""
+        first = client.get("/api/cases")
+        with patch('main.graph_service.get_all_cases') as get_all:
+            response = client.get(
+                "/api/cases",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+        assert response.status_code == 304
+        get_all.assert_not_called()
+
+    def test_if_modified_since_returns_304(self, client, case_cache):
+        """Test that an up-to-date If-Modified-Since returns 304."""
+        first = client.get("/api/cases")
+        response = client.get(
+            "/api/cases",
+            headers={"If-Modified-Since": first.headers["last-modified"]}
+        )
+        assert response.status_code == 304
+
+    def test_create_case_changes_etag(self, client, case_cache):
+        """Test that creating a case invalidates the list."""
+        first = client.get("/api/cases")
+        case_cache.bump()
+        with patch('main.graph_service.get_all_cases',
+                   return_value=[{"id": "c1", "title": "New"}]):
+            response = client.get(
+                "/api/cases",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+        assert response.headers["etag"] != first.headers["etag"]
+
+    def test_unavailable_graph_not_cached(self, client, case_cache):
+        """Test that a failed read is served without validators."""
+        with patch('main.graph_service.get_all_cases', return_value=None):
+            response = client.get("/api/cases")
+        assert response.status_code == 200
+        assert response.json()["cases"] == []
+        assert "etag" not in response.headers
+        assert case_cache.get() is None
+
+
 @pytest.mark.api
 class TestCORSConfiguration:
     """Test CORS configuration."""
@@ -0,0 +1,187 @@
+"""Tests for case subgraph retrieval and caching."""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.graph_cache import CaseGraphCache, CaseListCache
+from services.graph_db import GraphService
+
+
+def _result(records):
+    result = MagicMock()
+    result.__iter__.return_value = iter(records)
+    return result
+
+
+@pytest.fixture
+def graph_with_case():
+    """A GraphService whose driver returns one case, two docs and an entity."""
+    graph = GraphService()
+    graph.driver = MagicMock()
+    session = graph.driver.session.return_value.__enter__.return_value
+
+    case = _result([])
+    case.single.return_value = {"c": {"id": "case-1", "title": "Case One"}}
+    documents = _result([
+        {"source": "case:case-1", "type": "CONTAINS", "label": "Document",
+         "target": {"id": "doc-1", "filename": "a.pdf"}},
+        {"source": "case:case-1", "type": "CONTAINS", "label": "Document",
+         "target": {"id": "doc-2", "filename": "b.pdf"}},
+    ])
+    entities = _result([
+        {"source": "document:doc-1", "type": "MENTIONS", "label": "Entity",
+         "target": {"key": "acme", "name": "Acme Corp"}},
+    ])
+    session.run.side_effect = [case, documents, entities]
+    return graph
+
+
+@pytest.mark.unit
+class TestCaseSubgraph:
+    """Test the bounded case traversal."""
+
+    def test_subgraph_nodes_and_edges(self, graph_with_case):
+        """Test that documents and entities are returned as a graph."""
+        graph = graph_with_case.get_case_subgraph("case-1", 2, 100)
+
+        ids = [node["id"] for node in graph["nodes"]]
+        assert ids == [
+            "case:case-1", "document:doc-1", "document:doc-2", "entity:acme"
+        ]
+        assert graph["edges"][2] == {
+            "source": "document:doc-1", "target": "entity:acme",
+            "type": "MENTIONS"
+        }
+        assert graph["truncated"] is False
+
+    def test_subgraph_limit_truncates(self, graph_with_case):
+        """Test that traversal stops at the edge limit."""
+        graph = graph_with_case.get_case_subgraph("case-1", 2, 1)
+
+        assert len(graph["edges"]) == 1
+        assert graph["truncated"] is True
+
+    def test_edges_from_missing_nodes_dropped(self, graph_with_case):
+        """Test that edges never reference nodes outside the result."""
+        session = graph_with_case.driver.session.return_value.__enter__\
+            .return_value
+        case, documents, entities = session.run.side_effect
+        others = _result([
+            {"source": "entity:acme", "type": "MENTIONS",
+             "label": "Document", "target": {"id": "doc-9"}},
+            {"source": "entity:globex", "type": "MENTIONS",
+             "label": "Document", "target": {"id": "doc-8"}},
+        ])
+        session.run.side_effect = [case, documents, entities, others]
+
+        graph = graph_with_case.get_case_subgraph("case-1", 3, 100)
+
+        ids = {node["id"] for node in graph["nodes"]}
+        assert "document:doc-9" in ids
+        assert "document:doc-8" not in ids
+        for edge in graph["edges"]:
+            assert edge["source"] in ids and edge["target"] in ids
+        assert graph["truncated"] is True
+
+    def test_missing_case_returns_none(self):
+        """Test that an unknown case id returns None."""
+        graph = GraphService()
+        graph.driver = MagicMock()
+        session = graph.driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = None
+
+        assert graph.get_case_subgraph("nope", 2, 10) is None
+
+
+@pytest.mark.unit
+class TestCaseGraphCache:
+    """Test case graph cache invalidation."""
+
+    def test_invalidate_drops_entries(self):
+        """Test that a document change invalidates the case."""
+        cache = CaseGraphCache(ttl=60)
+        cache.put("case-1", 2, 100, {"nodes": []}, cache.version("case-1"))
+        assert cache.get("case-1", 2, 100) == {"nodes": []}
+
+        cache.invalidate("case-1")
+        assert cache.get("case-1", 2, 100) is None
+
+    def test_stale_read_not_stored(self):
+        """Test that a read racing an invalidation is not cached."""
+        cache = CaseGraphCache(ttl=60)
+        version = cache.version("case-1")
+        cache.invalidate("case-1")
+        cache.put("case-1", 2, 100, {"nodes": []}, version)
+
+        assert cache.get("case-1", 2, 100) is None
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        cache = CaseGraphCache(ttl=0)
+        cache.put("case-1", 1, 10, {"nodes": []}, 0)
+        assert cache.get("case-1", 1, 10) is None
+
+
+@pytest.mark.unit
+class TestCaseListCache:
+    """Test the versioned case list cache."""
+
+    def test_external_change_bumps_version(self):
+        """Test that a refreshed list that differs gets a new ETag."""
+        cache = CaseListCache(ttl=0)
+        etag, _ = cache.put([{"id": "a"}], cache.version)
+        assert cache.get() is None  # Expired immediately
+
+        new_etag, _ = cache.put([{"id": "a"}, {"id": "b"}], cache.version)
+        assert new_etag != etag
+
+    def test_unchanged_refresh_keeps_etag(self):
+        """Test that an identical refresh keeps the same ETag."""
+        cache = CaseListCache(ttl=0)
+        etag, _ = cache.put([{"id": "a"}], cache.version)
+        assert cache.put([{"id": "a"}], cache.version)[0] == etag
+
+    def test_workers_agree_on_etag(self):
+        """Test that separate caches tag the same list the same way."""
+        first, second = CaseListCache(ttl=60), CaseListCache(ttl=60)
+        second.bump()
+        cases = [{"id": "a", "title": "A"}]
+        assert first.put(cases, first.version)[0] == \
+            second.put(list(cases), second.version)[0]
+
+    def test_racing_create_not_stored(self):
+        """Test that a list read across a create is not cached."""
+        cache = CaseListCache(ttl=60)
+        version = cache.version
+        cache.bump()
+        assert cache.put([], version) is None
+        assert cache.get() is None
+
+
+@pytest.mark.api
+class TestCaseGraphEndpoint:
+    """Test the /api/cases/{id}/graph endpoint."""
+
+    def test_graph_served_and_cached(self, client, graph_with_case):
+        """Test that the second request is answered from the cache."""
+        cache = CaseGraphCache(ttl=60)
+        with patch('main.graph_service', graph_with_case), \
+                patch('main.case_graph_cache', cache), \
+                patch.object(graph_with_case, 'get_case_subgraph',
+                             wraps=graph_with_case.get_case_subgraph) as fetch:
+            first = client.get("/api/cases/case-1/graph?depth=2")
+            second = client.get("/api/cases/case-1/graph?depth=2")
+
+        assert first.status_code == 200
+        assert second.json() == first.json()
+        assert fetch.call_count == 1
+
+    def test_graph_unavailable(self, client):
+        """Test 503 when Neo4j is not connected."""
+        with patch('main.graph_service.driver', None):
+            response = client.get("/api/cases/case-1/graph")
+        assert response.status_code == 503
+
+    def test_depth_is_bounded(self, client):
+        """Test that traversal depth is validated."""
+        response = client.get("/api/cases/case-1/graph?depth=10")
+        assert response.status_code == 422
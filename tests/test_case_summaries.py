@@ -0,0 +1,192 @@
+"""Tests for incremental case summaries."""
+import pytest
+from unittest.mock import Mock, patch
+import json
+
+from services.case_summaries import CaseSummaryStore, CaseSummarizer
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CaseSummaryStore(db_path=str(tmp_path / "summaries.db"))
+
+
+@pytest.fixture
+def summarizer(store):
+    return CaseSummarizer(store)
+
+
+def merge_llm(summary, key_points):
+    llm = Mock()
+    llm.invoke.return_value = json.dumps(
+        {"summary": summary, "key_points": key_points}
+    )
+    return llm
+
+
+@pytest.mark.unit
+class TestCaseSummaryStore:
+    """Test versioned compare-and-set storage."""
+
+    def test_commit_and_get(self, store):
+        """Test that a first commit creates version 1."""
+        assert store.commit("c1", "d1", 0, "Lease dispute", ["Rent unpaid"])
+        summary = store.get("c1")
+        assert summary["version"] == 1
+        assert summary["documents"] == 1
+        assert summary["key_points"] == ["Rent unpaid"]
+        assert store.has_document("c1", "d1")
+
+    def test_stale_version_rejected(self, store):
+        """Test that a writer holding an old version loses."""
+        store.commit("c1", "d1", 0, "first", [])
+        store.commit("c1", "d2", 1, "second", [])
+        assert not store.commit("c1", "d3", 1, "stale", [])
+        assert store.get("c1")["summary"] == "second"
+        assert store.get("c1")["documents"] == 2
+
+    def test_missing_case(self, store):
+        assert store.get("nope") is None
+
+
+@pytest.mark.unit
+class TestCaseSummarizer:
+    """Test incremental merging."""
+
+    @pytest.mark.asyncio
+    async def test_first_document_needs_no_llm(self, summarizer, store):
+        """Test that the first document seeds the summary directly."""
+        llm = Mock()
+        assert await summarizer.merge_document(
+            "c1", "d1", "Contract signed", ["Term is 2 years"], llm
+        )
+        llm.invoke.assert_not_called()
+        assert store.get("c1")["summary"] == "Contract signed"
+
+    @pytest.mark.asyncio
+    async def test_merge_sends_only_summaries(self, summarizer, store):
+        """Test that later documents merge summary and key points only."""
+        store.commit("c1", "d1", 0, "Contract signed", ["Term is 2 years"])
+        llm = merge_llm("Contract signed, then breached", ["Breach in May"])
+
+        assert await summarizer.merge_document(
+            "c1", "d2", "Breach notice", ["Breach in May"], llm
+        )
+        prompt = llm.invoke.call_args[0][0]
+        assert "Contract signed" in prompt
+        assert "Breach notice" in prompt
+
+        summary = store.get("c1")
+        assert summary["version"] == 2
+        assert summary["documents"] == 2
+        assert summary["summary"] == "Contract signed, then breached"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_document_skipped(self, summarizer, store):
+        """Test that re-merging a document is a no-op."""
+        store.commit("c1", "d1", 0, "first", [])
+        store.commit("c1", "d2", 1, "second", [])
+        llm = Mock()
+        assert await summarizer.merge_document("c1", "d2", "x", [], llm)
+        llm.invoke.assert_not_called()
+        assert store.get("c1")["version"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writer_retried(self, summarizer, store):
+        """Test that a version conflict re-reads and merges again."""
+        store.commit("c1", "d1", 0, "first", [])
+        llm = merge_llm("merged", [])
+
+        def racing_invoke(prompt):
+            if llm.invoke.call_count == 1:
+                store.commit("c1", "other", 1, "concurrent", [])
+            return '{"summary": "merged", "key_points": []}'
+
+        llm.invoke.side_effect = racing_invoke
+        assert await summarizer.merge_document("c1", "d2", "new", [], llm)
+        assert llm.invoke.call_count == 2
+        assert "concurrent" in llm.invoke.call_args[0][0]
+        assert store.get("c1")["version"] == 3
+
+    @pytest.mark.asyncio
+    async def test_unparseable_merge_keeps_summary(self, summarizer, store):
+        """Test that a bad LLM response leaves the stored summary alone."""
+        store.commit("c1", "d1", 0, "first", [])
+        llm = Mock()
+        llm.invoke.return_value = "not json"
+        assert not await summarizer.merge_document("c1", "d2", "x", [], llm)
+        assert store.get("c1")["version"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_merge_retried_on_next_update(
+        self, summarizer, store
+    ):
+        """Test that a failed merge is recorded and folded in later."""
+        store.commit("c1", "d1", 0, "first", [])
+        bad = Mock()
+        bad.invoke.return_value = "not json"
+        await summarizer.update("c1", "d2", "second doc", ["p2"], bad)
+        assert [p["doc_id"] for p in store.pending("c1")] == ["d2"]
+        assert store.get("c1")["version"] == 1
+
+        good = merge_llm("merged", [])
+        await summarizer.update("c1", "d3", "third doc", [], good)
+
+        assert store.pending("c1") == []
+        assert store.has_document("c1", "d2")
+        assert store.get("c1")["documents"] == 3
+        assert "second doc" in good.invoke.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_failing_merge_eventually_dropped(self, summarizer, store):
+        """Test that a merge failing on every retry is given up."""
+        store.commit("c1", "d1", 0, "first", [])
+        llm = Mock()
+        llm.invoke.side_effect = RuntimeError("model crashed")
+        with patch('services.case_summaries.MAX_PENDING_RETRIES', 1):
+            await summarizer.update("c1", "d2", "x", [], llm)
+            assert len(store.pending("c1")) == 1
+            await summarizer.update("c1", "d2", "x", [], llm)
+        assert store.pending("c1") == []
+        assert store.get("c1")["summary"] == "first"
+
+
+@pytest.mark.api
+class TestCaseSummaryEndpoint:
+    """Test GET /api/cases/{case_id}/summary."""
+
+    @pytest.fixture
+    def summary_store(self, store):
+        with patch('main.case_summary_store', store):
+            yield store
+
+    def test_fallback_analysis_not_summarized(self, client):
+        """Test that raw text from an unparseable analysis is kept out."""
+        with patch('main.llm') as llm, \
+                patch('main.case_summarizer') as summarizer, \
+                patch('main.collection'), patch('main.graph_writer'), \
+                patch('main.timeline_index'):
+            llm.invoke.return_value = "Could not parse this"
+            response = client.post(
+                "/api/analyze",
+                json={"text": "Lease document", "case_id": "c1"}
+            )
+        assert response.status_code == 200
+        summarizer.update.assert_not_called()
+
+    def test_summary_not_found(self, client, summary_store):
+        response = client.get("/api/cases/missing/summary")
+        assert response.status_code == 404
+
+    def test_summary_with_etag(self, client, summary_store):
+        """Test that the summary is served with a version ETag."""
+        summary_store.commit("c1", "d1", 0, "Lease dispute", ["Rent"])
+        response = client.get("/api/cases/c1/summary")
+        assert response.status_code == 200
+        assert response.json()["summary"] == "Lease dispute"
+
+        again = client.get(
+            "/api/cases/c1/summary",
+            headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert again.status_code == 304
@@ -0,0 +1,118 @@
+"""Tests for response serialization and compression."""
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+import gzip
+
+from services import compression
+from services.compression import CompressionMiddleware
+
+
+@pytest.fixture
+def compressed_client():
+    """A small app behind the compression middleware."""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    async def large():
+        return {"text": "contract clause " * 500}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b"streamed chunk " * 100
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/encoded")
+    async def encoded():
+        return PlainTextResponse(
+            "x" * 500, headers={"Content-Encoding": "identity"}
+        )
+
+    return TestClient(app)
+
+
+@pytest.mark.unit
+class TestCompressionMiddleware:
+    """Test gzip/brotli negotiation and thresholds."""
+
+    def test_large_json_gzipped(self, compressed_client):
+        """Test that large JSON bodies are gzip compressed."""
+        response = compressed_client.get(
+            "/large", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-encoding" in response.headers["vary"].lower()
+        assert response.json()["text"].startswith("contract clause")
+
+    def test_small_body_uncompressed(self, compressed_client):
+        """Test that bodies under the threshold are sent as is."""
+        response = compressed_client.get(
+            "/small", headers={"Accept-Encoding": "gzip"}
+        )
+        assert "content-encoding" not in response.headers
+
+    def test_no_accept_encoding(self, compressed_client):
+        """Test that clients without Accept-Encoding get identity."""
+        response = compressed_client.get(
+            "/large", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+
+    def test_refused_coding_skipped(self, compressed_client):
+        """Test that q=0 codings are not used."""
+        response = compressed_client.get(
+            "/large", headers={"Accept-Encoding": "br;q=0, gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_gzip_wins_ties(self, compressed_client):
+        """Test that gzip is used when both are equally acceptable."""
+        response = compressed_client.get(
+            "/large", headers={"Accept-Encoding": "br, gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+
+    @pytest.mark.skipif(compression.brotli is None, reason="brotli missing")
+    def test_brotli_when_weighted_higher(self, compressed_client):
+        """Test that brotli is used when the client prefers it."""
+        response = compressed_client.get(
+            "/large", headers={"Accept-Encoding": "gzip;q=0.8, br"}
+        )
+        assert response.headers["content-encoding"] == "br"
+        assert response.json()["text"].startswith("contract clause")
+
+    def test_streaming_response(self, compressed_client):
+        """Test that streamed bodies are compressed chunk by chunk."""
+        with compressed_client.stream(
+            "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert gzip.decompress(raw) == b"streamed chunk " * 300
+
+    def test_existing_encoding_untouched(self, compressed_client):
+        """Test that pre-encoded responses pass through."""
+        response = compressed_client.get(
+            "/encoded", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "identity"
+
+
+@pytest.mark.api
+class TestApiSerialization:
+    """Test that the API uses the fast serializer."""
+
+    def test_default_response_class(self):
+        """Test that routes default to ORJSONResponse."""
+        from main import app
+        assert app.router.default_response_class is ORJSONResponse
@@ -0,0 +1,228 @@
+"""Tests for stored documents and ranged text retrieval."""
+import pytest
+import sqlite3
+from unittest.mock import patch
+
+from services.document_store import DocumentStore, page_offsets
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(root=str(tmp_path))
+
+
+@pytest.mark.unit
+class TestPageOffsets:
+    """Test page boundaries."""
+
+    def test_form_feed_pages(self):
+        assert page_offsets("one\ftwo\fthree") == [0, 4, 8]
+
+    def test_trailing_form_feed(self):
+        assert page_offsets("one\ftwo\f") == [0, 4]
+
+    def test_fallback_pages_break_at_lines(self):
+        text = ("x" * 99 + "\n") * 100
+        offsets = page_offsets(text)
+        assert len(offsets) > 1
+        assert all(text[o - 1] == "\n" for o in offsets[1:])
+
+
+@pytest.mark.unit
+class TestDocumentStore:
+    """Test storing and slicing document text."""
+
+    def test_put_and_get(self, store):
+        meta = store.put("Page one\fPage two", "a.pdf")
+        assert meta["chars"] == 17
+        assert meta["pages"] == [0, 9]
+        assert store.meta(meta["document_id"])["filename"] == "a.pdf"
+        assert store.get_text(meta["document_id"]) == "Page one\fPage two"
+        assert store.get_range(meta["document_id"], 9, 13) == "Page"
+
+    def test_unknown_and_invalid_ids(self, store):
+        assert store.meta("0" * 32) is None
+        assert store.get_text("../../etc/passwd") is None
+
+    def test_ranges_across_blocks(self, tmp_path):
+        store = DocumentStore(root=str(tmp_path), block_chars=7)
+        text = "".join(chr(0x3b1 + i % 20) for i in range(100))
+        document_id = store.put(text)["document_id"]
+        for start, end in [(0, 100), (5, 9), (7, 14), (13, 15), (99, 200)]:
+            assert store.get_range(document_id, start, end) == text[start:end]
+        assert store.get_range(document_id, 50, 50) == ""
+
+    def test_blocks_are_compressed(self, store):
+        meta = store.put("The party of the first part. " * 2000)
+        assert store.stats()["stored_bytes"] < meta["chars"] // 10
+
+    def test_identical_text_shares_blob(self, store):
+        first = store.put("Same text", "a.txt")
+        second = store.put("Same text", "b.txt")
+        assert first["document_id"] != second["document_id"]
+        assert first["digest"] == second["digest"]
+        assert store.stats()["blobs"] == 1
+
+        assert store.delete(first["document_id"])
+        store.compact()
+        assert store.get_text(second["document_id"]) == "Same text"
+        assert not store.delete(first["document_id"])
+
+    def test_reuse_within_case(self, store):
+        first = store.put("Same text", "a.txt", case_id="case-1")
+        again = store.put("Same text", "a.txt", case_id="case-1")
+        assert again["document_id"] == first["document_id"]
+        assert store.stats()["documents"] == 1
+
+        # Another case, filename or an upload gets its own record
+        other_case = store.put("Same text", "a.txt", case_id="case-2")
+        renamed = store.put("Same text", "b.txt", case_id="case-1")
+        upload = store.put("Same text", "a.txt")
+        ids = {first["document_id"], other_case["document_id"],
+               renamed["document_id"], upload["document_id"]}
+        assert len(ids) == 4
+        assert store.meta(renamed["document_id"])["filename"] == "b.txt"
+        assert store.stats()["documents"] == 4
+        assert store.stats()["blobs"] == 1
+
+    def test_store_without_case_column_upgraded(self, tmp_path):
+        root = tmp_path / "store"
+        root.mkdir()
+        conn = sqlite3.connect(root / "index.db")
+        conn.execute(
+            "CREATE TABLE documents (document_id TEXT PRIMARY KEY, "
+            "digest TEXT NOT NULL, filename TEXT, created REAL NOT NULL)"
+        )
+        conn.commit()
+        conn.close()
+        store = DocumentStore(root=str(root))
+        meta = store.put("Old store", "a.txt", case_id="case-1")
+        assert store.put("Old store", "a.txt", case_id="case-1") == meta
+
+    def test_compaction_removes_unreferenced_blobs(self, store, tmp_path):
+        meta = store.put("Short lived")
+        store.delete(meta["document_id"])
+        assert store.stats()["unreferenced_blobs"] == 1
+
+        orphan = tmp_path / "blobs" / "ab" / ("ab" + "0" * 62)
+        orphan.parent.mkdir(exist_ok=True)
+        orphan.write_bytes(b"left by a crash")
+
+        result = store.compact()
+        assert result["removed_files"] == 2
+        assert store.stats()["blobs"] == 0
+        assert not orphan.exists()
+
+        # Content removed by compaction can be stored again
+        again = store.put("Short lived")
+        assert store.get_text(again["document_id"]) == "Short lived"
+
+
+@pytest.mark.api
+class TestDocumentEndpoints:
+    """Test upload handles, analysis by id and ranged text."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self, store):
+        from main import rate_limiter
+        rate_limiter.reset()
+        with patch('main.document_store', store):
+            yield
+
+    def upload(self, client, text):
+        response = client.post(
+            "/api/upload",
+            files={"file": ("doc.txt", text.encode(), "text/plain")}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_upload_returns_handle_and_preview(self, client):
+        data = self.upload(client, "word " * 1000)
+        assert data["document_id"]
+        assert data["chars"] == 5000
+        assert len(data["extracted_text"]) == 2000
+        assert data["text_truncated"] is True
+
+    def test_text_reading_like_an_error_is_stored(self, client):
+        data = self.upload(client, "Errors and Omissions Insurance Policy")
+        assert data["document_id"]
+        assert data["error"] is None
+
+    def test_unreadable_pdf_reports_error(self, client):
+        response = client.post(
+            "/api/upload",
+            files={"file": ("doc.pdf", b"%PDF-1.4 broken", "application/pdf")}
+        )
+        data = response.json()
+        assert data["document_id"] is None
+        assert data["extracted_text"] == ""
+        assert "PDF" in data["error"]
+
+    def test_text_by_range_and_page(self, client, store):
+        meta = store.put("First page.\fSecond page.", "a.pdf")
+        url = f"/api/documents/{meta['document_id']}/text"
+
+        data = client.get(url, params={"start": 6, "end": 10}).json()
+        assert data["text"] == "page"
+        assert data["total_chars"] == 24
+        assert data["total_pages"] == 2
+
+        data = client.get(url, params={"page": 2}).json()
+        assert data["text"] == "Second page."
+        assert client.get(url, params={"page": 3}).status_code == 404
+        assert client.get(
+            url, params={"start": 10, "end": 5}
+        ).status_code == 400
+
+    def test_delete_document(self, client, store, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        admin = {"Authorization": "Bearer s3cret"}
+        meta = store.put("Delete me")
+        url = f"/api/documents/{meta['document_id']}"
+        assert client.delete(url, headers=admin).status_code == 204
+        assert client.delete(url, headers=admin).status_code == 404
+        assert client.get(url + "/text").status_code == 404
+
+    def test_delete_requires_admin(self, client, store, monkeypatch):
+        meta = store.put("Keep me")
+        url = f"/api/documents/{meta['document_id']}"
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        assert client.delete(url).status_code == 404
+
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        assert client.delete(url).status_code == 401
+        assert client.delete(
+            url, headers={"Authorization": "Bearer wrong"}
+        ).status_code == 401
+        assert store.meta(meta["document_id"]) is not None
+
+    def test_text_unknown_document(self, client):
+        response = client.get(f"/api/documents/{'0' * 32}/text")
+        assert response.status_code == 404
+
+    @patch('main.llm')
+    def test_analyze_by_document_id(self, mock_llm, client):
+        """Test that analysis reads the stored text, not a re-sent copy."""
+        mock_llm.invoke.return_value = (
+            '{"summary": "s", "key_points": [], "entities": []}'
+        )
+        data = self.upload(client, "The lease was signed by Acme.")
+        response = client.post(
+            "/api/analyze", json={"document_id": data["document_id"]}
+        )
+        assert response.status_code == 200
+        assert "signed by Acme" in mock_llm.invoke.call_args[0][0]
+
+    def test_analyze_requires_exactly_one_source(self, client):
+        assert client.post("/api/analyze", json={}).status_code == 422
+        response = client.post("/api/analyze", json={
+            "text": "Some text", "document_id": "0" * 32
+        })
+        assert response.status_code == 422
+
+    def test_analyze_unknown_document(self, client):
+        response = client.post(
+            "/api/analyze", json={"document_id": "0" * 32, "mode": "fast"}
+        )
+        assert response.status_code == 404
@@ -0,0 +1,128 @@
+"""Tests for the batched, cached embedding layer."""
+import pytest
+import numpy as np
+
+from services.embeddings import (
+    CachedEmbeddingFunction, EmbeddingCache, OnnxEmbedder
+)
+
+
+class CountingEmbedder:
+    """Deterministic fake model that records each batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array(
+            [[len(text), text.count("a"), 1.0] for text in texts],
+            dtype=np.float32
+        )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(db_path=str(tmp_path / "embeddings.db"))
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+@pytest.mark.unit
+class TestCachedEmbeddingFunction:
+    """Test batching, deduplication and caching."""
+
+    def test_embeds_in_order(self, embedder, cache):
+        fn = CachedEmbeddingFunction(embedder, "fake", cache=cache)
+        result = fn(["banana", "a", "lease"])
+        assert [v[0] for v in result] == [6, 1, 5]
+        assert all(v.dtype == np.float32 for v in result)
+
+    def test_batches_sorted_by_length(self, embedder, cache):
+        """Test that texts are batched shortest first."""
+        fn = CachedEmbeddingFunction(
+            embedder, "fake", cache=cache, batch_size=2
+        )
+        fn(["ccc", "a", "dddd", "bb"])
+        assert embedder.batches == [["a", "bb"], ["ccc", "dddd"]]
+
+    def test_duplicates_embedded_once(self, embedder, cache):
+        fn = CachedEmbeddingFunction(embedder, "fake", cache=cache)
+        result = fn(["same", "same", "other"])
+        assert sum(len(b) for b in embedder.batches) == 2
+        assert np.array_equal(result[0], result[1])
+
+    def test_cached_texts_skip_inference(self, embedder, cache):
+        """Test that re-indexing unchanged passages costs no inference."""
+        fn = CachedEmbeddingFunction(embedder, "fake", cache=cache)
+        first = fn(["clause one", "clause two"])
+        embedder.batches.clear()
+
+        second = fn(["clause one", "clause two", "clause three"])
+        assert embedder.batches == [["clause three"]]
+        assert np.array_equal(first[0], second[0])
+        assert cache.stats()["hits"] == 2
+
+    def test_cache_keyed_by_model(self, embedder, cache):
+        """Test that a different model does not reuse vectors."""
+        CachedEmbeddingFunction(embedder, "model-a", cache=cache)(["text"])
+        embedder.batches.clear()
+        CachedEmbeddingFunction(embedder, "model-b", cache=cache)(["text"])
+        assert embedder.batches == [["text"]]
+
+    def test_parallel_workers(self, embedder, cache):
+        fn = CachedEmbeddingFunction(
+            embedder, "fake", cache=cache, batch_size=1, workers=4
+        )
+        texts = [f"passage {i}" for i in range(20)]
+        result = fn(texts)
+        assert len(result) == 20
+        assert len(embedder.batches) == 20
+
+    def test_without_cache(self, embedder):
+        fn = CachedEmbeddingFunction(embedder, "fake")
+        fn(["text"])
+        fn(["text"])
+        assert len(embedder.batches) == 2
+
+
+@pytest.mark.unit
+class TestEmbeddingCache:
+    """Test the SQLite embedding store."""
+
+    def test_round_trip(self, cache):
+        vector = np.array([0.25, -1.5, 3.0], dtype=np.float32)
+        cache.put_many({"k": vector})
+        assert np.array_equal(cache.get_many(["k", "missing"])["k"], vector)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = EmbeddingCache(
+            db_path=str(tmp_path / "small.db"), max_entries=2
+        )
+        vector = np.zeros(3, dtype=np.float32)
+        cache.put_many({"old": vector})
+        cache.put_many({"newer": vector})
+        cache.get_many(["old"])
+        cache.put_many({"newest": vector})
+
+        assert set(cache.get_many(["old", "newer", "newest"])) == {
+            "old", "newest"
+        }
+
+
+@pytest.mark.unit
+class TestOnnxEmbedder:
+    """Test model configuration."""
+
+    def test_model_id_includes_file(self, tmp_path):
+        embedder = OnnxEmbedder(
+            model_dir=str(tmp_path / "bge-small"),
+            onnx_file="model_quint8.onnx"
+        )
+        assert embedder.model_id == "bge-small/model_quint8.onnx"
+
+    def test_default_model_id(self):
+        assert OnnxEmbedder().model_id == "all-MiniLM-L6-v2/model.onnx"
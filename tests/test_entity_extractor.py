@@ -0,0 +1,218 @@
+"""Tests for rule-based entity extraction and the party gazetteer."""
+import pytest
+from unittest.mock import patch
+
+from services.entity_extractor import (
+    AhoCorasick, Gazetteer, extract_rule_entities, merge_entities
+)
+
+
+def by_type(entities, entity_type):
+    return [e["name"] for e in entities if e["type"] == entity_type]
+
+
+@pytest.mark.unit
+class TestAhoCorasick:
+    """Test the multi-pattern matcher."""
+
+    def test_overlapping_patterns(self):
+        automaton = AhoCorasick({"he": 1, "she": 2, "his": 3, "hers": 4})
+        assert sorted(automaton.iter("ushers")) == [
+            (1, 4, 2), (2, 4, 1), (2, 6, 4)
+        ]
+
+    def test_no_patterns(self):
+        assert list(AhoCorasick({}).iter("anything")) == []
+
+
+@pytest.mark.unit
+class TestRuleEntities:
+    """Test regex extractors."""
+
+    def test_money(self):
+        entities = extract_rule_entities(
+            "Damages of $1,250,000.00 and 500 dollars, plus €3 million."
+        )
+        assert by_type(entities, "Money") == [
+            "$1,250,000.00", "500 dollars", "€3 million"
+        ]
+
+    def test_money_in_words(self):
+        entities = extract_rule_entities(
+            "A settlement of 5 million dollars, or 2.5 billion USD."
+        )
+        assert by_type(entities, "Money") == [
+            "5 million dollars", "2.5 billion USD"
+        ]
+
+    def test_case_numbers(self):
+        entities = extract_rule_entities(
+            "Filed as 1:23-cv-04567-ABC, related to Case No. 2021-7788."
+        )
+        assert by_type(entities, "CaseNumber") == [
+            "1:23-cv-04567-ABC", "Case No. 2021-7788"
+        ]
+
+    def test_statutes(self):
+        entities = extract_rule_entities(
+            "Claims under 42 U.S.C. § 1983 and 29 C.F.R. 1910.1200; "
+            "see also § 2-207(1)."
+        )
+        statutes = by_type(entities, "Statute")
+        assert "42 U.S.C. § 1983" in statutes
+        assert "§ 2-207(1)" in statutes
+        assert any(s.startswith("29 C.F.R.") for s in statutes)
+
+    def test_dates(self):
+        entities = extract_rule_entities("Signed January 1st, 2023.")
+        assert by_type(entities, "Date") == ["January 1st, 2023"]
+
+    def test_duplicates_removed(self):
+        entities = extract_rule_entities("Paid $500. Later paid $500 again.")
+        assert by_type(entities, "Money") == ["$500"]
+
+
+@pytest.mark.unit
+class TestGazetteer:
+    """Test known-party matching."""
+
+    @pytest.fixture
+    def parties(self):
+        gazetteer = Gazetteer(rebuild_seconds=0)
+        gazetteer.add("Acme Corporation", "Organization")
+        gazetteer.add("John Smith", "Person")
+        gazetteer.add("Big Co", "Organization", canonical="Big Company LLC")
+        return gazetteer
+
+    def test_matches_known_parties(self, parties):
+        entities = extract_rule_entities(
+            "ACME CORPORATION sued john smith over Big Co's invoice.", parties
+        )
+        assert by_type(entities, "Organization") == [
+            "Acme Corporation", "Big Company LLC"
+        ]
+        assert by_type(entities, "Person") == ["John Smith"]
+
+    def test_whole_words_only(self, parties):
+        assert extract_rule_entities("Acme Corporations", parties) == []
+
+    def test_offsets_index_original_text(self, parties):
+        # "İ".lower() is two characters; offsets must not drift
+        text = "İİ İzmir office of ACME CORPORATION, paid $500."
+        [(start, end, name, _)] = parties.find(text)
+        assert text[start:end] == "ACME CORPORATION"
+        entities = extract_rule_entities(text, parties)
+        assert by_type(entities, "Organization") == ["Acme Corporation"]
+
+    def test_rule_types_not_added(self, parties):
+        parties.add("$500", "Money")
+        parties.add("ab", "Person")
+        assert len(parties) == 3
+
+    def test_rebuild_is_deferred(self):
+        gazetteer = Gazetteer(rebuild_seconds=3600)
+        gazetteer.add("Acme Corporation", "Organization")
+        assert gazetteer.find("Acme Corporation")
+        gazetteer.add("John Smith", "Person")
+        # Picked up on the next rebuild, not immediately
+        assert gazetteer.find("John Smith") == []
+
+    def test_rebuild_runs_in_background(self):
+        gazetteer = Gazetteer(rebuild_seconds=0)
+        gazetteer.add("Acme Corporation", "Organization")
+        assert gazetteer.find("Acme Corporation")
+        gazetteer.add("John Smith", "Person")
+
+        # The request in flight matches with the previous automaton
+        assert gazetteer.find("John Smith") == []
+        rebuilding = gazetteer._rebuilding
+        if rebuilding is not None:
+            rebuilding.join()
+        assert gazetteer.find("John Smith")
+
+    def test_stopword_names_ignored(self, parties):
+        for name in ("The Court", "Plaintiff", "the Parties", "2023"):
+            parties.add(name, "Organization")
+        assert len(parties) == 3
+
+    def test_learned_names_need_repeat_sightings(self):
+        gazetteer = Gazetteer(rebuild_seconds=0, promote_after=2)
+        gazetteer.learn("Jane Doe", "Person")
+        assert len(gazetteer) == 0
+        gazetteer.learn("JANE DOE", "Person")
+        assert len(gazetteer) == 1
+
+    def test_size_is_capped(self):
+        gazetteer = Gazetteer(rebuild_seconds=0, max_names=2)
+        for name in ("Alpha Inc", "Beta Inc", "Gamma Inc"):
+            gazetteer.add(name, "Organization")
+        assert len(gazetteer) == 2
+        assert gazetteer.find("Alpha Inc") == []
+        assert gazetteer.find("Gamma Inc")
+
+
+@pytest.mark.unit
+class TestMergeEntities:
+    def test_rule_entities_first(self):
+        merged = merge_entities(
+            [{"name": "Acme Corp.", "type": "Organization"}],
+            [{"name": "ACME Corporation", "type": "Organization"},
+             {"name": "Jane Doe", "type": "Person"}, "junk"]
+        )
+        assert [e["name"] for e in merged] == ["Acme Corp.", "Jane Doe"]
+
+    def test_same_name_different_category_kept(self):
+        merged = merge_entities(
+            [{"name": "Jordan", "type": "Person"}],
+            [{"name": "Jordan", "type": "Location"},
+             {"name": "jordan", "type": "Individual"}]
+        )
+        assert [e["type"] for e in merged] == ["Person", "Location"]
+
+
+@pytest.mark.api
+class TestAnalyzeModes:
+    """Test fast and full analysis with rule-based entities."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self):
+        from main import rate_limiter
+        rate_limiter.reset()
+
+    def test_fast_mode_skips_llm(self, client):
+        """Test that fast mode works without the LLM."""
+        with patch('main.llm', None):
+            response = client.post("/api/analyze", json={
+                "text": "On March 3, 2023 the buyer paid $10,000 under "
+                        "42 U.S.C. § 1983.",
+                "mode": "fast"
+            })
+        assert response.status_code == 200
+        data = response.json()
+        assert {e["type"] for e in data["entities"]} == {
+            "Date", "Money", "Statute"
+        }
+        assert data["summary"].startswith("On March 3, 2023")
+        assert data["key_points"] == []
+
+    @patch('main.llm')
+    def test_full_mode_sends_hints(self, mock_llm, client):
+        """Test that rule entities are passed to and merged with the LLM."""
+        mock_llm.invoke.return_value = (
+            '{"summary": "s", "key_points": [], '
+            '"entities": [{"name": "Jane Doe", "type": "Person"}, '
+            '{"name": "$10,000", "type": "Money"}]}'
+        )
+        learner = Gazetteer(rebuild_seconds=0, promote_after=1)
+        with patch('main.gazetteer', learner) as names:
+            response = client.post("/api/analyze", json={
+                "text": "Jane Doe paid $10,000 on March 3, 2023."
+            })
+            assert len(names) == 1
+
+        prompt = mock_llm.invoke.call_args[0][0]
+        assert "- $10,000 (Money)" in prompt
+        entities = response.json()["entities"]
+        assert [e["name"] for e in entities] == [
+            "$10,000", "March 3, 2023", "Jane Doe"
+        ]
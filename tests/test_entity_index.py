@@ -0,0 +1,135 @@
+"""Tests for entity normalization and graph schema bootstrap."""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.entity_index import (
+    EntityIndex, entity_category, normalize_entity_name
+)
+from services.graph_db import GraphService, SCHEMA_STATEMENTS
+
+
+@pytest.mark.unit
+class TestNormalizeEntityName:
+    """Test entity key normalization."""
+
+    @pytest.mark.parametrize("name", [
+        "Acme Corp.",
+        "ACME Corporation",
+        "acme, inc",
+        "The Acme Company",
+    ])
+    def test_company_variants_share_key(self, name):
+        """Test that designator and punctuation variants collapse."""
+        assert normalize_entity_name(name) == "acme"
+
+    def test_people_and_abbreviations(self):
+        """Test honorifics, initials and whitespace handling."""
+        assert normalize_entity_name("Dr.  John   DOE") == "john doe"
+        assert normalize_entity_name("U.S.A.") == "usa"
+        assert normalize_entity_name("Smith & Jones LLP") == "smith and jones"
+
+    def test_designator_alone_is_kept(self):
+        """Test that a bare designator is not normalized away."""
+        assert normalize_entity_name("Company") == "company"
+        assert normalize_entity_name("  ...  ") == ""
+
+    @pytest.mark.parametrize("entity_type, category", [
+        ("Person", "person"),
+        ("Individual", "person"),
+        ("Company", "organization"),
+        ("ORG", "organization"),
+        ("GPE", "location"),
+        ("CaseNumber", "casenumber"),
+        ("Case_Number", "casenumber"),
+        (None, "entity"),
+    ])
+    def test_entity_category(self, entity_type, category):
+        """Test that type synonyms share a category."""
+        assert entity_category(entity_type) == category
+
+
+@pytest.mark.unit
+class TestEntityIndex:
+    """Test canonical name and alias resolution."""
+
+    def test_first_name_is_canonical(self):
+        """Test that later variants resolve to the first seen name."""
+        index = EntityIndex()
+        assert index.resolve("Acme Corp.", "Organization") == (
+            "organization:acme", "Acme Corp."
+        )
+        assert index.resolve("ACME Corporation", "Company") == (
+            "organization:acme", "Acme Corp."
+        )
+
+    def test_type_is_part_of_key(self):
+        """Test that one name of different kinds gets separate keys."""
+        index = EntityIndex()
+        person, _ = index.resolve("Jordan", "Person")
+        place, _ = index.resolve("Jordan", "Location")
+        assert person == "person:jordan"
+        assert place == "location:jordan"
+
+    def test_explicit_alias(self, tmp_path):
+        """Test that configured aliases map onto the canonical key."""
+        aliases = tmp_path / "aliases.json"
+        aliases.write_text('{"IBM": "International Business Machines Corp"}')
+        index = EntityIndex()
+        index.load_aliases(str(aliases))
+
+        key, name = index.resolve("I.B.M.", "Organization")
+        assert key == "organization:international business machines"
+        assert name == "International Business Machines Corp"
+
+    def test_blank_names_rejected(self):
+        """Test that names without word characters are not indexed."""
+        assert EntityIndex().resolve(" -- ") is None
+
+    def test_bounded_size(self):
+        """Test that the least recently used keys are evicted."""
+        index = EntityIndex(max_entries=2)
+        for name in ("Alpha", "Beta", "Gamma"):
+            index.resolve(name)
+        assert len(index) == 2
+
+
+@pytest.mark.unit
+class TestGraphSchemaBootstrap:
+    """Test constraint creation at connect."""
+
+    def test_connect_creates_constraints(self):
+        """Test that every schema statement runs after connecting."""
+        graph = GraphService()
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+
+        with patch('services.graph_db.GraphDatabase.driver',
+                   return_value=driver):
+            graph.connect()
+
+        statements = [call.args[0] for call in session.run.call_args_list]
+        for statement in SCHEMA_STATEMENTS:
+            assert statement in statements
+        assert any("REQUIRE e.key IS UNIQUE" in s for s in statements)
+
+    def test_connect_rekeys_untyped_entities(self):
+        """Test that entities keyed by name alone get typed keys."""
+        graph = GraphService()
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+
+        def run(query, **params):
+            if "NOT e.key CONTAINS" in query:
+                return [{"key": "jordan", "type": "Person"}]
+            return MagicMock()
+        session.run.side_effect = run
+
+        with patch('services.graph_db.GraphDatabase.driver',
+                   return_value=driver):
+            graph.connect()
+
+        updates = [
+            call.kwargs["rows"] for call in session.run.call_args_list
+            if "SET e.key = row.new" in call.args[0]
+        ]
+        assert updates == [[{"old": "jordan", "new": "person:jordan"}]]
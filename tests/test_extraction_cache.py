@@ -0,0 +1,121 @@
+"""Tests for the content-addressed extraction cache."""
+import pytest
+from unittest.mock import patch, AsyncMock
+import io
+
+from services.extraction_cache import ExtractionCache
+
+
+@pytest.mark.unit
+class TestExtractionCache:
+    """Test the on-disk extraction cache."""
+
+    def test_roundtrip(self, tmp_path):
+        """Test that stored text is returned on a hit."""
+        cache = ExtractionCache(cache_dir=str(tmp_path), max_bytes=1024 * 1024)
+        key = cache.make_key(b"%PDF-1.4 data", ".pdf")
+
+        assert cache.get(key) is None
+        cache.put(key, "Extracted text")
+        assert cache.get(key) == "Extracted text"
+
+    def test_key_depends_on_content_and_type(self, tmp_path):
+        """Test that keys differ by content and file type."""
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+
+        assert cache.make_key(b"a", ".pdf") != cache.make_key(b"b", ".pdf")
+        assert cache.make_key(b"a", ".pdf") != cache.make_key(b"a", ".docx")
+        assert cache.make_key(b"a", ".pdf") == cache.make_key(b"a", ".PDF")
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry is evicted first."""
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+        keys = [cache.make_key(bytes([i]), ".pdf") for i in range(3)]
+        cache.put(keys[0], "a" * 100)
+        cache.max_bytes = cache.stats()["bytes"] * 2
+
+        cache.put(keys[1], "b" * 100)
+        cache.get(keys[0])  # Refresh the oldest entry
+        cache.put(keys[2], "c" * 100)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == "a" * 100
+        assert cache.get(keys[2]) == "c" * 100
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that entries survive a restart."""
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+        key = cache.make_key(b"docx bytes", ".docx")
+        cache.put(key, "Persisted")
+
+        reopened = ExtractionCache(cache_dir=str(tmp_path))
+        assert reopened.get(key) == "Persisted"
+        assert reopened.stats()["entries"] == 1
+
+    def test_stale_versions_purged(self, tmp_path):
+        """Test that entries from older extractor versions are dropped."""
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+        key = cache.make_key(b"content", ".pdf")
+        cache.put(key, "Old output")
+
+        reopened = ExtractionCache(cache_dir=str(tmp_path))
+        reopened.version = "old"
+        assert reopened.stats()["entries"] == 0
+        assert not list(tmp_path.glob("*.z"))
+
+    def test_cap_shared_between_instances(self, tmp_path):
+        """Test that workers sharing a directory share one size cap."""
+        first = ExtractionCache(cache_dir=str(tmp_path))
+        second = ExtractionCache(cache_dir=str(tmp_path))
+        keys = [first.make_key(bytes([i]), ".pdf") for i in range(3)]
+        first.put(keys[0], "a" * 100)
+        size = first.stats()["bytes"]
+        first.max_bytes = second.max_bytes = size * 2
+
+        second.put(keys[1], "b" * 100)
+        assert first.get(keys[1]) == "b" * 100
+        first.put(keys[2], "c" * 100)
+
+        assert second.stats()["bytes"] <= size * 2
+        assert second.get(keys[0]) is None
+        assert len(list(tmp_path.glob("*.z"))) == 2
+
+    def test_existing_entries_indexed(self, tmp_path):
+        """Test that entry files written without an index are adopted."""
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+        key = cache.make_key(b"content", ".pdf")
+        cache.put(key, "Kept")
+        (tmp_path / "index.db").unlink()
+        for leftover in tmp_path.glob("index.db-*"):
+            leftover.unlink()
+
+        reopened = ExtractionCache(cache_dir=str(tmp_path))
+        assert reopened.get(key) == "Kept"
+
+
+@pytest.mark.api
+class TestUploadCaching:
+    """Test that uploads are served from the extraction cache."""
+
+    def test_repeat_upload_skips_parsing(self, client, tmp_path):
+        """Test that the second upload of the same file is a cache hit."""
+        from main import rate_limiter
+        rate_limiter.reset()
+
+        cache = ExtractionCache(cache_dir=str(tmp_path))
+        extractor = AsyncMock(return_value="Parsed PDF text")
+        with patch('main.extraction_cache', cache), \
+                patch('main.process_document_content', extractor):
+            for _ in range(2):
+                response = client.post(
+                    "/api/upload",
+                    files={"file": (
+                        "doc.pdf", io.BytesIO(b"%PDF-1.4 body"),
+                        "application/pdf"
+                    )}
+                )
+                assert response.status_code == 200
+                assert response.json()["extracted_text"] == "Parsed PDF text"
+
+        assert extractor.await_count == 1
+        assert response.json()["cached"] is True
@@ -0,0 +1,22 @@
+"""Tests for inter-process lock files."""
+import pytest
+
+from services.file_lock import LOCKING_AVAILABLE, try_lock
+
+
+@pytest.mark.unit
+class TestTryLock:
+    """Test exclusive, non-blocking locks."""
+
+    def test_lock_is_exclusive(self, tmp_path):
+        assert LOCKING_AVAILABLE
+        path = str(tmp_path / "journal.lock")
+        held = try_lock(path)
+        assert held is not None
+        assert try_lock(path) is None
+
+        held.close()
+        again = try_lock(path)
+        assert again is not None
+        again.close()
+
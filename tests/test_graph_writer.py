@@ -0,0 +1,335 @@
+"""Tests for write-behind graph persistence."""
+import pytest
+import asyncio
+import json
+from unittest.mock import Mock, MagicMock, patch
+
+from services.graph_db import GraphService
+from services.graph_writer import GraphWriteBuffer
+
+
+class FakeGraphService:
+    """Records batches and fails while ``available`` is False."""
+
+    def __init__(self):
+        self.available = True
+        self.batches = []
+
+    def write_batch(self, ops):
+        if not self.available:
+            raise ConnectionError("Neo4j unavailable")
+        self.batches.append(list(ops))
+
+
+def _journal_ops(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def service():
+    return FakeGraphService()
+
+
+@pytest.fixture
+def writer(service, tmp_path):
+    return GraphWriteBuffer(
+        service,
+        journal_path=str(tmp_path / "journal.jsonl"),
+        batch_size=3,
+        flush_interval=0.01
+    )
+
+
+@pytest.mark.unit
+class TestGraphWriteBuffer:
+    """Test queuing, journaling and batched flushing."""
+
+    def test_enqueue_journals_writes(self, writer):
+        """Test that queued writes are journaled before flushing."""
+        writer.enqueue_case("case-1", "Case One")
+        writer.enqueue_document(
+            "case-1", "doc-1", "a.pdf", "Summary",
+            [{"name": " Acme Corp ", "type": "Organization"}, {"type": "X"}]
+        )
+
+        writer.sync_journal()
+        ops = _journal_ops(writer.journal_path)
+        assert [op["op"] for op in ops] == ["case", "document", "entity"]
+        assert ops[2]["key"] == "organization:acme"
+        assert ops[2]["alias"] == "Acme Corp"
+        assert writer.pending == 3
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_batches(self, writer, service):
+        """Test that flushing sends batches and empties the journal."""
+        writer.enqueue_case("case-1", "Case One")
+        writer.enqueue_document("case-1", "doc-1", None, "Summary", [
+            {"name": "John Doe", "type": "Person"},
+            {"name": "Acme Corp", "type": "Organization"},
+        ])
+
+        assert await writer.flush()
+        assert await writer.flush()
+
+        assert [len(batch) for batch in service.batches] == [3, 1]
+        assert writer.pending == 0
+        assert _journal_ops(writer.journal_path) == []
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_writes(self, writer, service):
+        """Test that writes are retained while Neo4j is unavailable."""
+        service.available = False
+        writer.enqueue_case("case-1", "Case One")
+
+        assert not await writer.flush()
+        assert writer.pending == 1
+        writer.sync_journal()
+        assert len(_journal_ops(writer.journal_path)) == 1
+
+    @pytest.mark.asyncio
+    async def test_partial_flush_appends_ack(self, writer, service):
+        """Test that flushed writes are acknowledged, not rewritten."""
+        for i in range(5):
+            writer.enqueue_case(f"case-{i}", f"Case {i}")
+        with patch('services.graph_writer.JOURNAL_COMPACT_OPS', 100):
+            assert await writer.flush()
+
+        ops = _journal_ops(writer.journal_path)
+        assert len(ops) == 6
+        assert ops[-1] == {"op": "ack", "count": 3}
+        assert [op["case_id"] for op in writer._read_journal(
+            writer.journal_path
+        )] == ["case-3", "case-4"]
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_sets_aside_oldest(self, writer, service):
+        """Test that an outage cannot grow the buffer without bound."""
+        writer.max_pending = 2
+        service.available = False
+        for i in range(4):
+            writer.enqueue_case(f"case-{i}", f"Case {i}")
+
+        assert not await writer.flush()
+        assert [op["case_id"] for op in writer._pending] == \
+            ["case-2", "case-3"]
+        dead = _journal_ops(writer.dead_letter_path)
+        assert [d["op"]["case_id"] for d in dead] == ["case-0", "case-1"]
+        assert [op["case_id"] for op in writer._read_journal(
+            writer.journal_path
+        )] == ["case-2", "case-3"]
+
+    @pytest.mark.asyncio
+    async def test_journal_replayed_on_start(self, writer, service, tmp_path):
+        """Test that journaled writes survive a restart."""
+        service.available = False
+        writer.enqueue_case("case-1", "Case One")
+        await writer.stop()
+
+        service.available = True
+        restarted = GraphWriteBuffer(
+            service, journal_path=writer.journal_base, flush_interval=0.01
+        )
+        await restarted.start()
+        for _ in range(100):
+            if not restarted.pending:
+                break
+            await asyncio.sleep(0.01)
+        await restarted.stop()
+
+        assert service.batches == [
+            [{"op": "case", "case_id": "case-1", "title": "Case One"}]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_size_trigger_wakes_flusher(self, writer, service):
+        """Test that reaching the batch size flushes without waiting."""
+        writer.flush_interval = 60
+        await writer.start()
+        writer.enqueue_document("case-1", "doc-1", None, "Summary", [
+            {"name": "A", "type": "Person"},
+            {"name": "B", "type": "Person"},
+        ])
+        for _ in range(100):
+            if service.batches:
+                break
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+        assert len(service.batches[0]) == 3
+
+    @pytest.mark.asyncio
+    async def test_workers_keep_separate_journals(self, service, tmp_path):
+        """Test that one worker's compaction keeps another's writes."""
+        base = str(tmp_path / "journal.jsonl")
+        first = GraphWriteBuffer(service, journal_path=base)
+        with patch('services.graph_writer.os.getpid', return_value=1):
+            second = GraphWriteBuffer(service, journal_path=base)
+        service.available = False
+        await first.start()
+        await second.start()
+        first.enqueue_case("case-1", "Case One")
+        second.enqueue_case("case-2", "Case Two")
+        second.sync_journal()
+
+        service.available = True
+        assert await first.flush()
+        assert _journal_ops(first.journal_path) == []
+        assert [op["case_id"] for op in _journal_ops(second.journal_path)] \
+            == ["case-2"]
+
+        # A worker starting up leaves a live worker's journal alone
+        with patch('services.graph_writer.os.getpid', return_value=2):
+            third = GraphWriteBuffer(service, journal_path=base)
+        await third.start()
+        assert third.pending == 0
+        await third.stop()
+        await first.stop()
+        await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_orphaned_journal_claimed_once(self, service, tmp_path):
+        """Test that a dead worker's writes are replayed by one survivor."""
+        base = str(tmp_path / "journal.jsonl")
+        with patch('services.graph_writer.os.getpid', return_value=1):
+            crashed = GraphWriteBuffer(service, journal_path=base)
+        crashed.enqueue_case("case-1", "Case One")
+        crashed.sync_journal()
+        crashed._lock_file.close()  # The process died
+
+        first = GraphWriteBuffer(service, journal_path=base)
+        with patch('services.graph_writer.os.getpid', return_value=2):
+            second = GraphWriteBuffer(service, journal_path=base)
+        service.available = False
+        await first.start()
+        await second.start()
+
+        assert first.pending + second.pending == 1
+        assert not (tmp_path / "journal.1.jsonl").exists()
+        service.available = True
+        await first.stop()
+        await second.stop()
+        assert service.batches == [
+            [{"op": "case", "case_id": "case-1", "title": "Case One"}]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_no_claims_without_file_locks(self, service, tmp_path):
+        """Test that journals are left alone where nothing can be locked."""
+        base = str(tmp_path / "journal.jsonl")
+        (tmp_path / "journal.1.jsonl").write_text(
+            json.dumps({"op": "case", "case_id": "c", "title": "C"}) + "\n"
+        )
+        writer = GraphWriteBuffer(service, journal_path=base)
+        with patch('services.graph_writer.LOCKING_AVAILABLE', False):
+            await writer.start()
+        assert writer.pending == 0
+        assert (tmp_path / "journal.1.jsonl").exists()
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_poison_write_set_aside(self, service, writer):
+        """Test that an op that always fails does not block the queue."""
+        write_batch = service.write_batch
+
+        def failing(ops):
+            if any(op.get("title") == "bad" for op in ops):
+                raise ValueError("Invalid input")
+            write_batch(ops)
+
+        service.write_batch = failing
+        writer.enqueue_case("case-1", "bad")
+        writer.enqueue_case("case-2", "Case Two")
+
+        with patch('services.graph_writer.MAX_BATCH_ATTEMPTS', 2):
+            assert not await writer.flush()
+            assert await writer.flush()
+
+        assert writer.pending == 0
+        assert service.batches == [
+            [{"op": "case", "case_id": "case-2", "title": "Case Two"}]
+        ]
+        dead = _journal_ops(writer.dead_letter_path)
+        assert dead[0]["op"]["title"] == "bad"
+        assert "Invalid input" in dead[0]["error"]
+
+
+@pytest.mark.unit
+class TestGraphServiceWriteBatch:
+    """Test the batched Neo4j transaction."""
+
+    def test_write_batch_groups_ops(self):
+        """Test that writes are grouped into one transaction."""
+        graph = GraphService()
+        graph.driver = MagicMock()
+        session = graph.driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        session.execute_write.side_effect = (
+            lambda fn, *args: fn(tx, *args)
+        )
+
+        graph.write_batch([
+            {"op": "entity", "doc_id": "d", "key": "a", "name": "A",
+             "alias": "A", "entity_type": "P"},
+            {"op": "case", "case_id": "c", "title": "C"},
+        ])
+
+        session.execute_write.assert_called_once()
+        queries = [call.args[0] for call in tx.run.call_args_list]
+        assert "Case" in queries[0] and "Entity" in queries[1]
+
+    @pytest.mark.parametrize("created, bumped", [(0, False), (1, True)])
+    def test_case_list_bumped_only_for_new_cases(self, created, bumped):
+        """Test that re-merging an existing case keeps the list's ETag."""
+        graph = GraphService()
+        graph.driver = MagicMock()
+        session = graph.driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value.consume.return_value.counters.nodes_created = (
+            created
+        )
+        session.execute_write.side_effect = (
+            lambda fn, *args: fn(tx, *args)
+        )
+
+        with patch('services.graph_db.case_list_cache') as cache:
+            graph.write_batch([{"op": "case", "case_id": "c", "title": "C"}])
+        assert cache.bump.called is bumped
+
+    def test_write_batch_raises_when_disconnected(self):
+        """Test that an unreachable Neo4j raises so the batch is retried."""
+        graph = GraphService()
+        with patch.object(graph, 'connect'):
+            with pytest.raises(Exception):
+                graph.write_batch([{"op": "case", "case_id": "c"}])
+
+
+@pytest.mark.api
+class TestAnalyzeQueuesGraphWrites:
+    """Test that analysis queues its graph writes."""
+
+    @patch('main.collection', None)
+    @patch('main.llm')
+    def test_analyze_enqueues_document(self, mock_llm, client):
+        """Test that analysis with a case_id queues case, document and entities."""
+        from main import rate_limiter
+        rate_limiter.reset()
+        mock_llm.invoke.return_value = '''{
+            "summary": "Contract dispute",
+            "key_points": [],
+            "entities": [{"name": "Acme Corp", "type": "Organization"}]
+        }'''
+
+        with patch('main.graph_writer') as mock_writer:
+            response = client.post(
+                "/api/analyze",
+                json={"text": "Document", "case_id": "case-9",
+                      "filename": "complaint.pdf"}
+            )
+
+        assert response.status_code == 200
+        mock_writer.enqueue_case.assert_called_once_with("case-9", "case-9")
+        args = mock_writer.enqueue_document.call_args.args
+        assert args[0] == "case-9"
+        assert args[1].startswith("case-9_")
+        assert args[2:4] == ("complaint.pdf", "Contract dispute")
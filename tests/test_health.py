@@ -0,0 +1,152 @@
+"""Tests for background dependency probing and /health."""
+import asyncio
+import pytest
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from services.health import HealthProber, check_ollama, ollama_base_url
+
+
+@pytest.mark.unit
+class TestHealthProber:
+    """Test probe results and the cached snapshot."""
+
+    @pytest.mark.asyncio
+    async def test_probe_results(self):
+        prober = HealthProber(timeout=0.1)
+        prober.register("good", lambda: {"documents": 3})
+        prober.register("bad", Mock(side_effect=ConnectionError("bolt://x")))
+        prober.register("slow", lambda: time.sleep(0.5))
+        assert prober.snapshot() == {}
+
+        snapshot = await prober.probe_all()
+        assert snapshot["good"]["ok"] is True
+        assert snapshot["good"]["documents"] == 3
+        assert snapshot["bad"] == {
+            "ok": False, "error": "unavailable",
+            "latency_ms": snapshot["bad"]["latency_ms"],
+            "checked_at": snapshot["bad"]["checked_at"]
+        }
+        assert snapshot["slow"]["error"] == "timeout"
+        assert prober.snapshot() is snapshot
+
+    @pytest.mark.asyncio
+    async def test_hung_check_not_restarted(self):
+        release = threading.Event()
+        calls = []
+
+        def hang():
+            calls.append(1)
+            release.wait(5)
+            return {}
+
+        prober = HealthProber(timeout=0.05)
+        prober.register("hung", hang)
+        try:
+            for _ in range(3):
+                snapshot = await prober.probe_all()
+                assert snapshot["hung"]["error"] == "timeout"
+            assert len(calls) == 1
+        finally:
+            release.set()
+        await asyncio.sleep(0.05)
+        assert (await prober.probe_all())["hung"]["ok"] is True
+        assert len(calls) == 2
+        await prober.stop()
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop(self):
+        prober = HealthProber(interval=60)
+        prober.register("good", lambda: {})
+        await prober.start()
+        for _ in range(50):
+            if prober.snapshot():
+                break
+            await asyncio.sleep(0.01)
+        await prober.stop()
+        assert prober.snapshot()["good"]["ok"] is True
+
+
+@pytest.mark.unit
+class TestOllamaCheck:
+    """Test the Ollama model probe."""
+
+    @pytest.fixture
+    def llm(self):
+        llm = Mock()
+        llm.model = "llama3.1:8b"
+        llm.base_url = None
+        return llm
+
+    def test_base_url(self, llm, monkeypatch):
+        monkeypatch.setenv("OLLAMA_HOST", "ollama:11434")
+        assert ollama_base_url(llm) == "http://ollama:11434"
+        llm.base_url = "http://gpu-box:11434/"
+        assert ollama_base_url(llm) == "http://gpu-box:11434"
+
+    def test_model_loaded(self, llm):
+        responses = {
+            "/api/tags": {"models": [{"name": "llama3.1:8b"}]},
+            "/api/ps": {"models": []},
+        }
+        with patch('services.health._get_json',
+                   side_effect=lambda url, timeout:
+                   responses[url[url.index("/api"):]]):
+            assert check_ollama(llm) == {
+                "model": "llama3.1:8b", "model_loaded": False
+            }
+
+    @pytest.mark.parametrize("name,found", [
+        ("llama3.1:8b", True),
+        ("llama3.1:8b-instruct", False),
+        ("llama3.1:70b", False),
+    ])
+    def test_model_name_match(self, llm, name, found):
+        with patch('services.health._get_json',
+                   return_value={"models": [{"name": name}]}):
+            if found:
+                assert check_ollama(llm)["model_loaded"] is True
+            else:
+                with pytest.raises(LookupError):
+                    check_ollama(llm)
+
+    def test_untagged_model_matches_latest(self, llm):
+        llm.model = "llama3.1"
+        with patch('services.health._get_json',
+                   return_value={"models": [{"name": "llama3.1:latest"}]}):
+            assert check_ollama(llm)["model_loaded"] is True
+
+    def test_model_missing(self, llm):
+        with patch('services.health._get_json',
+                   return_value={"models": [{"name": "other"}]}):
+            with pytest.raises(LookupError):
+                check_ollama(llm)
+
+
+@pytest.mark.api
+class TestHealthEndpoint:
+    """Test that /health reports the probed state."""
+
+    def test_reports_probe_results(self, client):
+        snapshot = {
+            "chromadb": {"ok": True, "latency_ms": 1.0, "checked_at": 0},
+            "ollama": {"ok": False, "error": "timeout", "latency_ms": 5000.0,
+                       "checked_at": 0},
+            "neo4j": {"ok": True, "latency_ms": 2.0, "checked_at": 0},
+        }
+        with patch('main.health_prober.snapshot', return_value=snapshot):
+            data = client.get("/health").json()
+        assert data["status"] == "degraded"
+        assert data["services"] == {
+            "chromadb": True, "ollama": False, "neo4j": True, "api": True
+        }
+        assert data["checks"]["ollama"]["error"] == "timeout"
+
+    def test_healthy_when_all_probes_pass(self, client):
+        snapshot = {
+            name: {"ok": True, "latency_ms": 1.0, "checked_at": 0}
+            for name in ("chromadb", "ollama", "neo4j")
+        }
+        with patch('main.health_prober.snapshot', return_value=snapshot):
+            assert client.get("/health").json()["status"] == "healthy"
@@ -0,0 +1,373 @@
+"""Tests for the priority-aware LLM scheduler."""
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import Mock, patch
+import asyncio
+import threading
+
+from services.llm_scheduler import (
+    LLMScheduler, LLMDeadlineExceeded, LLMOverloaded, ClientDisconnected,
+    INTERACTIVE, BATCH, ADMISSION_SLOS, cancel_on_disconnect, generation_fn
+)
+
+
+class FreeSlots:
+    """Server-wide slots that never block."""
+    max_concurrency = 1
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        yield
+
+
+class BusySlots:
+    """Server-wide slots all held by other workers."""
+    max_concurrency = 1
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        await asyncio.wait_for(asyncio.Event().wait(), timeout)
+        yield
+
+
+@pytest.fixture
+def scheduler():
+    return LLMScheduler(capacity=1, slots=FreeSlots())
+
+
+async def hold(scheduler, gate: threading.Event):
+    """Occupy the scheduler's only slot until ``gate`` is set."""
+    task = asyncio.create_task(
+        scheduler.run(gate.wait, flow="holder", deadline=5)
+    )
+    await asyncio.sleep(0.05)
+    return task
+
+
+@pytest.mark.unit
+class TestLLMScheduler:
+    """Test ordering, fairness and deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result(self, scheduler):
+        assert await scheduler.run(lambda x: x * 2, 21, flow="c1") == 42
+        assert scheduler.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_batch(self, scheduler):
+        """Test that queued interactive work jumps ahead of batch work."""
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        order = []
+
+        tasks = [
+            asyncio.create_task(scheduler.run(
+                order.append, name, flow=name, priority=priority
+            ))
+            for name, priority in (
+                ("batch-1", BATCH), ("batch-2", BATCH),
+                ("interactive", INTERACTIVE)
+            )
+        ]
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+        assert order[0] == "interactive"
+
+    @pytest.mark.asyncio
+    async def test_fair_between_flows(self, scheduler):
+        """Test that a flow with a backlog does not starve another."""
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        order = []
+
+        tasks = [
+            asyncio.create_task(scheduler.run(
+                order.append, "bulk", flow="bulk-case", priority=BATCH
+            ))
+            for _ in range(5)
+        ]
+        tasks.append(asyncio.create_task(scheduler.run(
+            order.append, "other", flow="other-case", priority=BATCH
+        )))
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+        assert order.index("other") <= 1
+
+    @pytest.mark.asyncio
+    async def test_deadline_drops_queued_work(self, scheduler):
+        """Test that work past its deadline is dropped, not run."""
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        ran = []
+
+        with pytest.raises(LLMDeadlineExceeded):
+            await scheduler.run(ran.append, 1, flow="c1", deadline=0.05)
+        gate.set()
+        await holder
+
+        assert ran == []
+        stats = scheduler.stats()
+        assert stats["dropped"][INTERACTIVE] == 1
+        assert stats["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_slot_wait(self):
+        """Test that waiting on other workers' slots is also bounded."""
+        scheduler = LLMScheduler(capacity=1, slots=BusySlots())
+        ran = []
+
+        with pytest.raises(LLMDeadlineExceeded):
+            await scheduler.run(ran.append, 1, flow="c1", deadline=0.05)
+
+        assert ran == []
+        stats = scheduler.stats()
+        assert stats["dropped"][INTERACTIVE] == 1
+        assert stats["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_queue(self, scheduler):
+        """Test that a cancelled request does not hold capacity."""
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        waiter = asyncio.create_task(scheduler.run(lambda: 1, flow="c1"))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queued"][INTERACTIVE] == 1
+
+        waiter.cancel()
+        gate.set()
+        await holder
+        assert await scheduler.run(lambda: 2, flow="c2") == 2
+        assert scheduler.stats()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self, scheduler):
+        with pytest.raises(ValueError):
+            await scheduler.run(lambda: 1, flow="c1", priority="urgent")
+
+    def test_stats_shape(self, scheduler):
+        stats = scheduler.stats()
+        assert stats["capacity"] == 1
+        assert set(stats["queued"]) == {INTERACTIVE, BATCH}
+        assert stats["wait_seconds"][BATCH]["samples"] == 0
+
+
+@pytest.mark.unit
+class TestAdmission:
+    """Test load shedding on predicted queue wait."""
+
+    @pytest.mark.asyncio
+    async def test_admits_without_history(self, scheduler):
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        assert scheduler.admit(INTERACTIVE) == 0.0
+        gate.set()
+        await holder
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_wait_exceeds_slo(self, scheduler):
+        """Test that a long queue is refused with a retry hint."""
+        await scheduler.run(lambda: 1, flow="warmup", cost=1)
+        scheduler._service_time = 1.0  # one second per unit of cost
+
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        waiters = [
+            asyncio.create_task(scheduler.run(lambda: 1, flow=f"c{i}",
+                                              cost=10))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        # 30 queued + half of the running request's cost, one at a time
+        assert scheduler.predicted_wait(INTERACTIVE) == 30.5
+
+        with patch.dict(ADMISSION_SLOS, {INTERACTIVE: 20}):
+            with pytest.raises(LLMOverloaded) as excinfo:
+                scheduler.admit(INTERACTIVE)
+        assert excinfo.value.retry_after == 11
+        assert scheduler.stats()["shed"][INTERACTIVE] == 1
+
+        gate.set()
+        await holder
+        await asyncio.gather(*waiters)
+        assert scheduler.admit(INTERACTIVE) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_batch_backlog_ignored_by_interactive(self, scheduler):
+        scheduler._service_time = 1.0
+        gate = threading.Event()
+        holder = await hold(scheduler, gate)
+        waiter = asyncio.create_task(scheduler.run(
+            lambda: 1, flow="bulk", priority=BATCH, cost=100
+        ))
+        await asyncio.sleep(0.01)
+        assert scheduler.predicted_wait(INTERACTIVE) == 0.5
+        assert scheduler.predicted_wait(BATCH) == 100.5
+
+        gate.set()
+        await asyncio.gather(holder, waiter)
+
+
+class FakeRequest:
+    """Request whose client disconnects after ``polls`` checks."""
+
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+@pytest.mark.unit
+class TestCancellation:
+    """Test aborting generations for disconnected clients."""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_async_generation(self, scheduler):
+        """Test that a disconnect aborts the generation and frees the slot."""
+        aborted = asyncio.Event()
+
+        async def generate(prompt):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                aborted.set()
+                raise
+
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(
+                FakeRequest(polls=1),
+                scheduler.run(generate, "prompt", flow="c1"),
+                poll_interval=0.01
+            )
+        assert aborted.is_set()
+
+        stats = scheduler.stats()
+        assert stats["running"] == 0
+        assert stats["cancelled"]["running"] == 1
+        assert stats["cancelled_generation_seconds"] > 0
+        assert await scheduler.run(lambda: "next", flow="c2") == "next"
+
+    @pytest.mark.asyncio
+    async def test_disconnect_during_slot_wait_counted_queued(self):
+        """Test that leaving while waiting on another worker is queued."""
+        scheduler = LLMScheduler(capacity=1, slots=BusySlots())
+        generate = Mock()
+
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(
+                FakeRequest(polls=1),
+                scheduler.run(generate, "prompt", flow="c1"),
+                poll_interval=0.01
+            )
+
+        generate.assert_not_called()
+        stats = scheduler.stats()
+        assert stats["cancelled"] == {"queued": 1, "running": 0}
+        assert stats["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_saved_seconds_estimated(self, scheduler):
+        """Test that saved time is estimated from completed generations."""
+        async def quick(prompt):
+            await asyncio.sleep(0.1)
+
+        await scheduler.run(quick, "p", flow="c1")
+        task = asyncio.create_task(scheduler.run(quick, "p", flow="c1"))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.stats()["saved_generation_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_thread_keeps_slot(self, scheduler):
+        """Test that an uninterruptible call holds its slot until it ends."""
+        gate = threading.Event()
+        task = asyncio.create_task(scheduler.run(gate.wait, flow="c1"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["running"] == 1
+
+        gate.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.stats()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_connected_client_gets_result(self):
+        async def work():
+            await asyncio.sleep(0.03)
+            return "done"
+
+        result = await cancel_on_disconnect(
+            FakeRequest(polls=100), work(), poll_interval=0.01
+        )
+        assert result == "done"
+
+    def test_generation_fn_prefers_async(self):
+        class AsyncModel:
+            def invoke(self, prompt):
+                return prompt
+
+            async def ainvoke(self, prompt):
+                return prompt
+
+        model = AsyncModel()
+        assert generation_fn(model) == model.ainvoke
+
+        sync_model = Mock()
+        assert generation_fn(sync_model) is sync_model.invoke
+
+
+@pytest.mark.api
+class TestAnalyzeScheduling:
+    """Test scheduler integration in the API."""
+
+    def test_llm_stats_endpoint(self, client):
+        response = client.get("/api/llm/stats")
+        assert response.status_code == 200
+        assert "queued" in response.json()
+
+    @patch('main.llm')
+    def test_deadline_returns_503(self, mock_llm, client):
+        """Test that a dropped request is reported as busy."""
+        from main import rate_limiter
+        rate_limiter.reset()
+        with patch('main.llm_scheduler.run',
+                   side_effect=LLMDeadlineExceeded("waited too long")):
+            response = client.post(
+                "/api/analyze", json={"text": "Test legal document"}
+            )
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+    @patch('main.llm')
+    def test_overload_rejected_early(self, mock_llm, client):
+        """Test that shed requests get 503 before any LLM work."""
+        from main import rate_limiter
+        rate_limiter.reset()
+        with patch('main.llm_scheduler.admit',
+                   side_effect=LLMOverloaded("queue full", 12)):
+            response = client.post(
+                "/api/analyze", json={"text": "Test legal document"}
+            )
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "12"
+            mock_llm.invoke.assert_not_called()
+
+            # Fast analysis needs no LLM and is still admitted
+            response = client.post("/api/analyze", json={
+                "text": "Test legal document", "mode": "fast"
+            })
+            assert response.status_code == 200
+
+    def test_invalid_priority_rejected(self, client):
+        response = client.post(
+            "/api/analyze",
+            json={"text": "Test legal document", "priority": "urgent"}
+        )
+        assert response.status_code == 422
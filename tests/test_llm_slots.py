@@ -0,0 +1,103 @@
+"""Tests for the cross-process LLM concurrency slots."""
+import pytest
+from unittest.mock import patch
+import asyncio
+
+from services.llm_slots import LLMSlots
+
+
+@pytest.fixture
+def slots(tmp_path):
+    return LLMSlots(db_path=str(tmp_path / "slots.db"), max_concurrency=2)
+
+
+@pytest.mark.unit
+class TestLLMSlots:
+    """Test lease accounting and draining."""
+
+    def test_capacity_shared_across_instances(self, slots):
+        """Test that two handles on one database share the budget."""
+        other = LLMSlots(db_path=slots.db_path, max_concurrency=2)
+        first = slots.try_acquire()
+        second = other.try_acquire()
+        assert first and second
+        assert slots.try_acquire() is None
+
+        other.release(second)
+        assert slots.try_acquire() is not None
+
+    def test_expired_lease_reclaimed(self, slots):
+        """Test that leases from a dead worker expire."""
+        with patch('services.llm_slots.time.time', return_value=1000.0):
+            slots.try_acquire()
+            slots.try_acquire()
+        at = 1000.0 + slots.lease_seconds + 1
+        with patch('services.llm_slots.time.time', return_value=at):
+            assert slots.try_acquire() is not None
+
+    @pytest.mark.asyncio
+    async def test_slot_limits_concurrency(self, slots):
+        """Test that no more than max_concurrency blocks run at once."""
+        running = 0
+        peak = 0
+
+        async def generate():
+            nonlocal running, peak
+            async with slots.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.05)
+                running -= 1
+
+        await asyncio.gather(*(generate() for _ in range(5)))
+        assert peak == 2
+        assert slots.active == 0
+        assert slots.try_acquire() is not None
+
+    @pytest.mark.asyncio
+    async def test_slot_wait_times_out(self, slots):
+        """Test that a bounded wait gives up while every slot is held."""
+        slots.try_acquire()
+        slots.try_acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            async with slots.slot(timeout=0.1):
+                pass
+        assert slots.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_wait_leaks_no_lease(self, slots):
+        """Test that a slot taken as its waiter is cancelled is returned."""
+        async def enter():
+            async with slots.slot():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(enter())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.1)
+        assert slots.try_acquire() and slots.try_acquire()
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_in_flight(self, slots):
+        """Test that drain returns once held slots are released."""
+        release = asyncio.Event()
+
+        async def generate():
+            async with slots.slot():
+                await release.wait()
+
+        task = asyncio.create_task(generate())
+        await asyncio.sleep(0.05)
+        assert slots.active == 1
+        assert await slots.drain(timeout=0.05) is False
+
+        release.set()
+        assert await slots.drain(timeout=1) is True
+        await task
+
+    @pytest.mark.asyncio
+    async def test_drain_idle(self, slots):
+        """Test that drain returns immediately with nothing in flight."""
+        assert await slots.drain(timeout=0) is True
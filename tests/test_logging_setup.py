@@ -0,0 +1,109 @@
+"""Tests for the queued, structured logging pipeline."""
+import io
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from unittest.mock import patch
+
+from services.logging_setup import (
+    DedupFilter, JsonFormatter, _QueueHandler, request_id_var
+)
+
+
+def make_record(msg="Potentially dangerous content", level=logging.WARNING,
+                **extra):
+    record = logging.LogRecord("main", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.mark.unit
+class TestDedupFilter:
+    """Test that bursts of identical warnings are collapsed."""
+
+    def test_burst_suppressed_then_counted(self):
+        dedup = DedupFilter(window=10)
+        with patch('services.logging_setup.time.monotonic', return_value=0):
+            results = [dedup.filter(make_record()) for _ in range(5)]
+        assert results == [True, False, False, False, False]
+
+        with patch('services.logging_setup.time.monotonic', return_value=11):
+            record = make_record()
+            assert dedup.filter(record)
+        assert record.suppressed == 4
+
+    def test_other_messages_and_info_pass(self):
+        dedup = DedupFilter(window=10)
+        assert dedup.filter(make_record("a"))
+        assert dedup.filter(make_record("b"))
+        assert all(
+            dedup.filter(make_record("a", logging.INFO)) for _ in range(3)
+        )
+
+
+@pytest.mark.unit
+class TestStructuredRecords:
+    """Test JSON output through the queue handler."""
+
+    def test_extras_and_traceback_survive_the_queue(self):
+        handler = _QueueHandler(queue.Queue())
+        try:
+            raise ValueError("bad page")
+        except ValueError:
+            record = logging.LogRecord(
+                "main", logging.ERROR, __file__, 1, "Upload error: %s",
+                ("bad page",), sys.exc_info()
+            )
+        record.request_id = "req-1"
+        record.stages_ms = {"extraction": 12.5}
+        handler.emit(record)
+
+        line = JsonFormatter().format(handler.queue.get_nowait())
+        body = json.loads(line)
+        assert body["message"] == "Upload error: bad page"
+        assert body["level"] == "ERROR"
+        assert body["request_id"] == "req-1"
+        assert body["stages_ms"] == {"extraction": 12.5}
+        assert "ValueError: bad page" in body["exc"]
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = _QueueHandler(queue.Queue(1))
+        handler.emit(make_record("first"))
+        handler.emit(make_record("second"))
+        assert handler.queue.qsize() == 1
+
+
+@pytest.mark.api
+class TestRequestLogging:
+    """Test request ids and the per-request log record."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self):
+        from main import rate_limiter
+        rate_limiter.reset()
+
+    def test_request_id_echoed_and_logged(self, client, caplog):
+        with caplog.at_level(logging.INFO, logger="casestar.requests"):
+            response = client.post(
+                "/api/upload",
+                files={"file": ("brief.txt", io.BytesIO(b"Rent is due."),
+                                "text/plain")},
+                headers={"X-Request-ID": "upload-42"}
+            )
+        assert response.headers["x-request-id"] == "upload-42"
+        record = next(
+            r for r in caplog.records if r.name == "casestar.requests"
+        )
+        assert record.request_id == "upload-42"
+        assert record.status == 200
+        assert record.path == "/api/upload"
+        assert {"extraction", "store"} <= set(record.stages_ms)
+        assert request_id_var.get() == "-"
+
+    def test_malformed_request_id_replaced(self, client):
+        response = client.get("/", headers={"X-Request-ID": "a b\tc"})
+        assert response.headers["x-request-id"] != "a b\tc"
+        assert len(response.headers["x-request-id"]) == 32
@@ -0,0 +1,137 @@
+"""Tests for opt-in request profiling."""
+import asyncio
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import profiling
+from services.profiling import Profile, run_in_thread, span
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return "done"
+
+
+async def profiled(coroutine_fn, interval=0.001):
+    profile = Profile("test", interval=interval)
+    token = profiling._current.set(profile)
+    profile.start()
+    try:
+        await coroutine_fn()
+    finally:
+        profile.stop()
+        profiling._current.reset(token)
+    return profile
+
+
+@pytest.mark.unit
+class TestProfile:
+    """Test spans, stack samples and the written files."""
+
+    def test_span_is_free_when_off(self):
+        assert span("llm") is span("chroma")
+
+    def test_frame_name_without_qualname(self):
+        # Python 3.10 code objects have no co_qualname
+        code = SimpleNamespace(
+            co_name="analyze", co_filename="/app/main.py", co_firstlineno=7
+        )
+        frame = SimpleNamespace(f_code=code)
+        assert profiling._frame_name(frame) == "analyze (main.py:7)"
+
+    @pytest.mark.asyncio
+    async def test_worker_threads_sampled_under_their_span(self):
+        async def work():
+            with span("outer"):
+                assert await run_in_thread("extraction", busy, 0.1) == "done"
+
+        profile = await profiled(work)
+        stacks = [s for s in profile.samples if "busy" in s]
+        assert stacks
+        assert all(s.startswith("[outer];[extraction];") for s in stacks)
+        assert [s["name"] for s in profile.spans] == ["extraction", "outer"]
+
+    @pytest.mark.asyncio
+    async def test_other_tasks_on_the_loop_not_sampled(self):
+        async def neighbour():
+            await asyncio.sleep(0)
+            busy(0.1)
+
+        async def work():
+            other = asyncio.create_task(neighbour())
+            with span("waiting"):
+                await asyncio.sleep(0.01)
+            await other
+
+        profile = await profiled(work)
+        assert not any("neighbour" in s for s in profile.samples)
+
+    @pytest.mark.asyncio
+    async def test_write(self, tmp_path):
+        async def work():
+            with span("chroma"):
+                busy(0.05)
+
+        profile = await profiled(work)
+        base = profile.write(str(tmp_path))
+        with open(base + ".folded") as f:
+            lines = f.read().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+        with open(base + ".trace.json") as f:
+            trace = json.load(f)
+        assert trace["traceEvents"][0]["name"] == "chroma"
+        assert trace["traceEvents"][0]["dur"] >= 50000
+        assert "chroma" in trace["metadata"]["stages_ms"]
+
+
+@pytest.mark.api
+class TestProfilingMiddleware:
+    """Test which requests get profiled."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self):
+        from main import rate_limiter
+        rate_limiter.reset()
+
+    def upload(self, client, headers):
+        return client.post(
+            "/api/upload",
+            files={"file": ("brief.txt", io.BytesIO(b"Rent is due."),
+                            "text/plain")},
+            headers=headers
+        )
+
+    def test_admin_header_profiles_request(self, client, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = self.upload(client, {
+            "X-Profile": "1", "Authorization": "Bearer secret"
+        })
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        written = [f for f in os.listdir(profiling.PROFILE_DIR)
+                   if profile_id in f]
+        assert sorted(f.rsplit(".", 1)[-1] for f in written) == [
+            "folded", "json"
+        ]
+        trace = next(f for f in written if f.endswith(".trace.json"))
+        with open(os.path.join(profiling.PROFILE_DIR, trace)) as f:
+            stages = json.load(f)["metadata"]["stages_ms"]
+        assert {"sanitization", "extraction", "store"} <= set(stages)
+
+    def test_header_ignored_without_token(self, client, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = self.upload(client, {
+            "X-Profile": "1", "Authorization": "Bearer wrong"
+        })
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
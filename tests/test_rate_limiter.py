@@ -0,0 +1,202 @@
+"""Tests for the shared, cost-weighted rate limiter."""
+import pytest
+from unittest.mock import patch
+import io
+import sqlite3
+
+from services.rate_limiter import RateLimitMiddleware, SharedRateLimiter
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return SharedRateLimiter(db_path=str(tmp_path / "limits.db"))
+
+
+@pytest.mark.unit
+class TestSharedRateLimiter:
+    """Test token-bucket accounting."""
+
+    def test_capacity_then_reject(self, limiter):
+        """Test that hits beyond capacity are rejected with a wait time."""
+        for _ in range(3):
+            assert limiter.hit("client", capacity=3, period=60) == 0
+        retry_after = limiter.hit("client", capacity=3, period=60)
+        assert 0 < retry_after <= 20
+
+    def test_cost_weighting(self, limiter):
+        """Test that expensive requests spend more tokens."""
+        assert limiter.hit("client", capacity=10, period=60, cost=8) == 0
+        assert limiter.hit("client", capacity=10, period=60, cost=3) > 0
+        assert limiter.hit("client", capacity=10, period=60, cost=2) == 0
+
+    def test_oversized_cost_drains_bucket(self, limiter):
+        """Test that a cost above capacity is clamped, not rejected forever."""
+        assert limiter.hit("client", capacity=5, period=60, cost=50) == 0
+        assert limiter.hit("client", capacity=5, period=60) > 0
+
+    def test_refill_over_time(self, limiter):
+        """Test that tokens refill at capacity/period."""
+        with patch('services.rate_limiter.time.time', return_value=1000.0):
+            limiter.hit("client", capacity=2, period=10, cost=2)
+        with patch('services.rate_limiter.time.time', return_value=1005.0):
+            assert limiter.hit("client", capacity=2, period=10) == 0
+            assert limiter.hit("client", capacity=2, period=10) > 0
+
+    def test_shared_between_instances(self, limiter):
+        """Test that separate limiter instances (workers) share buckets."""
+        other_worker = SharedRateLimiter(db_path=limiter.db_path)
+        limiter.hit("client", capacity=2, period=60, cost=2)
+        assert other_worker.hit("client", capacity=2, period=60) > 0
+
+    def test_keys_are_independent(self, limiter):
+        """Test that buckets are per key."""
+        limiter.hit("a", capacity=1, period=60)
+        assert limiter.hit("b", capacity=1, period=60) == 0
+
+    def test_locked_database_fails_open(self, limiter):
+        """Test that a locked database allows the hit instead of raising."""
+        other_worker = sqlite3.connect(limiter.db_path, isolation_level=None)
+        limiter.hit("client", capacity=1, period=60)
+        other_worker.execute("BEGIN IMMEDIATE")
+        try:
+            with patch.object(limiter, '_connection') as connection:
+                connection.return_value = sqlite3.connect(
+                    limiter.db_path, timeout=0, isolation_level=None
+                )
+                assert limiter.hit("client", capacity=1, period=60) == 0
+        finally:
+            other_worker.execute("ROLLBACK")
+            other_worker.close()
+
+
+@pytest.mark.unit
+class TestRateLimitMiddleware:
+    """Test charging requests before their body is read."""
+
+    @pytest.mark.asyncio
+    async def test_rejects_before_reading_body(self):
+        """Test that a refused request never has its body received."""
+        from fastapi import HTTPException
+
+        async def charge(request, size):
+            assert size == 1234
+            raise HTTPException(
+                status_code=429, detail="slow down",
+                headers={"Retry-After": "7"}
+            )
+
+        async def app(scope, receive, send):
+            raise AssertionError("endpoint reached")
+
+        async def receive():
+            raise AssertionError("body read")
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = RateLimitMiddleware(app, {"/api/upload": charge})
+        await middleware({
+            "type": "http", "method": "POST", "path": "/api/upload",
+            "headers": [(b"content-length", b"1234")],
+        }, receive, send)
+
+        assert sent[0]["status"] == 429
+        assert (b"retry-after", b"7") in sent[0]["headers"]
+        assert b"slow down" in sent[1]["body"]
+
+    @pytest.mark.asyncio
+    async def test_chunked_body_refused(self):
+        """Test that a body without a Content-Length is never read."""
+        async def charge(request, size):
+            raise AssertionError("charged")
+
+        async def app(scope, receive, send):
+            raise AssertionError("endpoint reached")
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = RateLimitMiddleware(app, {"/api/upload": charge})
+        await middleware({
+            "type": "http", "method": "POST", "path": "/api/upload",
+            "headers": [(b"transfer-encoding", b"chunked")],
+        }, None, send)
+        assert sent[0]["status"] == 411
+
+    @pytest.mark.asyncio
+    async def test_other_paths_pass_through(self):
+        """Test that unlisted paths are not charged."""
+        reached = []
+
+        async def charge(request, size):
+            raise AssertionError("charged")
+
+        async def app(scope, receive, send):
+            reached.append(scope["path"])
+
+        middleware = RateLimitMiddleware(app, {"/api/upload": charge})
+        await middleware({
+            "type": "http", "method": "POST", "path": "/api/search",
+            "headers": [],
+        }, None, None)
+        assert reached == ["/api/search"]
+
+
+@pytest.mark.api
+class TestRateLimitResponses:
+    """Test 429 responses from the API."""
+
+    def test_retry_after_header(self, client):
+        """Test that rejected uploads carry Retry-After."""
+        from main import rate_limiter
+        rate_limiter.reset()
+
+        responses = [
+            client.post(
+                "/api/upload",
+                files={"file": ("a.exe", io.BytesIO(b"x"), "text/plain")}
+            )
+            for _ in range(6)
+        ]
+        rate_limiter.reset()
+
+        assert [r.status_code for r in responses[:5]] == [400] * 5
+        assert responses[5].status_code == 429
+        assert int(responses[5].headers["retry-after"]) >= 1
+
+    def test_rate_limiting_disabled(self, client):
+        """Test that RATE_LIMITING=0 lets every request through."""
+        from main import rate_limiter
+        rate_limiter.reset()
+
+        with patch('main.RATE_LIMITING', False):
+            responses = [
+                client.post(
+                    "/api/upload",
+                    files={"file": ("a.exe", io.BytesIO(b"x"), "text/plain")}
+                )
+                for _ in range(8)
+            ]
+        rate_limiter.reset()
+
+        assert [r.status_code for r in responses] == [400] * 8
+
+    def test_analyze_charged_before_document_lookup(self, client):
+        """Test that unknown document ids still spend tokens."""
+        from main import rate_limiter
+        rate_limiter.reset()
+
+        with patch('main.document_store.meta', return_value=None) as meta:
+            responses = [
+                client.post("/api/analyze", json={"document_id": "nope"})
+                for _ in range(11)
+            ]
+        rate_limiter.reset()
+
+        assert [r.status_code for r in responses[:10]] == [404] * 10
+        assert responses[10].status_code == 429
+        assert meta.call_count == 10
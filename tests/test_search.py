@@ -0,0 +1,159 @@
+"""Tests for search snippets and result trimming."""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from services.search import make_snippet, mmr_select, query_terms
+
+
+def highlighted(snippet):
+    return [snippet["text"][s:e] for s, e in snippet["highlights"]]
+
+
+@pytest.mark.unit
+class TestSnippets:
+    """Test snippet windows and highlight offsets."""
+
+    def test_query_terms(self):
+        assert query_terms("The breach of the Lease, lease!") == [
+            "breach", "lease"
+        ]
+
+    def test_short_text_returned_whole(self):
+        snippet = make_snippet("Rent is due monthly.", "rent")
+        assert snippet["text"] == "Rent is due monthly."
+        assert highlighted(snippet) == ["Rent"]
+
+    def test_window_around_densest_matches(self):
+        text = ("Filler sentence. " * 300 + "Rent was withheld. "
+                + "Filler sentence. " * 300
+                + "The tenant withheld rent after the landlord refused "
+                + "repairs. " + "Filler sentence. " * 300)
+        snippet = make_snippet(text, "tenant rent landlord", 120)
+        assert len(snippet["text"]) <= 120
+        assert snippet["text"] == text[snippet["start"]:snippet["end"]]
+        assert highlighted(snippet) == ["tenant", "rent", "landlord"]
+        assert not snippet["text"][0].isspace()
+
+    def test_prefix_matches(self):
+        snippet = make_snippet("The contractors terminated it.", "contract")
+        assert highlighted(snippet) == ["contractors"]
+
+    def test_no_match_returns_opening(self):
+        text = "Opening words of the document. " * 100
+        snippet = make_snippet(text, "zebra", 50)
+        assert snippet["start"] == 0
+        assert text.startswith(snippet["text"])
+        assert snippet["highlights"] == []
+
+
+@pytest.mark.unit
+class TestMMR:
+    """Test maximal marginal relevance re-ranking."""
+
+    # Two near-copies of the best match and one distinct, relevant passage
+    CANDIDATES = [[1.0, 0.0, 0.0], [0.99, 0.01, 0.0], [0.98, 0.02, 0.0],
+                  [0.6, 0.0, 0.8]]
+    QUERY = [1.0, 0.0, 0.5]
+
+    def test_near_duplicates_pushed_down(self):
+        assert mmr_select(self.QUERY, self.CANDIDATES, 2, 0.5) == [0, 3]
+
+    def test_lambda_one_is_relevance_order(self):
+        candidates = np.array(self.CANDIDATES)
+        relevance = candidates @ self.QUERY / np.linalg.norm(
+            candidates, axis=1
+        )
+        assert mmr_select(self.QUERY, self.CANDIDATES, 4, 1.0) == list(
+            np.argsort(-relevance)
+        )
+
+    def test_few_hundred_candidates_fast(self):
+        rng = np.random.default_rng(0)
+        candidates = rng.normal(size=(300, 384)).astype(np.float32)
+        started = time.perf_counter()
+        assert len(mmr_select(candidates[0], candidates, 20)) == 20
+        # Generous bound; typically a few milliseconds
+        assert time.perf_counter() - started < 0.5
+
+    def test_k_larger_than_candidates(self):
+        assert sorted(mmr_select(self.QUERY, self.CANDIDATES, 10)) == [
+            0, 1, 2, 3
+        ]
+        assert mmr_select(self.QUERY, [], 3) == []
+
+
+@pytest.mark.api
+class TestSearchSnippets:
+    """Test that /api/search returns bounded snippets."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limits(self):
+        from main import rate_limiter
+        rate_limiter.reset()
+
+    @patch('main.collection')
+    def test_results_trimmed(self, mock_collection, client):
+        document = "Filler text. " * 10000 + "Breach of the lease." + \
+            " More filler." * 10000
+        mock_collection.query.return_value = {
+            'ids': [['case-1_abc']],
+            'documents': [[document]],
+            'metadatas': [[{'case_id': 'case-1', 'document_id': 'd' * 32}]],
+            'distances': [[0.2]]
+        }
+        response = client.post(
+            "/api/search", json={"query": "lease breach", "max_chars": 80}
+        )
+        assert response.status_code == 200
+        hit = response.json()["results"][0]
+        assert len(hit["text"]) <= 80
+        assert "Breach of the lease." in hit["text"]
+        assert hit["chars"] == len(document)
+        assert hit["id"] == "case-1_abc"
+        assert hit["document_id"] == "d" * 32
+        assert document[hit["start"]:hit["end"]] == hit["text"]
+
+    @patch('main.collection')
+    def test_query_runs_off_event_loop(self, mock_collection, client):
+        """Test that embedding the query never blocks the event loop."""
+        def query(**kwargs):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return {'ids': [[]], 'documents': [[]], 'metadatas': [[]],
+                    'distances': [[]]}
+
+        mock_collection.query.side_effect = query
+        response = client.post("/api/search", json={"query": "lease"})
+        assert response.status_code == 200
+        mock_collection.query.assert_called_once()
+
+    def test_max_chars_bounds(self, client):
+        response = client.post(
+            "/api/search", json={"query": "lease", "max_chars": 100000}
+        )
+        assert response.status_code == 422
+
+    @patch('main.embedding_function')
+    @patch('main.collection')
+    def test_diverse_search(self, mock_collection, mock_embed, client):
+        """Test that diverse mode over-fetches and re-ranks by MMR."""
+        mock_embed.return_value = [TestMMR.QUERY]
+        mock_collection.query.return_value = {
+            'ids': [['a', 'b', 'c', 'd']],
+            'documents': [['A', 'B', 'C', 'D']],
+            'metadatas': [[{}, {}, {}, {}]],
+            'distances': [[0.1, 0.11, 0.12, 0.3]],
+            'embeddings': [TestMMR.CANDIDATES]
+        }
+        response = client.post("/api/search", json={
+            "query": "lease", "limit": 2, "diverse": True
+        })
+        assert response.status_code == 200
+        assert [r["id"] for r in response.json()["results"]] == ["a", "d"]
+        kwargs = mock_collection.query.call_args[1]
+        assert kwargs["n_results"] == 10
+        assert "embeddings" in kwargs["include"]
@@ -0,0 +1,51 @@
+"""Tests for the production launcher."""
+import os
+import runpy
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.unit
+class TestProductionDispatch:
+    """Test that the supervisor never sets up the app itself."""
+
+    def test_supervisor_never_opens_chroma(self):
+        """Test that --production dispatches before any client is made."""
+        with patch('services.server.run_production') as run_production, \
+                patch('chromadb.PersistentClient') as persistent, \
+                patch('chromadb.HttpClient') as http, \
+                patch.object(sys, 'argv', ['main.py', '--production']):
+            with pytest.raises(SystemExit):
+                runpy.run_path(
+                    os.path.join(ROOT, "main.py"), run_name="__main__"
+                )
+
+        run_production.assert_called_once_with(['--production'])
+        persistent.assert_not_called()
+        http.assert_not_called()
+
+    def test_launcher_does_not_import_app(self):
+        """Test that python -m services.server never loads main."""
+        result = subprocess.run(
+            [
+                sys.executable, "-c",
+                "import sys, services.server; "
+                "print('main' in sys.modules, 'chromadb' in sys.modules)"
+            ],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.split() == ["False", "False"]
+
+    def test_single_worker_without_file_locks(self):
+        """Test that workers are not multiplied where journals can't lock."""
+        with patch('services.server.LOCKING_AVAILABLE', False), \
+                patch('services.server.start_chroma_server'), \
+                patch('services.server.uvicorn.run') as run, \
+                patch.dict(os.environ, {"CHROMA_SERVER_HOST": "chroma"}):
+            from services.server import run_production
+            run_production(["--workers", "4"])
+        assert run.call_args.kwargs["workers"] == 1
@@ -0,0 +1,86 @@
+"""Tests for document text extraction."""
+import pytest
+import io
+from docx import Document
+
+from services.text_extractor import (
+    extract_document_content,
+    extract_text_from_docx,
+    extract_text_from_pdf,
+    _extract_docx_object_model,
+    _extract_docx_streaming,
+    ExtractionError,
+    UnsupportedDocxLayout
+)
+
+
+def _docx_bytes(doc) -> bytes:
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def contract_docx():
+    """A DOCX with a table between two paragraphs."""
+    doc = Document()
+    doc.add_heading('Services Agreement', 0)
+    doc.add_paragraph('Parties:\tAcme Corp and John Doe')
+    table = doc.add_table(rows=2, cols=3)
+    table.cell(0, 0).text = 'Item'
+    table.cell(0, 2).text = 'Fee'
+    table.cell(1, 0).text = 'Review\nDraft'
+    table.cell(1, 1).text = '   '
+    table.cell(1, 2).text = '$500'
+    doc.add_paragraph('Signed on January 1st, 2023.')
+    return doc
+
+
+@pytest.mark.unit
+class TestDocxExtraction:
+    """Test the streaming DOCX extractor."""
+
+    def test_document_order_preserved(self, contract_docx):
+        """Test that table rows stay between the surrounding paragraphs."""
+        text = extract_text_from_docx(_docx_bytes(contract_docx))
+
+        assert text.split("\n\n") == [
+            'Services Agreement',
+            'Parties:\tAcme Corp and John Doe',
+            'Item | Fee',
+            'Review\nDraft | $500',
+            'Signed on January 1st, 2023.',
+        ]
+
+    def test_same_blocks_as_python_docx(self, contract_docx):
+        """Test that streaming output has the same blocks as python-docx."""
+        content = _docx_bytes(contract_docx)
+
+        streamed = _extract_docx_streaming(content).split("\n\n")
+        legacy = _extract_docx_object_model(content).split("\n\n")
+        assert sorted(streamed) == sorted(legacy)
+
+    def test_merged_cells_fall_back(self, contract_docx):
+        """Test that merged cells are handled by python-docx."""
+        table = contract_docx.tables[0]
+        table.cell(0, 0).merge(table.cell(0, 1))
+        content = _docx_bytes(contract_docx)
+
+        with pytest.raises(UnsupportedDocxLayout):
+            _extract_docx_streaming(content)
+        assert extract_text_from_docx(content) == (
+            _extract_docx_object_model(content)
+        )
+
+    def test_invalid_docx_reports_error(self):
+        """Test that non-DOCX content raises rather than returning text."""
+        with pytest.raises(ExtractionError, match="DOCX"):
+            extract_text_from_docx(b"not a zip archive")
+
+    def test_invalid_pdf_reports_error(self):
+        with pytest.raises(ExtractionError, match="PDF"):
+            extract_text_from_pdf(b"not a pdf")
+
+    def test_text_that_reads_like_an_error_is_kept(self):
+        text = "Errors and Omissions Insurance Policy"
+        assert extract_document_content("policy.txt", text.encode()) == text
@@ -0,0 +1,161 @@
+"""Tests for deterministic timeline extraction and the date index."""
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+from services.timeline import TimelineIndex, extract_events
+
+
+def dates(text, **kwargs):
+    return [e["date"] for e in extract_events(text, **kwargs)]
+
+
+@pytest.mark.unit
+class TestExtractEvents:
+    """Test date recognition and event sentences."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("Signed on January 1st, 2023.", "2023-01-01"),
+        ("Signed on Jan. 5 2023.", "2023-01-05"),
+        ("Signed on Sept 30, 2021.", "2021-09-30"),
+        ("Signed this 5th day of June, 2023.", "2023-06-05"),
+        ("Signed on 12 March 2022.", "2022-03-12"),
+        ("Hearing set for 2023-09-01.", "2023-09-01"),
+        ("Delivered on 03/15/2023.", "2023-03-15"),
+        ("Delivered on 3/15/23.", "2023-03-15"),
+    ])
+    def test_absolute_formats(self, text, expected):
+        assert dates(text) == [expected]
+
+    def test_month_precision(self):
+        events = extract_events("The lease expires in March 2024.")
+        assert events[0]["date"] == "2024-03-01"
+        assert events[0]["precision"] == "month"
+
+    def test_invalid_date_ignored(self):
+        assert dates("Dated February 30, 2023.") == []
+
+    def test_offset_from_named_date(self):
+        """Test that an offset resolves against the date it names."""
+        events = extract_events(
+            "Payment is due thirty (30) days after January 1, 2023."
+        )
+        relative = [e for e in events if e["kind"] == "relative"]
+        assert relative[0]["date"] == "2023-01-31"
+
+    def test_offset_from_such_date(self):
+        text = ("Judgment was entered on May 1, 2023. "
+                "Any appeal must be filed within 2 weeks after such date.")
+        assert "2023-05-15" in dates(text)
+
+    def test_month_offset_clamps_day(self):
+        text = "Renewal falls one month after January 31, 2023."
+        assert "2023-02-28" in dates(text)
+
+    def test_offset_before(self):
+        text = "Notice must be given 10 days before March 1, 2023."
+        assert "2023-02-19" in dates(text)
+
+    def test_following_day(self):
+        text = "Delivery occurred on 03/15/2023. Tenant left the following day."
+        events = extract_events(text)
+        assert events[-1]["date"] == "2023-03-16"
+        assert events[-1]["sentence"] == "Tenant left the following day."
+
+    def test_undated_anchor_skipped(self):
+        """Test that offsets from undated events are not guessed."""
+        text = ("Signed on January 1, 2023. "
+                "Payment is due 30 days after delivery.")
+        assert dates(text) == ["2023-01-01"]
+
+    def test_reference_date_fallback(self):
+        text = "Respond within 7 days after the date."
+        assert dates(text, reference_date=date(2024, 1, 10)) == ["2024-01-17"]
+
+    def test_sentence_survives_abbreviations(self):
+        """Test that "Inc." and "Jan." do not split the event sentence."""
+        text = ("Preamble. Acme Inc. signed the lease on Jan. 3, 2023 "
+                "with Bob. Unrelated sentence.")
+        sentence = extract_events(text)[0]["sentence"]
+        assert sentence == (
+            "Acme Inc. signed the lease on Jan. 3, 2023 with Bob."
+        )
+
+    def test_long_sentence_trimmed(self):
+        text = "word " * 500 + "on January 1, 2023 " + "word " * 500
+        sentence = extract_events(text)[0]["sentence"]
+        assert "January 1, 2023" in sentence
+        assert len(sentence) <= 400
+
+
+@pytest.fixture
+def index(tmp_path):
+    return TimelineIndex(db_path=str(tmp_path / "timeline.db"))
+
+
+@pytest.mark.unit
+class TestTimelineIndex:
+    """Test the per-case sorted date index."""
+
+    def test_range_query_sorted(self, index):
+        index.index_document(
+            "c1", "d1",
+            "Closing on June 1, 2023. Signed on January 1, 2023."
+        )
+        index.index_document("c1", "d2", "Hearing on 2023-03-15.")
+        index.index_document("c2", "d3", "Other case on 2023-02-01.")
+
+        events = index.query("c1")
+        assert [e["date"] for e in events] == [
+            "2023-01-01", "2023-03-15", "2023-06-01"
+        ]
+        ranged = index.query(
+            "c1", start=date(2023, 2, 1), end=date(2023, 6, 1)
+        )
+        assert [e["doc_id"] for e in ranged] == ["d2", "d1"]
+
+    def test_reindex_replaces_document(self, index):
+        index.index_document("c1", "d1", "Signed on January 1, 2023.")
+        index.index_document("c1", "d1", "Signed on February 1, 2023.")
+        assert [e["date"] for e in index.query("c1")] == ["2023-02-01"]
+
+    def test_limit(self, index):
+        text = " ".join(f"Event on 2023-01-{d:02d}." for d in range(1, 21))
+        index.index_document("c1", "d1", text)
+        assert len(index.query("c1", limit=5)) == 5
+
+
+@pytest.mark.api
+class TestTimelineEndpoint:
+    """Test GET /api/cases/{case_id}/timeline."""
+
+    @pytest.fixture
+    def timeline(self, index):
+        with patch('main.timeline_index', index):
+            yield index
+
+    def test_timeline_range(self, client, timeline):
+        timeline.index_document(
+            "c1", "d1", "Signed on January 1, 2023. Closed on June 1, 2023."
+        )
+        response = client.get(
+            "/api/cases/c1/timeline",
+            params={"start": "2023-05-01", "end": "2023-12-31"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [e["date"] for e in data["events"]] == ["2023-06-01"]
+        assert data["truncated"] is False
+
+    def test_inverted_range_rejected(self, client, timeline):
+        response = client.get(
+            "/api/cases/c1/timeline",
+            params={"start": "2023-05-01", "end": "2023-01-01"}
+        )
+        assert response.status_code == 400
+
+    def test_invalid_date_rejected(self, client, timeline):
+        response = client.get(
+            "/api/cases/c1/timeline", params={"start": "yesterday"}
+        )
+        assert response.status_code == 422
@@ -0,0 +1,140 @@
+"""Tests for vector index settings, stats and offline rebuilds."""
+import pytest
+from unittest.mock import Mock, patch
+
+from services.vector_index import (
+    QueryLatency, hnsw_metadata, open_collection, rebuild
+)
+
+
+@pytest.mark.unit
+class TestSettings:
+    """Test HNSW configuration from the environment."""
+
+    def test_only_configured_settings(self, monkeypatch):
+        monkeypatch.setenv("CHROMA_HNSW_SPACE", "cosine")
+        monkeypatch.setenv("CHROMA_HNSW_SEARCH_EF", "64")
+        monkeypatch.delenv("CHROMA_HNSW_M", raising=False)
+        assert hnsw_metadata() == {
+            "hnsw:space": "cosine", "hnsw:search_ef": 64
+        }
+
+    def test_tunable_settings_applied(self, monkeypatch):
+        monkeypatch.setenv("CHROMA_HNSW_SEARCH_EF", "64")
+        monkeypatch.setenv("CHROMA_HNSW_M", "32")
+        collection = Mock()
+        collection.metadata = {"hnsw:M": 16, "hnsw:search_ef": 10}
+        client = Mock()
+        client.get_or_create_collection.return_value = collection
+
+        open_collection(client, None)
+        # M only changes on rebuild; search_ef is updated in place
+        collection.modify.assert_called_once_with(
+            metadata={"hnsw:search_ef": 64}
+        )
+
+    def test_search_ef_applied_to_cosine_collection(
+        self, tmp_path, monkeypatch
+    ):
+        import chromadb
+        monkeypatch.setenv("CHROMA_HNSW_SPACE", "cosine")
+        client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+        collection = open_collection(client, None)
+        collection.add(ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 2.0]])
+
+        monkeypatch.setenv("CHROMA_HNSW_SEARCH_EF", "50")
+        with patch('services.vector_index.logger') as log:
+            reopened = open_collection(client, None)
+        log.warning.assert_not_called()
+        assert reopened.metadata["hnsw:search_ef"] == 50
+        # Still ranked by cosine distance, which ignores length
+        result = reopened.query(query_embeddings=[[0.0, 1.0]], n_results=1)
+        assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+        assert open_collection(client, None).count() == 2
+
+
+@pytest.mark.unit
+class TestQueryLatency:
+    def test_percentiles(self):
+        latency = QueryLatency(samples=100)
+        for ms in range(1, 201):
+            latency.record(ms / 1000)
+        stats = latency.percentiles()
+        assert stats["samples"] == 100
+        assert stats["p50"] == 0.151
+        assert stats["max"] == 0.2
+
+    def test_empty(self):
+        assert QueryLatency().percentiles()["samples"] == 0
+
+
+@pytest.mark.unit
+class TestRebuild:
+    """Test copying a collection into a new directory."""
+
+    def test_rebuild_swaps_directory(self, tmp_path, monkeypatch):
+        import chromadb
+        monkeypatch.setenv("CHROMA_HNSW_M", "32")
+        persist_dir = str(tmp_path / "chroma")
+        client = chromadb.PersistentClient(path=persist_dir)
+        collection = client.create_collection(
+            "casestar_documents", embedding_function=None
+        )
+        collection.add(
+            ids=[f"d{i}" for i in range(30)],
+            embeddings=[[float(i), 1.0] for i in range(30)],
+            documents=[f"doc {i}" for i in range(30)],
+            metadatas=[{"case_id": "c1"}] * 30
+        )
+        collection.delete(ids=[f"d{i}" for i in range(10)])
+        chromadb.api.client.SharedSystemClient.clear_system_cache()
+
+        result = rebuild(persist_dir, batch_size=7)
+        assert result["records"] == 20
+        assert result["settings"]["hnsw:M"] == 32
+
+        rebuilt = chromadb.PersistentClient(path=persist_dir) \
+            .get_collection("casestar_documents", embedding_function=None)
+        assert rebuilt.count() == 20
+        assert rebuilt.metadata["hnsw:M"] == 32
+        assert rebuilt.get(ids=["d15"])["documents"] == ["doc 15"]
+        chromadb.api.client.SharedSystemClient.clear_system_cache()
+
+
+@pytest.mark.api
+class TestIndexStatsEndpoint:
+    """Test GET /api/admin/index/stats."""
+
+    @pytest.fixture
+    def collection(self):
+        collection = Mock()
+        collection.name = "casestar_documents"
+        collection.count.return_value = 3
+        collection.metadata = {"hnsw:space": "cosine", "other": 1}
+        with patch('main.collection', collection):
+            yield collection
+
+    def test_disabled_without_admin_token(self, client, collection,
+                                          monkeypatch):
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        assert client.get("/api/admin/index/stats").status_code == 404
+
+    def test_requires_token(self, client, collection, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        response = client.get(
+            "/api/admin/index/stats",
+            headers={"Authorization": "Bearer wrong"}
+        )
+        assert response.status_code == 401
+
+    def test_stats(self, client, collection, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+        response = client.get(
+            "/api/admin/index/stats",
+            headers={"Authorization": "Bearer s3cret"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        assert data["settings"] == {"hnsw:space": "cosine"}
+        assert "p95" in data["query_latency_seconds"]